@@ -1,51 +1,173 @@
-from flask import Flask, render_template, request, redirect, url_for, session
-import pandas as pd
-import json
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, Response, stream_with_context, g
+import hmac
+import logging
 import os
+import traceback
 from datetime import datetime
-from src.models.hybrid.kbm_calculator import HybridKBMCalculator
-from src.utils.dtc_checker import check_dtc_in_file
+from src.models.registry import ModelRegistry
+from src.serving.bulk_scoring import parse_flag
+from src.serving.micro_batcher import MicroBatcher
+from src.features.region_registry import RegionRegistry
 from flask import send_file
 import io
 import csv
-import matplotlib
-matplotlib.use('Agg') 
-import matplotlib.pyplot as plt
-import numpy as np
-from flask_session import Session  
+import threading
+import time
+from src.serving.result_store import create_result_store
+from src.utils.log import setup_logging
+from src.utils import metrics
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+_FORM_PARSE = metrics.stage('form_parse')
+_DTC_SCAN = metrics.stage('dtc_scan')
+_SESSION_WRITE = metrics.stage('session_write')
+_TEMPLATE_RENDER = metrics.stage('template_render')
+_QUOTE_BATCH = metrics.BATCH_SIZE.labels('quote')
 
 app = Flask(__name__)
 
 app.config['SECRET_KEY'] = 'osago-secret-key-change-in-prod'  
-app.config['SESSION_TYPE'] = 'filesystem'  
-app.config['SESSION_FILE_DIR'] = './flask_session_data'
 app.config['SESSION_PERMANENT'] = False
-app.config['SESSION_USE_SIGNER'] = True
-Session(app)
-
-
-os.makedirs(app.config['SESSION_FILE_DIR'], exist_ok=True)
 
-MODEL_PATH = "outputs/insurance_model_v1.cbm"
+# В cookie-сессии хранится только идентификатор последнего результата;
+# сами результаты лежат в хранилище: memory — один процесс, sqlite — несколько
+# воркеров, token — результат целиком в подписанном идентификаторе
+result_store = create_result_store(
+    os.environ.get("RESULT_STORE", "memory"),
+    secret=app.config['SECRET_KEY'],
+    ttl=float(os.environ.get("RESULT_TTL", 3600)),
+    path=os.environ.get("RESULT_STORE_PATH", "outputs/results.sqlite3")
+)
+
+MODEL_DIR = "outputs"
+MODEL_PATH = os.environ.get("MODEL_PATH")
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", 5))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
 REGIONS_JSON = "static/data/regions.json"
 UPLOAD_FOLDER = "static/uploads"
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 10000))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", 300))
+MODEL_THREAD_COUNT = int(os.environ.get("MODEL_THREAD_COUNT", -1))
+QUOTE_BATCH_SIZE = int(os.environ.get("QUOTE_BATCH_SIZE", 64))
+QUOTE_BATCH_WAIT_MS = float(os.environ.get("QUOTE_BATCH_WAIT_MS", 2))
+QUOTE_MAX_CASES = int(os.environ.get("QUOTE_MAX_CASES", 1000))
+BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", 1000))
+DEVICE_PROFILES_PATH = os.environ.get("DEVICE_PROFILES_PATH", "outputs/device_profiles.sqlite3")
+# Отрисованные PDF и графики: в памяти воркера и в общем для воркеров каталоге
+RENDER_CACHE_DIR = os.environ.get("RENDER_CACHE_DIR", "outputs/render_cache")
+RENDER_CACHE_MB = int(os.environ.get("RENDER_CACHE_MB", 32))
+RENDER_DISK_CACHE_MB = int(os.environ.get("RENDER_DISK_CACHE_MB", 256))
+# Под gunicorn с preload_app модель грузится в мастере до fork (см. gunicorn.conf.py)
+MODEL_PRELOAD = os.environ.get("MODEL_PRELOAD") == "1"
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-try:
-    calculator = HybridKBMCalculator(model_path=MODEL_PATH)
-    print("HybridKBMCalculator загружен")
-except Exception as e:
-    print(f"Ошибка загрузки калькулятора: {e}")
-    calculator = None
+registry = ModelRegistry(
+    model_dir=MODEL_DIR,
+    model_path=MODEL_PATH,
+    cache_size=PREDICTION_CACHE_SIZE,
+    cache_ttl=PREDICTION_CACHE_TTL,
+    thread_count=MODEL_THREAD_COUNT,
+    profiles_path=DEVICE_PROFILES_PATH
+)
+
+if MODEL_PRELOAD:
+    # Новый артефакт отслеживает мастер gunicorn и перезапускает воркеров (gunicorn.conf.py)
+    try:
+        registry.load()
+    except Exception as e:
+        logger.error("Ошибка загрузки калькулятора: %s", e)
+else:
+    # Модель грузится в фоне: сервер принимает соединения сразу, а /readyz
+    # сообщает балансировщику, когда можно слать трафик
+    registry.start_background_load()
+    registry.start_watching(MODEL_WATCH_INTERVAL)
 
+region_registry = RegionRegistry(REGIONS_JSON)
+region_registry.refresh()
+
+
+_dtc_analyzer = None
+
+
+def dtc_analyzer():
+    # Импорт NumPy откладывается до первой загрузки лога
+    global _dtc_analyzer
+    if _dtc_analyzer is None:
+        from src.utils.dtc_checker import DtcAnalyzer
+        _dtc_analyzer = DtcAnalyzer(UPLOAD_FOLDER, cache_size=int(os.environ.get("DTC_CACHE_SIZE", 4096)))
+    return _dtc_analyzer
+
+
+_pdf_renderer = None
+
+
+def pdf_renderer():
+    # reportlab импортируется и стили собираются один раз на процесс
+    global _pdf_renderer
+    if _pdf_renderer is None:
+        from src.serving.pdf_renderer import PdfRenderer
+        from src.serving.render_cache import RenderCache
+        _pdf_renderer = PdfRenderer(RenderCache(
+            max_bytes=RENDER_CACHE_MB * 1024 * 1024,
+            directory=os.path.join(RENDER_CACHE_DIR, "pdf") if RENDER_CACHE_DIR else None,
+            max_disk_bytes=RENDER_DISK_CACHE_MB * 1024 * 1024,
+            suffix=".pdf"
+        ))
+    return _pdf_renderer
 
-def load_regions_data():
-    try:
-        with open(REGIONS_JSON, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+
+_chart_renderer = None
+
+
+def chart_renderer():
+    # Шаблонная фигура matplotlib собирается один раз на процесс
+    global _chart_renderer
+    if _chart_renderer is None:
+        from src.serving.chart_renderer import KbmChartRenderer
+        from src.serving.render_cache import RenderCache
+        _chart_renderer = KbmChartRenderer(RenderCache(
+            max_bytes=RENDER_CACHE_MB * 1024 * 1024,
+            directory=os.path.join(RENDER_CACHE_DIR, "graph") if RENDER_CACHE_DIR else None,
+            max_disk_bytes=RENDER_DISK_CACHE_MB * 1024 * 1024,
+            suffix=".png"
+        ))
+    return _chart_renderer
+
+
+if MODEL_PRELOAD:
+    # Под gunicorn рендереры создаются в мастере и достаются воркерам через fork
+    pdf_renderer()
+    chart_renderer()
+
+
+def ingest_upload(path: str):
+    # Профиль устройства дополняется в фоне, чтобы не задерживать ответ.
+    # Форма /calculate сама заполняет ночные поездки и число поездок и не знает
+    # device_id, поэтому здесь профили только пополняются; читаются они в
+    # /api/v1/quote для анкет с device_id
+    def run():
+        try:
+            from src.features.telematics import load_obd_log
+            stats = registry.profiles.ingest(load_obd_log(path))
+            logger.info("Профили устройств обновлены: %s", stats)
+        except Exception:
+            logger.exception("Ошибка обновления профилей устройств")
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def score_quote_batch(items: list) -> list:
+    calculator = registry.active
+    if calculator is None:
+        raise RuntimeError("Модель не загружена")
+    _QUOTE_BATCH.observe(len(items))
+    return calculator.score_batch([case for case, _ in items], has_dtc=[has_dtc for _, has_dtc in items])
+
+
+quote_batcher = MicroBatcher(score_quote_batch, max_batch_size=QUOTE_BATCH_SIZE, max_wait_ms=QUOTE_BATCH_WAIT_MS)
 
 
 def calculate_age(dob_str):
@@ -105,6 +227,55 @@ def safe_float(value, default=0.0, min_val=None, max_val=None):
     except (ValueError, TypeError):
         return default
 
+def parse_calculate_form() -> dict:
+    # Разбор multipart-формы /calculate (включая загруженный лог) в анкету для модели
+    form = request.form
+    region_name = form.get("region", "Other")
+    weather = region_registry.get(region_name)
+
+    driver_age = calculate_age(form.get("driver_dob"))
+    driver_experience = calculate_experience(form.get("license_date"))
+
+    try:
+        vehicle_year = int(form.get("vehicle_year", 2020))
+        vehicle_age = max(0, min(30, datetime.now().year - vehicle_year))
+    except (ValueError, TypeError):
+        vehicle_age = 5
+
+    num_claims = safe_int(form.get("num_claims"), 0, 0, 20)
+    violation_count = safe_int(form.get("violation_count"), 0, 0, 50)
+
+    base_kbm = calculate_base_kbm(num_claims, driver_experience)
+    logger.debug("Базовый КБМ: %s (убытков %d, стаж %d)", base_kbm, num_claims, driver_experience)
+
+    night_driving = 0.5 if form.get("night_driving") == "yes" else 0.1
+    is_owner = form.get("is_owner") == "true"
+    unlimited_drivers = form.get("unlimited_drivers") == "true"
+
+    return {
+        'driver_age': driver_age,
+        'driver_experience': driver_experience,
+        'vehicle_age': vehicle_age,
+        'vehicle_type': form.get("body_type", "sedan"),
+        'engine_power': safe_int(form.get("engine_power"), 150, 50, 500),
+        'vehicle_purpose': form.get("vehicle_purpose", "personal"),
+        'region': region_name,
+        'pct_days_with_snow': weather['pct_days_with_snow'],
+        'pct_days_with_rain': weather['pct_days_with_rain'],
+        'winter_duration_months': weather['winter_duration_months'],
+        'base_kbm': base_kbm,
+        'num_claims': num_claims,
+        'violation_count': violation_count,
+        'days_since_last_claim': safe_int(form.get("days_since_last_claim"), 365, 0, 3650),
+        'occupation_type': form.get("occupation_type", "office_worker"),
+        'avg_trips_per_week': safe_float(form.get("trips_per_week"), 5.0, 0, 100),
+        'night_driving_ratio': night_driving,
+        'ko_multiplier': 1.8 if unlimited_drivers else 1.0,
+        'num_owned_vehicles': 1 if is_owner else 0,
+        'description': f"Driver {driver_age}y, {driver_experience}y exp, {region_name}"
+    }
+
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -117,89 +288,38 @@ def docs():
 
 @app.route("/calculate", methods=["GET", "POST"])
 def calculate():
-    if request.method == "POST":
-        print(f" POST-запрос на /calculate")
-    
-    regions_data = load_regions_data()
-
     if request.method == "GET":
-        return render_template("calculate.html", regions=list(regions_data.keys()))
+        return render_template("calculate.html", regions=region_registry.names)
 
+    calculator = registry.active
     if not calculator:
-        print("Model not initialized")
-        return "Model not loaded. Please restart the server.", 503
+        logger.warning("Модель ещё не загружена")
+        return "Model not loaded. Please try again later.", 503, {'Retry-After': '5'}
     
     try:
-        dtc_file = request.files.get('dtc_file')
+        with _FORM_PARSE.time():
+            case_data = parse_calculate_form()
+        base_kbm = case_data['base_kbm']
+        region_name = case_data['region']
+
         has_dtc = False
-        obd_file_path = None
-        
+        dtc_file = request.files.get('dtc_file')
         if dtc_file and dtc_file.filename and dtc_file.filename.lower().endswith('.csv'):
             try:
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"dtc_{timestamp}.csv"
-                obd_file_path = os.path.join(UPLOAD_FOLDER, filename)
-                dtc_file.save(obd_file_path)
-                print(f"Файл сохранён: {obd_file_path}")
-                has_dtc = check_dtc_in_file(obd_file_path)
-                print(f"DTC-анализ: ошибки = {has_dtc}")
-            except Exception as e:
-                print(f" Ошибка обработки DTC-файла: {e}")
+                # Лог сохраняется под хешем содержимого, вердикт кэшируется по нему же:
+                # повторная загрузка не пишется и не сканируется заново
+                with _DTC_SCAN.time():
+                    dtc_verdict = dtc_analyzer().analyze_upload(dtc_file.stream)
+                has_dtc = dtc_verdict.has_dtc
+                logger.info("DTC-анализ: ошибки = %s (%d строк, %s), файл %s", has_dtc, dtc_verdict.rows,
+                            'из кэша' if dtc_verdict.cached else 'скан', dtc_verdict.path)
+                if not dtc_verdict.cached:
+                    ingest_upload(dtc_verdict.path)
+            except Exception:
+                logger.exception("Ошибка обработки DTC-файла")
                 has_dtc = False
 
-        region_name = request.form.get("region", "Other")
-        weather = regions_data.get(region_name, regions_data.get("Other", {}))
-
-        driver_age = calculate_age(request.form.get("driver_dob"))
-        driver_experience = calculate_experience(request.form.get("license_date"))
-
-        try:
-            vehicle_year = int(request.form.get("vehicle_year", 2020))
-            vehicle_age = max(0, min(30, datetime.now().year - vehicle_year))
-        except (ValueError, TypeError):
-            vehicle_year = 2020
-            vehicle_age = 5
-
-        num_claims = safe_int(request.form.get("num_claims"), 0, 0, 20)
-        violation_count = safe_int(request.form.get("violation_count"), 0, 0, 50)
-        
-        base_kbm = calculate_base_kbm(num_claims, driver_experience)
-        print(f"Auto-calculated base_kbm: {base_kbm} (claims={num_claims}, exp={driver_experience})")
-
-        night_driving = 0.5 if request.form.get("night_driving") == "yes" else 0.1
-        is_owner = request.form.get("is_owner") == "true"
-        unlimited_drivers = request.form.get("unlimited_drivers") == "true"
-
-        case_data = {
-            'driver_age': driver_age,
-            'driver_experience': driver_experience,
-            'vehicle_age': vehicle_age,
-            'vehicle_type': request.form.get("body_type", "sedan"),
-            'engine_power': safe_int(request.form.get("engine_power"), 150, 50, 500),
-            'vehicle_purpose': request.form.get("vehicle_purpose", "personal"),
-            'region': region_name,
-            'pct_days_with_snow': weather.get('pct_days_with_snow', 0.3),
-            'pct_days_with_rain': weather.get('pct_days_with_rain', 0.3),
-            'winter_duration_months': weather.get('winter_duration_months', 4),
-            'base_kbm': base_kbm,
-            'num_claims': num_claims,
-            'violation_count': violation_count,
-            'days_since_last_claim': safe_int(request.form.get("days_since_last_claim"), 365, 0, 3650),
-            'occupation_type': request.form.get("occupation_type", "office_worker"),
-            'avg_trips_per_week': safe_float(request.form.get("trips_per_week"), 5.0, 0, 100),
-            'night_driving_ratio': night_driving,
-            'ko_multiplier': 1.8 if unlimited_drivers else 1.0,
-            'num_owned_vehicles': 1 if is_owner else 0,
-            'description': f"Driver {driver_age}y, {driver_experience}y exp, {region_name}"
-        }
-
-        result_df = calculator.calculate(
-            cases=[case_data],
-            obd_file_path=obd_file_path if has_dtc else None,
-            show_plot=False
-        )
-        
-        result_row = result_df.iloc[0].to_dict()
+        result_row = calculator.score_case(case_data, dtc=has_dtc)
         
         result = {
             'tariff': result_row.get('Итоговый КБМ', 0) * 2000,
@@ -211,121 +331,276 @@ def calculate():
             'region': region_name,
             'has_dtc': has_dtc,
             'driver_desc': case_data['description'],
-            'num_claims': num_claims,
-            'violation_count': violation_count,
+            'num_claims': case_data['num_claims'],
+            'violation_count': case_data['violation_count'],
        
-            'driver_age': driver_age,
-            'driver_experience': driver_experience,
-            'vehicle_age': vehicle_age,
+            'driver_age': case_data['driver_age'],
+            'driver_experience': case_data['driver_experience'],
+            'vehicle_age': case_data['vehicle_age'],
             'engine_power': case_data['engine_power'],
         }
 
-        session['last_calculation'] = result
-        print(f"Результат сохранён в сессию")
-    
-        print(f"Расчёт завершён: base_kbm={base_kbm}, final_kbm={result['final_kbm']}, tariff={result['tariff']:.2f}₽")
+        with _SESSION_WRITE.time():
+            result_id = result_store.put(result)
+            session['last_result_id'] = result_id
+        logger.info("Расчёт %s: base_kbm=%s, final_kbm=%s, tariff=%.2f", result_id[:16], base_kbm,
+                    result['final_kbm'], result['tariff'])
         
-        return render_template(
-            "result.html",
-            result=result,
-            input_data=case_data,
-            has_dtc=has_dtc
-        )
+        with _TEMPLATE_RENDER.time():
+            return render_template(
+                "result.html",
+                result=result,
+                input_data=case_data,
+                has_dtc=has_dtc,
+                result_id=result_id
+            )
         
     except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        print(f"Критическая ошибка в /calculate: {e}")
-        print(error_trace)
+        logger.exception("Критическая ошибка в /calculate")
         
         return render_template(
             "result.html",
             result={'error': str(e)},
             input_data={},
             has_dtc=False,
-            error_trace=error_trace if app.debug else None
+            error_trace=traceback.format_exc() if app.debug else None
         ), 500
 
 
+def prepare_api_case(payload: dict) -> dict:
+    invalid = [key for key, value in payload.items() if isinstance(value, (list, dict))]
+    if invalid:
+        raise ValueError(f"fields must be scalars: {', '.join(map(str, invalid))}")
+
+    # Недостающие поля дополняются так же, как в форме /calculate
+    case = dict(payload)
+    case.pop('has_dtc', None)
+    for key, value in region_registry.get(case.get('region')).items():
+        case.setdefault(key, value)
+    if case.get('base_kbm') is None:
+        case['base_kbm'] = calculate_base_kbm(
+            safe_int(case.get('num_claims'), 0, 0, 20),
+            safe_int(case.get('driver_experience'), 0, 0, 80)
+        )
+    return case
+
+
+def quote_response(row: dict) -> dict:
+    return {
+        'description': row['Описание'],
+        'accident_proba': row['Вероятность ДТП'],
+        'base_kbm': row['Базовый КБМ'],
+        'recommended_kbm': row['Рекомендуемый КБМ'],
+        'final_kbm': row['Итоговый КБМ'],
+        'has_dtc': row['Корректировки'] != 'нет',
+        'tariff': round(row['Итоговый КБМ'] * 2000, 2)
+    }
+
+
+@app.route("/api/v1/quote", methods=["POST"])
+def api_quote():
+    calculator = registry.active
+    if calculator is None:
+        return jsonify({'error': 'model not loaded'}), 503, {'Retry-After': '5'}
+
+    payload = request.get_json(silent=True)
+    single = isinstance(payload, dict) and 'cases' not in payload
+    cases = [payload] if single else payload.get('cases') if isinstance(payload, dict) else payload
+    if not isinstance(cases, list) or not cases or not all(isinstance(c, dict) for c in cases):
+        return jsonify({'error': 'expected a case object, a list of cases or {"cases": [...]}'}), 400
+    if len(cases) > QUOTE_MAX_CASES:
+        return jsonify({'error': f'at most {QUOTE_MAX_CASES} cases per request'}), 413
+
+    # Флаг разбирается так же, как в /api/v1/quote/bulk: строка "false" — это False
+    try:
+        items = [(prepare_api_case(case), parse_flag(case.get('has_dtc', False))) for case in cases]
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'invalid case: {e}'}), 400
+
+    try:
+        if len(items) == 1:
+            # Одиночные запросы от разных клиентов склеиваются в общий батч
+            rows = [quote_batcher(items[0], timeout=30)]
+        else:
+            rows = score_quote_batch(items)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    quotes = [quote_response(row) for row in rows]
+    return jsonify({
+        'model_version': calculator.model.version,
+        **({'quote': quotes[0]} if single else {'quotes': quotes})
+    })
+
+
+@app.route("/api/v1/quote/bulk", methods=["POST"])
+def api_quote_bulk():
+    from src.serving.bulk_scoring import iter_cases, score_stream, render_csv, render_ndjson
+
+    calculator = registry.active
+    if calculator is None:
+        return jsonify({'error': 'model not loaded'}), 503, {'Retry-After': '5'}
+
+    upload = request.files.get('file')
+    if upload is not None:
+        stream, name, content_type = upload.stream, upload.filename or '', upload.mimetype
+        # request.close() закрывает файлы загрузки раньше, чем допишется потоковый ответ
+        upload.stream = io.BytesIO()
+    else:
+        stream, name, content_type = request.stream, '', request.mimetype
+    input_format = 'csv' if name.lower().endswith('.csv') or content_type in ('text/csv', 'application/csv') else 'ndjson'
+
+    output_format = request.args.get('format')
+    if output_format is None:
+        output_format = 'csv' if request.accept_mimetypes.best == 'text/csv' else 'ndjson'
+    if output_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+    # Модель фиксируется на весь ответ, чтобы подмена посреди потока не смешала версии
+    model = calculator.model
+    results = score_stream(model, iter_cases(stream, input_format), chunk_size=BULK_CHUNK_SIZE,
+                           prepare=prepare_api_case)
+    if output_format == 'csv':
+        body, mimetype = render_csv(results), 'text/csv'
+    else:
+        body, mimetype = render_ndjson(results), 'application/x-ndjson'
+    return Response(stream_with_context(body), mimetype=mimetype, headers={'X-Model-Version': model.version or ''})
+
+
+@app.route("/healthz")
+def healthz():
+    return jsonify({'status': 'ok'})
+
+
+@app.route("/readyz")
+def readyz():
+    status = registry.status()
+    status['quote_batcher'] = quote_batcher.stats()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
+@app.before_request
+def start_timer():
+    g.started_at = time.perf_counter()
+
+
+@app.after_request
+def record_duration(response):
+    # Для потоковых ответов (bulk) это время до начала отдачи тела
+    started_at = g.pop('started_at', None)
+    if started_at is not None:
+        metrics.REQUEST_SECONDS.labels(request.endpoint or 'unknown').observe(time.perf_counter() - started_at)
+    return response
+
+
+@metrics.register_collector
+def serving_metrics() -> list:
+    status = registry.status()
+    model = status['model']
+    caches = {
+        'prediction': registry.cache,
+        'dtc': _dtc_analyzer.cache if _dtc_analyzer is not None else None,
+        'pdf': _pdf_renderer.cache if _pdf_renderer is not None else None,
+        'graph': _chart_renderer.cache if _chart_renderer is not None else None
+    }
+    cache_stats = {name: cache.stats() for name, cache in caches.items() if cache is not None}
+    for stats in cache_stats.values():
+        # У кэша отрисовок попадания бывают в памяти и на диске
+        stats['hits'] += stats.get('disk_hits', 0)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    batcher = quote_batcher.stats()
+
+    return [
+        ('osago_model_info', 'gauge', 'Активная модель (1 — загружена)',
+         [({'version': model.get('version') or '', 'path': model.get('path') or ''}, int(status['ready']))]),
+        ('osago_cache_hits_total', 'counter', 'Попадания в кэш',
+         [({'cache': name}, stats['hits']) for name, stats in cache_stats.items()]),
+        ('osago_cache_misses_total', 'counter', 'Промахи кэша',
+         [({'cache': name}, stats['misses']) for name, stats in cache_stats.items()]),
+        ('osago_cache_hit_ratio', 'gauge', 'Доля попаданий в кэш с запуска процесса',
+         [({'cache': name}, stats['hit_rate']) for name, stats in cache_stats.items()]),
+        ('osago_quote_batches_total', 'counter', 'Батчи, собранные из одиночных /api/v1/quote',
+         [({}, batcher['batches'])]),
+    ]
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    token = request.headers.get("X-Admin-Token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+        return jsonify({'error': 'forbidden'}), 403
+
+    path = (request.get_json(silent=True) or {}).get('path')
+    if path:
+        path = os.path.join(MODEL_DIR, os.path.basename(path))
+    try:
+        registry.load(path)
+    except Exception as e:
+        return jsonify({'error': str(e), **registry.status()}), 500
+    return jsonify(registry.status())
+
+
 @app.context_processor
 def inject_globals():
     return {
         'current_year': datetime.now().year,
-        'regions': list(load_regions_data().keys())
+        'regions': region_registry.names
     }
 
 
+def load_result(result_id: str = None):
+    result_id = result_id or request.args.get('id') or session.get('last_result_id')
+    return result_store.get(result_id) if result_id else None
+
+
+def cached_download(data: bytes, etag: str, mimetype: str, download_name: str) -> Response:
+    response = Response(data, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+    # Результат принадлежит одному пользователю: общие кэши его хранить не должны
+    response.headers['Cache-Control'] = 'private, max-age=3600'
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def not_modified(etag: str):
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
 @app.route("/download/pdf")
-def download_pdf():
-    from reportlab.lib import colors
-    from reportlab.lib.pagesizes import A4
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import cm
-
-    result = session.get('last_calculation')
+@app.route("/download/pdf/<result_id>")
+def download_pdf(result_id=None):
+    result = load_result(result_id)
     
     if not result:
         return "No calculation result found. Please calculate first.", 400
-    
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#00D46A'), spaceAfter=30)
-    
-    elements.append(Paragraph("OSAGOCalculator — Result", title_style))
-    elements.append(Spacer(1, 0.5*cm))
-    
-    data = [
-        ['Parameter', 'Value'],
-        ['Final CTP Tariff', f"{result['tariff']:.0f} ₽"],
-        ['Final KBM', f"{result['final_kbm']:.2f}"],
-        ['Base KBM', f"{result['base_kbm']:.2f}"],
-        ['Region', result['region']],
-        ['Driver', result['driver_desc']],
-        ['Accidents', str(result['num_claims'])],
-        ['DTC Errors', 'Yes' if result['has_dtc'] else 'No'],
-    ]
-    
-    table = Table(data, colWidths=[6*cm, 6*cm])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#00664E')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#14281E')),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.whitesmoke),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#00D46A')),
-        ('FONTSIZE', (0, 1), (-1, -1), 12),
-        ('TOPPADDING', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-    ]))
-    
-    elements.append(table)
-    elements.append(Spacer(1, 1*cm))
-    
-    elements.append(Paragraph(f"© {datetime.now().year} OSAGOCalculator, Inc. | Far Eastern Federal University", 
-                             ParagraphStyle('Footer', parent=styles['Normal'], fontSize=10, textColor=colors.grey)))
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    return send_file(
-        buffer,
-        mimetype='application/pdf',
-        as_attachment=True,
-        download_name=f"osago_result_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+
+    renderer = pdf_renderer()
+    cached = not_modified(renderer.key(result))
+    if cached is not None:
+        return cached
+
+    data, etag = renderer.render(result)
+    return cached_download(
+        data, etag, 'application/pdf',
+        f"osago_result_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
     )
 
 
 @app.route("/download/csv")
-def download_csv():
+@app.route("/download/csv/<result_id>")
+def download_csv(result_id=None):
 
-    result = session.get('last_calculation')
+    result = load_result(result_id)
     
     if not result:
         return "No calculation result found. Please calculate first.", 400
@@ -364,55 +639,22 @@ def download_csv():
 
 
 @app.route("/download/graph")
-def download_graph():
-
-    result = session.get('last_calculation')
+@app.route("/download/graph/<result_id>")
+def download_graph(result_id=None):
+    result = load_result(result_id)
     
     if not result:
         return " No calculation result found. Please calculate first.", 400
-    
-    base_kbm = result['base_kbm']
-    final_kbm = result['final_kbm']
-    average_kbm = 1.0
-    
-    fig, ax = plt.subplots(figsize=(10, 6), facecolor='#0A1A15')
-    ax.set_facecolor('#0F2319')
-    
-    categories = ['Base KBM', 'Final KBM', 'Average KBM']
-    values = [base_kbm, final_kbm, average_kbm]
-    colors = ['#00D46A', '#00A55E', '#8B8B8B']
-    
-    bars = ax.bar(categories, values, color=colors, edgecolor='#00D46A', linewidth=2)
-    
-    for bar, value in zip(bars, values):
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2., height,
-                f'{value:.2f}',
-                ha='center', va='bottom', 
-                color='#E0E0E0', fontsize=12, fontweight='bold')
-    
-    ax.set_ylabel('KBM Coefficient', color='#A0A0A0', fontsize=12)
-    ax.set_title('Your KBM vs Average Market KBM', color='#E0E0E0', fontsize=16, fontweight='bold', pad=20)
-    ax.set_ylim(0, max(values) * 1.3)
-    
-    ax.grid(axis='y', alpha=0.3, color='#00D46A', linestyle='--')
-    ax.set_axisbelow(True)
-    
-    ax.tick_params(colors='#A0A0A0')
-    for spine in ax.spines.values():
-        spine.set_color('#00D46A')
-    
-    buffer = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(buffer, format='png', dpi=150, facecolor=fig.get_facecolor(), edgecolor='none')
-    buffer.seek(0)
-    plt.close(fig)
-    
-    return send_file(
-        buffer,
-        mimetype='image/png',
-        as_attachment=True,
-        download_name=f"kbm_graph_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+
+    renderer = chart_renderer()
+    cached = not_modified(renderer.key(result['base_kbm'], result['final_kbm']))
+    if cached is not None:
+        return cached
+
+    data, etag = renderer.render(result['base_kbm'], result['final_kbm'])
+    return cached_download(
+        data, etag, 'image/png',
+        f"kbm_graph_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
     )
 
 
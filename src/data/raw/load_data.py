@@ -1,6 +1,10 @@
-import pandas as pd
+import logging
 import os
 
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
 
 def load_dataset(file_path: str) -> pd.DataFrame:
 
@@ -8,5 +12,5 @@ def load_dataset(file_path: str) -> pd.DataFrame:
         raise FileNotFoundError(f"Файл не найден: {file_path}")
 
     df = pd.read_csv(file_path)
-    print(f"Датасет загружен: {len(df)} строк, {len(df.columns)} столбцов")
+    logger.info("Датасет загружен: %d строк, %d столбцов", len(df), len(df.columns))
     return df
\ No newline at end of file
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# accData — hex-строка отсчётов акселерометра: по байту со знаком на ось x, y, z.
+# Полная строка — 162 символа (81 байт, 27 отсчётов); в выгрузке часть строк
+# обрезана и заканчивается на "...".
+ACC_DTYPE = np.int8
+ACC_AXES = 3
+ACC_ROW_BYTES = 81
+# Блок в 16k строк держит промежуточные массивы и таблицу в кэше процессора
+DECODE_CHUNK_ROWS = 16384
+
+_INVALID = 256
+
+
+def _pair_table() -> np.ndarray:
+    # Таблица на все пары символов: uint16 из двух соседних байтов строки
+    # сразу переводится в значение байта, а всё, что не hex, — в _INVALID
+    digits = np.full(256, -1, dtype=np.int32)
+    digits[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10)
+    digits[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10, 16)
+    digits[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+
+    pair = np.arange(65536, dtype=np.uint16).view(np.uint8).reshape(-1, 2)
+    high, low = digits[pair[:, 0]], digits[pair[:, 1]]
+    return np.where((high >= 0) & (low >= 0), high * 16 + low, _INVALID).astype(np.uint16)
+
+
+_PAIRS = _pair_table()
+
+
+def _as_array(values) -> np.ndarray:
+    if isinstance(values, pd.Series):
+        values = values.fillna('').to_numpy()
+    values = np.asarray(values)
+    if values.dtype.kind == 'O':
+        values = np.where(pd.isna(values), '', values)
+    return values
+
+
+def _as_fixed_bytes(values: np.ndarray, width: int) -> np.ndarray:
+    # Строки длиннее width numpy обрезает, короче — дополняет нулевыми байтами
+    try:
+        return values.astype(f'S{width}')
+    except UnicodeEncodeError:
+        pass
+    # Не-ASCII символ не даёт привести блок к байтам; он заменяется на '?',
+    # и строка декодируется до него, как до любого другого мусора
+    text = values.astype(f'U{width}')
+    codes = text.view(np.uint32)
+    codes[codes > 127] = ord('?')
+    return text.astype(f'S{width}')
+
+
+def decode_acc_data(values, row_bytes: int = ACC_ROW_BYTES, dtype=ACC_DTYPE, axes: int = ACC_AXES,
+                    chunk_rows: int = DECODE_CHUNK_ROWS) -> tuple:
+    """Декодирует колонку accData целиком в массив (строк, отсчётов, осей).
+
+    Колонка разбирается блоками по chunk_rows, чтобы промежуточные массивы не
+    росли с логом: строки блока переводятся в numpy-массив фиксированной ширины,
+    его байты парами разбираются одной таблицей, а отсчёты получаются
+    представлением (view) байтов в dtype без копирования.
+
+    Возвращает (samples, counts): counts — число целых отсчётов в строке.
+    Обрезанная строка ("...", пропуск, мусор) декодируется до первого
+    не-hex символа, неполный последний отсчёт отбрасывается, хвост строки
+    в samples заполнен нулями.
+    """
+    # Многобайтовые отсчёты в hex записаны старшим байтом вперёд
+    dtype = np.dtype(dtype).newbyteorder('=')
+    sample_bytes = dtype.itemsize * axes
+    per_row = row_bytes // sample_bytes
+    width = per_row * sample_bytes
+
+    values = _as_array(values)
+    rows = len(values)
+    decoded = np.empty((rows, width), dtype=np.uint8)
+    valid_bytes = np.empty(rows, dtype=np.int64)
+    columns = np.arange(width)
+
+    for start in range(0, rows, chunk_rows):
+        fixed = _as_fixed_bytes(values[start:start + chunk_rows], width * 2)
+        pairs = fixed.view(np.uint16).reshape(-1, width)
+        values16 = np.take(_PAIRS, pairs)
+        invalid = values16 == _INVALID
+        first_invalid = invalid.argmax(axis=1)
+        length = np.where(invalid[np.arange(len(pairs)), first_invalid], first_invalid, width)
+        length -= length % sample_bytes
+
+        block = decoded[start:start + len(pairs)]
+        np.copyto(block, values16, casting='unsafe')
+        block[columns >= length[:, None]] = 0
+        valid_bytes[start:start + len(pairs)] = length
+
+    samples = decoded.view(dtype.newbyteorder('>') if dtype.itemsize > 1 else dtype)
+    samples = samples.reshape(rows, per_row, axes)
+    if dtype.itemsize > 1:
+        samples = samples.astype(dtype)
+    return samples, valid_bytes // sample_bytes
+
+
+def peak_magnitude(samples: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Максимальная длина вектора ускорения в строке; NaN для строк без отсчётов."""
+    squared = np.square(samples, dtype=np.float32).sum(axis=2)
+    squared[np.arange(samples.shape[1]) >= counts[:, None]] = -1
+    peak = squared.max(axis=1, initial=-1)
+    return np.where(peak >= 0, np.sqrt(np.maximum(peak, 0)), np.nan)
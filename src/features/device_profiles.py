@@ -0,0 +1,270 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.features.telematics import numeric_column, parse_timestamps, trip_features
+
+# Границы корзин гистограмм; последняя корзина открыта справа
+SPEED_BINS = np.arange(0, 201, 10, dtype=float)
+RPM_BINS = np.arange(0, 8001, 250, dtype=float)
+
+_COUNTERS = ['trips', 'samples', 'dtc_samples', 'dtc_trips', 'night_samples',
+             'hard_brakes', 'hard_accels', 'duration_sec']
+
+
+def _histograms(device_index: np.ndarray, values: np.ndarray, bins: np.ndarray, devices: int) -> np.ndarray:
+    # Одна bincount на все устройства: корзина устройства d — d * n + bin
+    present = ~np.isnan(values)
+    bucket = np.clip(np.searchsorted(bins, values[present], side='right') - 1, 0, len(bins) - 1)
+    flat = device_index[present] * len(bins) + bucket
+    return np.bincount(flat, minlength=devices * len(bins)).reshape(devices, len(bins))
+
+
+def _blob(histogram: np.ndarray) -> bytes:
+    return histogram.astype('<i8').tobytes()
+
+
+def _unblob(blob, bins: np.ndarray) -> np.ndarray:
+    if blob is None:
+        return np.zeros(len(bins), dtype=np.int64)
+    return np.frombuffer(blob, dtype='<i8').astype(np.int64)
+
+
+class DeviceProfileStore:
+    """Накопительные телематические агрегаты по deviceID в одном файле SQLite.
+
+    ingest() добавляет к профилю только новые отсчёты: для каждой поездки
+    хранятся время последнего учтённого отсчёта и число учтённых отсчётов с
+    этим временем, и повторная загрузка того же лога (или его дописанной версии)
+    не пересчитывает историю. Отсчёты с той же секундой, что и последний
+    учтённый, сверяются по порядку в логе: первые last_count из них уже учтены,
+    остальные — новые. Поэтому загрузки считаются версиями одного лога; кусок,
+    начинающийся с середины секунды, уже учтённой раньше, будет принят за повтор. Гистограммы
+    скорости и оборотов хранятся счётчиками по фиксированным корзинам, поэтому
+    складываются без сырых данных. profile() — чтение одной строки по ключу.
+    """
+
+    def __init__(self, path: str = "outputs/device_profiles.sqlite3", clock=time.time):
+        self.path = path
+        self.clock = clock
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS devices ("
+            "device_id REAL PRIMARY KEY, trips INTEGER NOT NULL, samples INTEGER NOT NULL, "
+            "dtc_samples INTEGER NOT NULL, dtc_trips INTEGER NOT NULL, night_samples INTEGER NOT NULL, "
+            "hard_brakes INTEGER NOT NULL, hard_accels INTEGER NOT NULL, duration_sec REAL NOT NULL, "
+            "first_seen INTEGER NOT NULL, last_seen INTEGER NOT NULL, "
+            "speed_hist BLOB NOT NULL, rpm_hist BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS trips ("
+            "device_id REAL NOT NULL, trip_id REAL NOT NULL, last_ts INTEGER NOT NULL, has_dtc INTEGER NOT NULL, "
+            "last_count INTEGER NOT NULL, PRIMARY KEY (device_id, trip_id))"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # Соединение SQLite нельзя делить между потоками и переносить через fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _delta(conn, seconds: np.ndarray, device: np.ndarray, trip: np.ndarray):
+        keys = pd.DataFrame({'device': device, 'trip': trip, 'ts': seconds})
+        devices = np.unique(device)
+        placeholders = ','.join('?' * len(devices))
+        known = pd.DataFrame(
+            conn.execute(
+                f"SELECT device_id, trip_id, last_ts, last_count, has_dtc FROM trips "
+                f"WHERE device_id IN ({placeholders})", devices.tolist()
+            ).fetchall(),
+            columns=['device', 'trip', 'last_ts', 'last_count', 'has_dtc']
+        ).astype({'device': float, 'trip': float, 'last_ts': np.int64, 'last_count': np.int64, 'has_dtc': np.int64})
+        merged = keys.merge(known, on=['device', 'trip'], how='left')
+        last_ts = merged['last_ts'].fillna(-1).to_numpy(dtype=np.int64)
+        last_count = merged['last_count'].fillna(0).to_numpy(dtype=np.int64)
+        # Номер отсчёта среди отсчётов поездки с той же секундой, в порядке лога
+        rank = keys.groupby(['device', 'trip', 'ts'], sort=False).cumcount().to_numpy()
+        fresh = (seconds > last_ts) | ((seconds == last_ts) & (rank >= last_count))
+        return fresh, known
+
+    def ingest(self, log: pd.DataFrame) -> dict:
+        """Добавляет OBD-лог (колонки как у load_obd_log) к профилям устройств.
+        Возвращает число учтённых и пропущенных как уже известные отсчётов."""
+        seconds = parse_timestamps(log['timeStamp'])
+        valid = seconds >= 0
+        log, seconds = log[valid], seconds[valid]
+        if not len(log):
+            return {'devices': 0, 'new_samples': 0, 'skipped_samples': 0}
+
+        device = pd.to_numeric(log['deviceID'], errors='coerce').fillna(-1).to_numpy(dtype=float)
+        trip = pd.to_numeric(log['tripID'], errors='coerce').fillna(-1).to_numpy(dtype=float)
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            fresh, known = self._delta(conn, seconds, device, trip)
+            if fresh.any():
+                self._apply(conn, log[fresh], seconds[fresh], device[fresh], trip[fresh], known)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        return {
+            'devices': int(len(np.unique(device[fresh]))),
+            'new_samples': int(fresh.sum()),
+            'skipped_samples': int((~fresh).sum())
+        }
+
+    def _apply(self, conn, log: pd.DataFrame, seconds: np.ndarray, device: np.ndarray, trip: np.ndarray,
+               known: pd.DataFrame):
+        trips = trip_features(log)
+        devices, device_index = np.unique(device, return_inverse=True)
+
+        # Поездка считается новой один раз, DTC-поездка — при первом отсчёте с ошибкой
+        seen = known.set_index(['device', 'trip'])['has_dtc']
+        trip_keys = pd.MultiIndex.from_arrays([trips['deviceID'], trips['tripID']])
+        previous_dtc = seen.reindex(trip_keys)
+        trips['new_trip'] = previous_dtc.isna().to_numpy()
+        trips['new_dtc_trip'] = trips['has_dtc_errors'].to_numpy() & (previous_dtc.fillna(0).to_numpy() == 0)
+        trips['night_samples'] = np.rint(trips['night_driving_ratio'] * trips['samples']).astype(np.int64)
+        per_device = trips.groupby('deviceID').agg(
+            trips=('new_trip', 'sum'), samples=('samples', 'sum'), dtc_trips=('new_dtc_trip', 'sum'),
+            night_samples=('night_samples', 'sum'), hard_brakes=('hard_brakes', 'sum'),
+            hard_accels=('hard_accels', 'sum'), duration_sec=('duration_sec', 'sum')
+        ).reindex(devices)
+
+        dtc = np.nan_to_num(numeric_column(log, 'dtc')) > 0
+        per_device['dtc_samples'] = np.bincount(device_index, weights=dtc, minlength=len(devices))
+        first_seen = np.full(len(devices), np.iinfo(np.int64).max)
+        last_seen = np.full(len(devices), np.iinfo(np.int64).min)
+        np.minimum.at(first_seen, device_index, seconds)
+        np.maximum.at(last_seen, device_index, seconds)
+
+        speed = numeric_column(log, 'speed', np.nan)
+        speed = np.where(np.isnan(speed), numeric_column(log, 'gps_speed', np.nan), speed)
+        rpm = numeric_column(log, 'rpm', np.nan)
+        speed_hist = _histograms(device_index, speed, SPEED_BINS, len(devices))
+        rpm_hist = _histograms(device_index, rpm, RPM_BINS, len(devices))
+
+        placeholders = ','.join('?' * len(devices))
+        existing = {
+            row[0]: row for row in conn.execute(
+                f"SELECT device_id, {', '.join(_COUNTERS)}, first_seen, last_seen, speed_hist, rpm_hist "
+                f"FROM devices WHERE device_id IN ({placeholders})", devices.tolist()
+            )
+        }
+
+        now = self.clock()
+        rows = []
+        for i, device_id in enumerate(devices.tolist()):
+            counters = [per_device[name].iloc[i] for name in _COUNTERS]
+            first, last = int(first_seen[i]), int(last_seen[i])
+            speeds, rpms = speed_hist[i], rpm_hist[i]
+            old = existing.get(device_id)
+            if old is not None:
+                counters = [a + b for a, b in zip(counters, old[1:1 + len(_COUNTERS)])]
+                first, last = min(first, old[-4]), max(last, old[-3])
+                speeds = speeds + _unblob(old[-2], SPEED_BINS)
+                rpms = rpms + _unblob(old[-1], RPM_BINS)
+            rows.append((device_id, *[int(c) for c in counters[:-1]], float(counters[-1]),
+                         first, last, _blob(speeds), _blob(rpms), now))
+
+        conn.executemany(
+            f"INSERT OR REPLACE INTO devices (device_id, {', '.join(_COUNTERS)}, first_seen, last_seen, "
+            f"speed_hist, rpm_hist, updated_at) VALUES ({','.join('?' * (len(_COUNTERS) + 6))})", rows
+        )
+
+        trip_last = pd.DataFrame({'device': device, 'trip': trip, 'ts': seconds, 'dtc': dtc})
+        grouped = trip_last.groupby(['device', 'trip'])
+        trip_last['at_last'] = seconds == grouped['ts'].transform('max').to_numpy()
+        trip_last = grouped.agg(ts=('ts', 'max'), dtc=('dtc', 'max')).join(
+            trip_last.groupby(['device', 'trip'])['at_last'].sum().rename('count')
+        ).reset_index()
+        # В SET столбцы без excluded — значения до обновления
+        conn.executemany(
+            "INSERT INTO trips (device_id, trip_id, last_ts, last_count, has_dtc) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (device_id, trip_id) DO UPDATE SET "
+            "last_count = CASE WHEN excluded.last_ts > last_ts THEN excluded.last_count "
+            "WHEN excluded.last_ts = last_ts THEN last_count + excluded.last_count ELSE last_count END, "
+            "last_ts = max(last_ts, excluded.last_ts), has_dtc = max(has_dtc, excluded.has_dtc)",
+            [(float(r.device), float(r.trip), int(r.ts), int(r.count), int(r.dtc))
+             for r in trip_last.itertuples(index=False)]
+        )
+
+    def profile(self, device_id):
+        """Телематический профиль устройства или None, если логов по нему не было."""
+        try:
+            device_id = float(device_id)
+        except (TypeError, ValueError):
+            return None
+        row = self._connection().execute(
+            f"SELECT {', '.join(_COUNTERS)}, first_seen, last_seen, speed_hist, rpm_hist "
+            "FROM devices WHERE device_id = ?", (device_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        counters = dict(zip(_COUNTERS, row))
+        first_seen, last_seen = row[len(_COUNTERS)], row[len(_COUNTERS) + 1]
+        weeks = max((last_seen - first_seen) / (7 * 86400), 1.0)
+        samples = max(counters['samples'], 1)
+        hours = max(counters['duration_sec'] / 3600, 1e-9)
+        return {
+            'device_id': device_id,
+            **counters,
+            'has_dtc': counters['dtc_samples'] > 0,
+            'night_driving_ratio': counters['night_samples'] / samples,
+            'avg_trips_per_week': counters['trips'] / weeks,
+            'hard_brakes_per_hour': counters['hard_brakes'] / hours,
+            'first_seen': pd.Timestamp(first_seen, unit='s'),
+            'last_seen': pd.Timestamp(last_seen, unit='s'),
+            'speed_hist': _unblob(row[-2], SPEED_BINS),
+            'rpm_hist': _unblob(row[-1], RPM_BINS)
+        }
+
+    def case_features(self, device_id) -> dict:
+        """Признаки модели из профиля: их можно подставить в анкету."""
+        profile = self.profile(device_id)
+        if profile is None:
+            return {}
+        return {
+            'night_driving_ratio': profile['night_driving_ratio'],
+            'avg_trips_per_week': profile['avg_trips_per_week'],
+            'has_dtc': profile['has_dtc']
+        }
+
+
+def main():
+    import argparse
+
+    from src.features.telematics import load_obd_log
+
+    parser = argparse.ArgumentParser(description="Добавление OBD-логов в профили устройств")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--store", default="outputs/device_profiles.sqlite3")
+    args = parser.parse_args()
+
+    store = DeviceProfileStore(args.store)
+    for path in args.files:
+        start = time.perf_counter()
+        stats = store.ingest(load_obd_log(path))
+        print(f"{path}: устройств {stats['devices']}, новых отсчётов {stats['new_samples']}, "
+              f"уже учтённых {stats['skipped_samples']} ({time.perf_counter() - start:.2f} с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+# Значения для регионов, которых нет в справочнике и нет записи "Other"
+WEATHER_DEFAULTS = {
+    'pct_days_with_snow': 0.3,
+    'pct_days_with_rain': 0.3,
+    'winter_duration_months': 4
+}
+FALLBACK_REGION = "Other"
+
+logger = logging.getLogger(__name__)
+
+
+class RegionTable:
+    """Неизменяемый снимок справочника регионов: имена и климатические признаки
+    по регионам. Колонки NumPy для пакетного поиска строятся при первом обращении,
+    их последняя строка — значения по умолчанию."""
+
+    def __init__(self, records: dict, digest: str = None):
+        self.digest = digest
+        self.names = list(records)
+
+        fallback = records.get(FALLBACK_REGION, {})
+        self.defaults = {key: float(fallback.get(key, value)) for key, value in WEATHER_DEFAULTS.items()}
+        self.weather = {
+            name: {key: float(attrs.get(key, value)) for key, value in WEATHER_DEFAULTS.items()}
+            for name, attrs in records.items()
+        }
+        self._columns = None
+
+    @property
+    def columns(self) -> dict:
+        if self._columns is None:
+            import numpy as np
+
+            self._columns = {
+                key: np.array([self.weather[name][key] for name in self.names] + [default], dtype=float)
+                for key, default in self.defaults.items()
+            }
+        return self._columns
+
+    def get(self, name) -> dict:
+        try:
+            return dict(self.weather.get(name, self.defaults))
+        except TypeError:
+            # Нехешируемое имя (список, словарь из JSON) — неизвестный регион
+            return dict(self.defaults)
+
+    def positions(self, regions):
+        import pandas as pd
+
+        # get_indexer ищет все значения по хеш-таблице за один проход; -1 — неизвестный регион
+        positions = pd.Index(self.names).get_indexer(pd.Index(regions, dtype=object))
+        positions[positions < 0] = len(self.names)
+        return positions
+
+    def lookup(self, regions) -> dict:
+        positions = self.positions(regions)
+        return {key: column[positions] for key, column in self.columns.items()}
+
+
+class RegionRegistry:
+    """Справочник регионов с перечитыванием файла только при его изменении.
+
+    mtime и размер проверяются не чаще раза в check_interval секунд; если они
+    изменились, а SHA-256 содержимого нет, разбор JSON пропускается.
+    """
+
+    def __init__(self, path: str = "static/data/regions.json", check_interval: float = 1.0,
+                 clock=time.monotonic):
+        self.path = path
+        self.check_interval = check_interval
+        self.clock = clock
+
+        self._table = RegionTable({})
+        self._signature = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    @property
+    def table(self) -> RegionTable:
+        now = self.clock()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self.refresh()
+        return self._table
+
+    @property
+    def names(self) -> list:
+        return self.table.names
+
+    def get(self, name) -> dict:
+        return self.table.get(name)
+
+    def lookup(self, regions) -> dict:
+        return self.table.lookup(regions)
+
+    def refresh(self) -> bool:
+        with self._lock:
+            self._checked_at = self.clock()
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                if self._signature is not None:
+                    self._table, self._signature = RegionTable({}), None
+                    return True
+                return False
+
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature:
+                return False
+
+            with open(self.path, 'rb') as f:
+                content = f.read()
+            self._signature = signature
+            digest = hashlib.sha256(content).hexdigest()
+            if digest == self._table.digest:
+                return False
+
+            try:
+                records = json.loads(content.decode('utf-8'))
+            except ValueError as e:
+                # Недописанный или битый файл: остаёмся на предыдущем снимке
+                logger.warning("Ошибка чтения справочника регионов %s: %s", self.path, e)
+                self._signature = None
+                return False
+
+            self._table = RegionTable(records, digest)
+            self.reloads += 1
+            return True
+
+    def fill_weather(self, data, region_column: str = 'region'):
+        """Дополняет недостающие климатические колонки DataFrame по колонке региона."""
+        import pandas as pd
+
+        missing = [key for key in WEATHER_DEFAULTS if key not in data.columns or data[key].isna().any()]
+        if not missing or region_column not in data.columns:
+            return data
+
+        values = self.lookup(data[region_column].to_numpy())
+        data = data.copy()
+        for key in missing:
+            column = pd.Series(values[key], index=data.index)
+            data[key] = data[key].fillna(column) if key in data.columns else column
+        return data
@@ -0,0 +1,78 @@
+import math
+
+
+def _to_number(value) -> float:
+    if value is None or isinstance(value, bool):
+        return math.nan if value is None else float(value)
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class RowFeaturizer:
+    """Однострочный аналог InsuranceRiskModel.preprocess без pandas.
+
+    Повторяет generate_features, заполнение пропусков константами модели и замену
+    незнакомых категорий на "unknown", но собирает вектор признаков сразу
+    в списке в порядке model.all_features.
+    """
+
+    def __init__(self, model):
+        self.features = list(model.all_features)
+        self.cat_features = frozenset(model.cat_features)
+        self.numeric_inputs = [col for col in model.required_features if col not in self.cat_features]
+
+        self._index = {col: i for i, col in enumerate(self.features)}
+        self._fill = [
+            (self._index[col], float(model.fill_values.get(col, 0.0)))
+            for col in model.num_features
+        ]
+        self._cat_slots = [
+            (self._index[col], col, frozenset(model.cat_vocabularies.get(col) or ()))
+            for col in model.cat_features
+        ]
+        self._num_slots = [(self._index[col], col) for col in self.numeric_inputs]
+        self._template = [0] * len(self.features)
+
+    def transform(self, case: dict) -> list:
+        row = self._template.copy()
+        index = self._index
+
+        for i, col in self._num_slots:
+            row[i] = _to_number(case.get(col))
+
+        for i, col, vocabulary in self._cat_slots:
+            value = case.get(col)
+            value = "unknown" if _is_missing(value) else str(value)
+            row[i] = value if not vocabulary or value in vocabulary else "unknown"
+
+        age = row[index['driver_age']]
+        experience = row[index['driver_experience']]
+        claims = row[index['num_claims']]
+        violations = row[index['violation_count']]
+
+        row[index['age_squared']] = age ** 2
+        row[index['experience_ratio']] = experience / (age + 1e-5)
+        row[index['claims_per_year']] = claims / (experience + 1e-5)
+        row[index['violations_per_year']] = violations / (experience + 1e-5)
+
+        row[index['no_claims_long']] = int(claims == 0 and experience >= 5)
+        row[index['experienced_clean']] = int(experience >= 10 and claims == 0 and violations == 0)
+        row[index['young_risky']] = int(age < 26 and violations > 0)
+        row[index['high_claims']] = int(claims >= 2)
+
+        row[index['night_x_trips']] = row[index['night_driving_ratio']] * row[index['avg_trips_per_week']]
+        row[index['power_x_age']] = row[index['engine_power']] * row[index['vehicle_age']]
+
+        for i, fill_value in self._fill:
+            if row[i] != row[i]:
+                row[i] = fill_value
+
+        return row
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+OBD_COLUMNS = ['tripID', 'deviceID', 'timeStamp', 'gps_speed', 'speed', 'rpm', 'eLoad', 'tPos', 'dtc']
+
+SPEEDING_KMH = 90.0
+HARSH_ACCEL_MS2 = 3.0
+HARSH_BRAKE_MS2 = -3.0
+IDLE_SPEED_KMH = 1.0
+# Разрыв между отсчётами больше этого считается потерей связи, а не ускорением
+MAX_SAMPLE_GAP_SEC = 5
+NIGHT_HOURS = (22, 6)
+
+TRIP_FEATURES = [
+    'deviceID', 'tripID', 'start_time', 'samples', 'duration_sec', 'avg_speed', 'max_speed',
+    'speeding_ratio', 'hard_accels', 'hard_brakes', 'idle_ratio', 'night_driving_ratio',
+    'avg_engine_load', 'avg_throttle', 'has_dtc_errors'
+]
+DRIVER_FEATURES = ['deviceID', 'night_driving_ratio', 'avg_trips_per_week', 'hard_brakes_per_hour', 'has_dtc_errors']
+
+
+def load_obd_log(path: str) -> pd.DataFrame:
+    # accData не читается: это самая тяжёлая колонка, для агрегатов по поездкам она не нужна
+    header = pd.read_csv(path, nrows=0).columns
+    return pd.read_csv(path, usecols=[c for c in OBD_COLUMNS if c in header], low_memory=False)
+
+
+def parse_timestamps(values: pd.Series) -> np.ndarray:
+    """Секунды от эпохи (int64) по фиксированному формату; NaT для нераспознанных — -1."""
+    parsed = pd.to_datetime(values, format=TIMESTAMP_FORMAT, errors='coerce')
+    seconds = parsed.to_numpy(dtype='datetime64[s]').astype(np.int64)
+    seconds[parsed.isna().to_numpy()] = -1
+    return seconds
+
+
+def numeric_column(log: pd.DataFrame, column: str, default: float = 0.0) -> np.ndarray:
+    if column not in log.columns:
+        return np.full(len(log), default, dtype=float)
+    return pd.to_numeric(log[column], errors='coerce').to_numpy(dtype=float)
+
+
+def _events(flags: np.ndarray, group_start: np.ndarray) -> np.ndarray:
+    # Событие — начало серии подряд идущих отсчётов с флагом внутри одной поездки
+    previous = np.empty_like(flags)
+    previous[0] = False
+    previous[1:] = flags[:-1]
+    previous[group_start] = False
+    return flags & ~previous
+
+
+def trip_features(log: pd.DataFrame) -> pd.DataFrame:
+    """Агрегаты по поездкам (deviceID, tripID) из посекундного OBD-лога.
+
+    Все вычисления векторные: строки сортируются один раз, границы поездок
+    находятся по смене ключа, а суммы и максимумы считаются через reduceat.
+    """
+    seconds = parse_timestamps(log['timeStamp'])
+    valid = seconds >= 0
+    if not valid.all():
+        log, seconds = log[valid], seconds[valid]
+    if not len(log):
+        return pd.DataFrame(columns=TRIP_FEATURES)
+
+    device = numeric_column(log, 'deviceID', -1.0)
+    trip = numeric_column(log, 'tripID', -1.0)
+    device[np.isnan(device)] = -1
+    trip[np.isnan(trip)] = -1
+
+    order = np.lexsort((seconds, trip, device))
+    device, trip, seconds = device[order], trip[order], seconds[order]
+
+    speed = numeric_column(log, 'speed', np.nan)[order]
+    gps_speed = numeric_column(log, 'gps_speed', np.nan)[order]
+    speed = np.where(np.isnan(speed), gps_speed, speed)
+    speed = np.nan_to_num(speed, nan=0.0)
+    rpm = np.nan_to_num(numeric_column(log, 'rpm')[order])
+    engine_load = numeric_column(log, 'eLoad', np.nan)[order]
+    throttle = numeric_column(log, 'tPos', np.nan)[order]
+    dtc = np.nan_to_num(numeric_column(log, 'dtc')[order])
+
+    n = len(seconds)
+    boundary = np.ones(n, dtype=bool)
+    boundary[1:] = (device[1:] != device[:-1]) | (trip[1:] != trip[:-1])
+    starts = np.flatnonzero(boundary)
+    ends = np.append(starts[1:], n) - 1
+    samples = ends - starts + 1
+
+    dt = np.zeros(n, dtype=float)
+    dt[1:] = np.diff(seconds)
+    dt[boundary] = 0
+    accel = np.zeros(n, dtype=float)
+    step = (dt > 0) & (dt <= MAX_SAMPLE_GAP_SEC)
+    accel[1:][step[1:]] = (np.diff(speed)[step[1:]] / 3.6) / dt[1:][step[1:]]
+
+    hours = (seconds // 3600) % 24
+    night_start, night_end = NIGHT_HOURS
+    night = (hours >= night_start) | (hours < night_end)
+    idle = (speed < IDLE_SPEED_KMH) & (rpm > 0)
+
+    def count(flags):
+        return np.add.reduceat(flags.astype(np.int64), starts)
+
+    def mean(values):
+        present = ~np.isnan(values)
+        totals = np.add.reduceat(np.where(present, values, 0.0), starts)
+        counts = np.add.reduceat(present.astype(np.int64), starts)
+        return np.divide(totals, counts, out=np.full(len(starts), np.nan), where=counts > 0)
+
+    return pd.DataFrame({
+        'deviceID': device[starts],
+        'tripID': trip[starts],
+        'start_time': seconds[starts].astype('datetime64[s]'),
+        'samples': samples,
+        'duration_sec': (seconds[ends] - seconds[starts]).astype(float),
+        'avg_speed': np.add.reduceat(speed, starts) / samples,
+        'max_speed': np.maximum.reduceat(speed, starts),
+        'speeding_ratio': count(speed > SPEEDING_KMH) / samples,
+        'hard_accels': count(_events(accel > HARSH_ACCEL_MS2, starts)),
+        'hard_brakes': count(_events(accel < HARSH_BRAKE_MS2, starts)),
+        'idle_ratio': count(idle) / samples,
+        'night_driving_ratio': count(night) / samples,
+        'avg_engine_load': mean(engine_load),
+        'avg_throttle': mean(throttle),
+        'has_dtc_errors': count(dtc > 0) > 0
+    })
+
+
+def driver_features(trips: pd.DataFrame) -> pd.DataFrame:
+    """Сводит поездки устройства к признакам модели: night_driving_ratio и avg_trips_per_week."""
+    if trips.empty:
+        return pd.DataFrame(columns=DRIVER_FEATURES)
+
+    grouped = trips.assign(night_samples=trips['night_driving_ratio'] * trips['samples']).groupby('deviceID')
+    span_days = (grouped['start_time'].max() - grouped['start_time'].min()).dt.total_seconds() / 86400
+    weeks = np.maximum(span_days.to_numpy() / 7, 1.0)
+
+    return pd.DataFrame({
+        'deviceID': span_days.index,
+        'night_driving_ratio': (grouped['night_samples'].sum() / grouped['samples'].sum()).to_numpy(),
+        'avg_trips_per_week': grouped.size().to_numpy() / weeks,
+        'hard_brakes_per_hour': (grouped['hard_brakes'].sum() / np.maximum(grouped['duration_sec'].sum() / 3600, 1e-9)).to_numpy(),
+        'has_dtc_errors': grouped['has_dtc_errors'].any().to_numpy()
+    })
@@ -1,27 +1,28 @@
 import os
+import json
+import hashlib
+import logging
 import pandas as pd
 import numpy as np
-from catboost import CatBoostClassifier
-import joblib
-from sklearn.model_selection import train_test_split
-from sklearn.utils.class_weight import compute_class_weight
-from sklearn.metrics import f1_score, recall_score
+
+from src.utils.metrics import BATCH_SIZE, stage
 
 pd.set_option('future.no_silent_downcasting', True)
 
+DTC_KBM_MULTIPLIER = 1.5
+
+logger = logging.getLogger(__name__)
+
+_PREPROCESS = stage('preprocess')
+_GENERATE_FEATURES = stage('generate_features')
+_PREDICT = stage('predict')
+_PREDICT_BATCH = BATCH_SIZE.labels('predict')
+
 
 class InsuranceRiskModel:
-    def __init__(self, model_path: str = None):
-        if model_path and os.path.exists(model_path):
-            if model_path.endswith('.cbm'):
-                self.model = CatBoostClassifier()
-                self.model.load_model(model_path)
-            else:
-                self.model = joblib.load(model_path)
-        else:
-            # ВСЕГДА создаём пустую модель, чтобы избежать AttributeError
-            self.model = CatBoostClassifier()
+    preprocessing_metadata_key = 'insureml_preprocessing'
 
+    def __init__(self, model_path: str = None):
         self.required_features = [
             'driver_age',
             'driver_experience',
@@ -51,19 +52,7 @@ class InsuranceRiskModel:
             "occupation_type"
         ]
 
-        self.threshold = 0.3
-
-    def preprocess(self, input_data: pd.DataFrame) -> pd.DataFrame:
-        df = input_data.copy()
-
-        for col in self.required_features:
-            if col not in df.columns:
-                df[col] = np.nan
-
-        from src.features.feature_engineering import generate_features
-        df = generate_features(df)
-
-        num_features = [
+        self.num_features = [
             'driver_age', 'driver_experience', 'vehicle_age', 'engine_power',
             'pct_days_with_snow', 'pct_days_with_rain', 'winter_duration_months',
             'base_kbm', 'num_claims', 'violation_count', 'days_since_last_claim',
@@ -76,19 +65,7 @@ class InsuranceRiskModel:
             'power_x_age'
         ]
 
-        for col in num_features:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-                median_val = df[col].median()
-                if pd.isna(median_val):
-                    median_val = 0.0
-                df[col] = df[col].fillna(median_val)
-
-        for col in self.cat_features:
-            if col in df.columns:
-                df[col] = df[col].astype(str).fillna("unknown")
-
-        all_features = self.required_features + [
+        self.all_features = self.required_features + [
             'age_squared',
             'experience_ratio',
             'claims_per_year',
@@ -101,13 +78,131 @@ class InsuranceRiskModel:
             'power_x_age'
         ]
 
-        for col in all_features:
+        # Статистики обучающей выборки: на инференсе пропуски заполняются константами,
+        # поэтому результат строки не зависит от остального батча
+        self.fill_values = {}
+        self.cat_vocabularies = {}
+        self.threshold = 0.3
+        self.version = None
+        self._featurizer = None
+        # -1 — все ядра; в многопроцессном режиме каждому воркеру даётся своя доля
+        self.thread_count = -1
+
+        if model_path and os.path.exists(model_path):
+            self.load_model(model_path)
+        else:
+            # ВСЕГДА создаём пустую модель, чтобы избежать AttributeError
+            from catboost import CatBoostClassifier
+            self.model = CatBoostClassifier()
+
+    @classmethod
+    def from_file(cls, path: str) -> 'InsuranceRiskModel':
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Файл модели не найден: {path}")
+        return cls(model_path=path)
+
+    def load_model(self, path: str):
+        if path.endswith('.npz'):
+            from src.models.catboost.numpy_evaluator import NumpyTreeEnsemble
+            self.model = NumpyTreeEnsemble.load(path)
+        elif path.endswith('.cbm'):
+            from catboost import CatBoostClassifier
+            self.model = CatBoostClassifier()
+            self.model.load_model(path)
+        else:
+            import joblib
+            self.model = joblib.load(path)
+        self._load_preprocessing_metadata()
+        self.version = self._file_digest(path)
+        self._featurizer = None
+
+    @staticmethod
+    def _file_digest(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()[:16]
+
+    def _load_preprocessing_metadata(self):
+        raw = dict(self.model.get_metadata()).get(self.preprocessing_metadata_key)
+        if not raw:
+            return
+        meta = json.loads(raw)
+        self.fill_values = meta.get('fill_values', {})
+        self.cat_vocabularies = meta.get('cat_vocabularies', {})
+        self.threshold = meta.get('threshold', self.threshold)
+
+    @property
+    def featurizer(self):
+        if self._featurizer is None:
+            from src.features.row_featurizer import RowFeaturizer
+            self._featurizer = RowFeaturizer(self)
+        return self._featurizer
+
+    def _store_preprocessing_metadata(self):
+        self.model.get_metadata()[self.preprocessing_metadata_key] = json.dumps({
+            'fill_values': self.fill_values,
+            'cat_vocabularies': self.cat_vocabularies,
+            'threshold': float(self.threshold)
+        }, ensure_ascii=False)
+
+    def _build_features(self, input_data: pd.DataFrame) -> pd.DataFrame:
+        df = input_data.copy()
+
+        for col in self.required_features:
             if col not in df.columns:
-                df[col] = 0
+                df[col] = np.nan
+
+        for col in self.required_features:
+            if col not in self.cat_features:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+
+        from src.features.feature_engineering import generate_features
+        with _GENERATE_FEATURES.time():
+            return generate_features(df)
+
+    def fit_preprocessing(self, data: pd.DataFrame):
+        df = self._build_features(data)
 
-        return df[all_features]
+        self.fill_values = {}
+        self._featurizer = None
+        for col in self.num_features:
+            median_val = df[col].median()
+            self.fill_values[col] = 0.0 if pd.isna(median_val) else float(median_val)
+
+        self.cat_vocabularies = {
+            col: sorted(df[col].dropna().astype(str).unique().tolist())
+            for col in self.cat_features
+        }
+
+    def preprocess(self, input_data: pd.DataFrame) -> pd.DataFrame:
+        with _PREPROCESS.time():
+            return self._preprocess(input_data)
+
+    def _preprocess(self, input_data: pd.DataFrame) -> pd.DataFrame:
+        df = self._build_features(input_data)
+
+        for col in self.num_features:
+            df[col] = df[col].fillna(self.fill_values.get(col, 0.0))
+
+        for col in self.cat_features:
+            values = df[col].where(df[col].notna(), "unknown").astype(str)
+            vocabulary = self.cat_vocabularies.get(col)
+            if vocabulary:
+                # Значения, которых не было в обучении, идут в ту же категорию, что и пропуски
+                values = values.where(values.isin(vocabulary), "unknown")
+            df[col] = values
+
+        return df[self.all_features]
 
     def train(self, data: pd.DataFrame, labels: pd.Series):
+        from catboost import CatBoostClassifier
+        from sklearn.model_selection import train_test_split
+        from sklearn.utils.class_weight import compute_class_weight
+        from sklearn.metrics import f1_score, recall_score
+
+        self.fit_preprocessing(data)
         processed = self.preprocess(data)
 
         X_train, X_val, y_train, y_val = train_test_split(
@@ -159,25 +254,118 @@ class InsuranceRiskModel:
                     best_threshold = th
 
         self.threshold = best_threshold
-        print(f"Оптимальный порог: {self.threshold:.3f}, F1: {best_f1:.4f}")
+        logger.info("Оптимальный порог: %.3f, F1: %.4f", self.threshold, best_f1)
 
     def predict_proba(self, case: pd.DataFrame) -> float:
-        processed = self.preprocess(case)
-        proba = self.model.predict_proba(processed)[0][1]
-        return float(proba)
+        return float(self.predict_proba_batch(case)[0])
 
-    def calculate_adjusted_kbm(self, case: pd.DataFrame, base_kbm: float = 1.0,
-                               avg_proba: float = None, beta: float = 1.5) -> float:
-        proba = self.predict_proba(case)
+    def predict_proba_batch(self, data: pd.DataFrame) -> np.ndarray:
+        processed = self.preprocess(data)
+        _PREDICT_BATCH.observe(len(processed))
+        with _PREDICT.time():
+            return self.model.predict_proba(processed, thread_count=self.thread_count)[:, 1]
+
+    def score(self, data: pd.DataFrame, base_kbm=None, has_dtc=False,
+              avg_proba: float = None, beta: float = 1.5) -> pd.DataFrame:
+        proba = self.predict_proba_batch(data)
+
+        if base_kbm is None:
+            if 'base_kbm' in data.columns:
+                base_kbm = pd.to_numeric(data['base_kbm'], errors='coerce').fillna(1.0).to_numpy(dtype=float)
+            else:
+                base_kbm = 1.0
+        base_kbm = np.broadcast_to(np.asarray(base_kbm, dtype=float), proba.shape)
+
+        adjusted_kbm = self.adjust_kbm(proba, base_kbm=base_kbm, avg_proba=avg_proba, beta=beta)
+        final_kbm = np.where(has_dtc, np.minimum(adjusted_kbm * DTC_KBM_MULTIPLIER, 3.92), adjusted_kbm)
+
+        return pd.DataFrame({
+            'proba': proba,
+            'base_kbm': np.round(base_kbm, 2),
+            'adjusted_kbm': adjusted_kbm,
+            'final_kbm': np.round(final_kbm, 2),
+            'has_dtc': np.broadcast_to(np.asarray(has_dtc, dtype=bool), proba.shape)
+        }, index=data.index)
+
+    @staticmethod
+    def resolve_base_kbm(case: dict) -> float:
+        try:
+            base_kbm = float(case.get('base_kbm'))
+        except (TypeError, ValueError):
+            return 1.0
+        return 1.0 if base_kbm != base_kbm else base_kbm
+
+    def score_case(self, case: dict, has_dtc: bool = False,
+                   avg_proba: float = None, beta: float = 1.5) -> dict:
+        return self.score_row(self.featurizer.transform(case), base_kbm=self.resolve_base_kbm(case),
+                              has_dtc=has_dtc, avg_proba=avg_proba, beta=beta)
+
+    def score_row(self, row: list, base_kbm: float = 1.0, has_dtc: bool = False,
+                  avg_proba: float = None, beta: float = 1.5) -> dict:
+        _PREDICT_BATCH.observe(1)
+        with _PREDICT.time():
+            proba = float(self.model.predict_proba(row, thread_count=self.thread_count)[1])
+
+        adjusted_kbm = float(self.adjust_kbm(proba, base_kbm=base_kbm, avg_proba=avg_proba, beta=beta))
+        final_kbm = adjusted_kbm
+        if has_dtc:
+            final_kbm = min(adjusted_kbm * DTC_KBM_MULTIPLIER, 3.92)
+
+        return {
+            'proba': proba,
+            'base_kbm': float(np.round(base_kbm, 2)),
+            'adjusted_kbm': adjusted_kbm,
+            'final_kbm': float(np.round(final_kbm, 2)),
+            'has_dtc': bool(has_dtc)
+        }
+
+    def score_rows(self, rows: list, base_kbm=1.0, has_dtc=False,
+                   avg_proba: float = None, beta: float = 1.5) -> list:
+        # Векторный аналог score_row для готовых векторов признаков: один вызов
+        # модели на весь батч без сборки DataFrame
+        if not rows:
+            return []
+        _PREDICT_BATCH.observe(len(rows))
+        with _PREDICT.time():
+            proba = self.model.predict_proba(rows, thread_count=self.thread_count)[:, 1]
+        base_kbm = np.broadcast_to(np.asarray(base_kbm, dtype=float), proba.shape)
+        has_dtc = np.broadcast_to(np.asarray(has_dtc, dtype=bool), proba.shape)
+
+        adjusted_kbm = self.adjust_kbm(proba, base_kbm=base_kbm, avg_proba=avg_proba, beta=beta)
+        final_kbm = np.where(has_dtc, np.minimum(adjusted_kbm * DTC_KBM_MULTIPLIER, 3.92), adjusted_kbm)
+
+        return [
+            {
+                'proba': float(p),
+                'base_kbm': float(b),
+                'adjusted_kbm': float(a),
+                'final_kbm': float(f),
+                'has_dtc': bool(d)
+            }
+            for p, b, a, f, d in zip(proba, np.round(base_kbm, 2), adjusted_kbm, np.round(final_kbm, 2), has_dtc)
+        ]
+
+    @staticmethod
+    def adjust_kbm(proba, base_kbm=1.0, avg_proba: float = None, beta: float = 1.5) -> np.ndarray:
         if avg_proba is None:
             avg_proba = 0.3
-        kbm_adjusted = base_kbm * (1 + beta * (proba - avg_proba))
-        kbm_final = max(0.46, min(3.92, kbm_adjusted))
-        return round(kbm_final, 2)
+        kbm_adjusted = np.asarray(base_kbm, dtype=float) * (1 + beta * (np.asarray(proba, dtype=float) - avg_proba))
+        return np.round(np.clip(kbm_adjusted, 0.46, 3.92), 2)
+
+    def calculate_adjusted_kbm(self, case: pd.DataFrame, base_kbm: float = 1.0,
+                               avg_proba: float = None, beta: float = 1.5) -> float:
+        scores = self.score(case, base_kbm=base_kbm, avg_proba=avg_proba, beta=beta)
+        return float(scores['adjusted_kbm'].iloc[0])
 
     def save_model(self, path: str):
         os.makedirs(os.path.dirname(path), exist_ok=True)
+        if path.endswith('.npz'):
+            from src.models.catboost.tree_export import export_oblivious_trees
+            export_oblivious_trees(self, path)
+            return
+        self._store_preprocessing_metadata()
         if path.endswith('.cbm'):
             self.model.save_model(path)
         else:
+            import joblib
             joblib.dump(self.model, path)
\ No newline at end of file
@@ -0,0 +1,210 @@
+import json
+
+import numpy as np
+
+SPLIT_FLOAT = 0
+SPLIT_ONE_HOT = 1
+SPLIT_CTR = 2
+
+ELEMENT_CAT = 0
+ELEMENT_FLOAT = 1
+ELEMENT_ONE_HOT = 2
+
+CTR_BORDERS = 0
+CTR_COUNTER = 1
+
+# Хеш категории, которой не было в обучении: в таблицах CTR его нет, поэтому
+# значение считается по приору — так же, как у CatBoost для новых значений
+UNKNOWN_CAT_HASH = 0x7FFFFFFF
+
+_HASH_MULT = np.uint64(0x4906BA494954CB65)
+
+
+def _calc_hash(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    with np.errstate(over='ignore'):
+        return _HASH_MULT * (a + _HASH_MULT * b)
+
+
+class NumpyTreeEnsemble:
+    """Вычислитель симметричных деревьев CatBoost на чистом NumPy.
+
+    Загружает массивы, выгруженные src.models.catboost.tree_export, и повторяет
+    predict_proba CatBoostClassifier, включая CTR по категориальным признакам.
+    """
+
+    block_size = 8192
+
+    def __init__(self, arrays: dict):
+        meta = json.loads(str(arrays['meta']))
+        self.feature_names = meta['feature_names']
+        self.metadata = meta.get('metadata', {})
+        self.scale = float(meta['scale'])
+        self.bias = float(meta['bias'])
+
+        self.float_columns = arrays['float_columns']
+        self.cat_columns = arrays['cat_columns']
+        self.float_names = [self.feature_names[i] for i in self.float_columns]
+        self.cat_names = [self.feature_names[i] for i in self.cat_columns]
+        self.cat_hashes = dict(zip(arrays['cat_values'].tolist(), arrays['cat_value_hashes'].tolist()))
+
+        self.split_kind = arrays['split_kind']
+        self.split_feature = arrays['split_feature']
+        self.split_border = arrays['split_border']
+        self.split_value = arrays['split_value']
+
+        self.tree_depth = arrays['tree_depth']
+        self.tree_split_offset = arrays['tree_split_offset']
+        self.tree_splits = arrays['tree_splits']
+        self.tree_leaf_offset = arrays['tree_leaf_offset']
+        self.leaf_values = arrays['leaf_values']
+
+        self.ctr_type = arrays['ctr_type']
+        self.ctr_table = arrays['ctr_table']
+        self.ctr_target_border = arrays['ctr_target_border']
+        self.ctr_params = arrays['ctr_params']
+        self.ctr_element_offset = arrays['ctr_element_offset']
+        self.ctr_element_kind = arrays['ctr_element_kind']
+        self.ctr_element_feature = arrays['ctr_element_feature']
+        self.ctr_element_border = arrays['ctr_element_border']
+        self.ctr_element_value = arrays['ctr_element_value']
+
+        self.table_offset = arrays['table_offset']
+        self.table_keys = arrays['table_keys']
+        self.table_counts = arrays['table_counts']
+        self.table_denominator = arrays['table_denominator']
+
+        # CTR с разными приорами считаются по одной проекции и одной таблице
+        self._ctr_projection = [
+            tuple(
+                (int(self.ctr_element_kind[e]), int(self.ctr_element_feature[e]),
+                 float(self.ctr_element_border[e]), int(self.ctr_element_value[e]))
+                for e in range(self.ctr_element_offset[k], self.ctr_element_offset[k + 1])
+            )
+            for k in range(len(self.ctr_type))
+        ]
+
+        self._depth_groups = [
+            (depth, np.flatnonzero(self.tree_depth == depth))
+            for depth in np.unique(self.tree_depth)
+        ]
+
+    @classmethod
+    def load(cls, path: str) -> 'NumpyTreeEnsemble':
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def get_metadata(self) -> dict:
+        return self.metadata
+
+    @property
+    def tree_count_(self) -> int:
+        return len(self.tree_depth)
+
+    def predict_proba(self, data, thread_count: int = -1) -> np.ndarray:
+        # thread_count принимается ради совместимости с CatBoostClassifier
+        single_row = False
+        if hasattr(data, 'columns'):
+            floats = data[self.float_names].to_numpy(dtype=np.float32)
+            cats = data[self.cat_names].to_numpy()
+        else:
+            rows = list(data)
+            if rows and not isinstance(rows[0], (list, tuple, np.ndarray)):
+                rows = [rows]
+                single_row = True
+            floats = np.array([[row[i] for i in self.float_columns] for row in rows], dtype=np.float32)
+            cats = np.array([[row[i] for i in self.cat_columns] for row in rows], dtype=object)
+        floats = floats.reshape(-1, len(self.float_columns))
+        cats = cats.reshape(-1, len(self.cat_columns))
+
+        proba = 1.0 / (1.0 + np.exp(-self.predict_raw(floats, self._hash_categories(cats))))
+        result = np.column_stack([1.0 - proba, proba])
+        return result[0] if single_row else result
+
+    def predict_raw(self, floats: np.ndarray, cat_hashes: np.ndarray) -> np.ndarray:
+        raw = np.empty(len(floats), dtype=np.float64)
+        for start in range(0, len(floats), self.block_size):
+            stop = start + self.block_size
+            raw[start:stop] = self._predict_block(floats[start:stop], cat_hashes[start:stop])
+        return self.scale * raw + self.bias
+
+    def _hash_categories(self, cats: np.ndarray) -> np.ndarray:
+        hashes = np.empty(cats.shape, dtype=np.uint64)
+        for j in range(cats.shape[1]):
+            values, inverse = np.unique(cats[:, j].astype(str), return_inverse=True)
+            lookup = np.array([self.cat_hashes.get(v, UNKNOWN_CAT_HASH) for v in values], dtype=np.int64)
+            hashes[:, j] = lookup.astype(np.uint64)[inverse.reshape(-1)]
+        return hashes
+
+    def _projection_hash(self, elements: tuple, floats: np.ndarray, cat_hashes: np.ndarray) -> np.ndarray:
+        projection = np.zeros(len(floats), dtype=np.uint64)
+        for kind, feature, border, expected in elements:
+            if kind == ELEMENT_CAT:
+                value = cat_hashes[:, feature]
+            elif kind == ELEMENT_FLOAT:
+                value = (floats[:, feature] > np.float32(border)).astype(np.uint64)
+            else:
+                value = (cat_hashes[:, feature] == np.uint64(expected)).astype(np.uint64)
+            projection = _calc_hash(projection, value)
+        return projection
+
+    def _ctr_values(self, floats: np.ndarray, cat_hashes: np.ndarray) -> np.ndarray:
+        ctrs = np.empty((len(floats), len(self.ctr_type)), dtype=np.float32)
+        projections = {}
+        lookups = {}
+        for k in range(len(self.ctr_type)):
+            elements = self._ctr_projection[k]
+            if elements not in projections:
+                projections[elements] = self._projection_hash(elements, floats, cat_hashes)
+            projection = projections[elements]
+
+            table = self.ctr_table[k]
+            start, stop = self.table_offset[table], self.table_offset[table + 1]
+            counts = self.table_counts[start:stop]
+            if not len(counts):
+                counts = np.zeros((1, self.table_counts.shape[1]), dtype=self.table_counts.dtype)
+            if (table, elements) not in lookups:
+                keys = self.table_keys[start:stop]
+                pos = np.minimum(np.searchsorted(keys, projection), max(len(keys) - 1, 0))
+                found = keys[pos] == projection if len(keys) else np.zeros(len(projection), dtype=bool)
+                lookups[(table, elements)] = (pos, found)
+            pos, found = lookups[(table, elements)]
+
+            if self.ctr_type[k] == CTR_COUNTER:
+                good = np.where(found, counts[pos, 0], 0).astype(np.float32)
+                total = np.where(found, self.table_denominator[table], 0).astype(np.float32)
+            else:
+                good = np.where(found, counts[pos, self.ctr_target_border[k] + 1], 0).astype(np.float32)
+                total = np.where(found, counts[pos].sum(axis=1), 0).astype(np.float32)
+
+            prior_num, prior_denom, shift, scale = self.ctr_params[k]
+            ctrs[:, k] = ((good + prior_num) / (total + prior_denom) + shift) * scale
+        return ctrs
+
+    def _predict_block(self, floats: np.ndarray, cat_hashes: np.ndarray) -> np.ndarray:
+        # Бинарные признаки храним по строкам сплитов: так индекс листа каждого дерева
+        # собирается из непрерывных векторов сдвигами и OR
+        bits = np.empty((len(self.split_kind), len(floats)), dtype=np.uint8)
+
+        float_splits = np.flatnonzero(self.split_kind == SPLIT_FLOAT)
+        bits[float_splits] = floats.T[self.split_feature[float_splits]] > self.split_border[float_splits, None]
+
+        one_hot_splits = np.flatnonzero(self.split_kind == SPLIT_ONE_HOT)
+        if len(one_hot_splits):
+            bits[one_hot_splits] = (
+                cat_hashes.T[self.split_feature[one_hot_splits]] == self.split_value[one_hot_splits, None]
+            )
+
+        ctr_splits = np.flatnonzero(self.split_kind == SPLIT_CTR)
+        if len(ctr_splits):
+            ctrs = self._ctr_values(floats, cat_hashes)
+            bits[ctr_splits] = ctrs.T[self.split_feature[ctr_splits]] > self.split_border[ctr_splits, None]
+
+        raw = np.zeros(len(floats), dtype=np.float64)
+        for depth, trees in self._depth_groups:
+            offsets = self.tree_split_offset[trees]
+            leaf_index = np.zeros((len(trees), len(floats)), dtype=np.int64)
+            for level in range(depth):
+                leaf_index |= bits[self.tree_splits[offsets + level]].astype(np.int64) << level
+            leaf_index += self.tree_leaf_offset[trees, None]
+            raw += self.leaf_values[leaf_index].sum(axis=0)
+        return raw
@@ -1,6 +1,10 @@
+import logging
+
 import pandas as pd
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
 def preprocess(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
 
@@ -35,5 +39,5 @@ def preprocess(df: pd.DataFrame) -> pd.DataFrame:
     for col in ['num_claims', 'violation_count', 'num_owned_vehicles']:
         df[col] = df[col].astype(int)
 
-    print("Предобработка завершена")
+    logger.debug("Предобработка завершена")
     return df
\ No newline at end of file
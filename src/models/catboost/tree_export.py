@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src.models.catboost.insurance_model import InsuranceRiskModel
+from src.models.catboost.numpy_evaluator import (
+    CTR_BORDERS, CTR_COUNTER, ELEMENT_CAT, ELEMENT_FLOAT, ELEMENT_ONE_HOT,
+    SPLIT_CTR, SPLIT_FLOAT, SPLIT_ONE_HOT, NumpyTreeEnsemble
+)
+
+_EMPTY_BUCKET = (1 << 64) - 1
+
+
+def _signed_hash(value: int) -> int:
+    # CatBoost хранит хеш категории как ui32, но в хеш комбинаций он попадает
+    # расширенным по знаку до 64 бит
+    value = int(value)
+    return value - (1 << 32) if value >= (1 << 31) else value
+
+
+def _category_sample(model: InsuranceRiskModel, sample: pd.DataFrame = None) -> pd.DataFrame:
+    vocabularies = {col: set(values) | {"unknown"} for col, values in model.cat_vocabularies.items()}
+    if sample is not None:
+        processed = model.preprocess(sample)
+        for col in model.cat_features:
+            vocabularies.setdefault(col, {"unknown"}).update(processed[col].unique().tolist())
+
+    # CatBoost требует в пуле все категориальные признаки модели, иначе падает на сверке пула
+    missing = [col for col in model.cat_features if col not in vocabularies]
+    if missing:
+        raise ValueError(f"В модели нет словарей категорий для {', '.join(missing)}: "
+                         f"передайте sample с обучающими данными")
+
+    size = max(len(v) for v in vocabularies.values())
+    rows = pd.DataFrame(0.0, index=range(size), columns=model.all_features)
+    for col in model.cat_features:
+        values = sorted(vocabularies.get(col, {"unknown"}))
+        rows[col] = [values[i % len(values)] for i in range(size)]
+    return rows
+
+
+def _dump_catboost_json(model: InsuranceRiskModel, sample: pd.DataFrame = None) -> dict:
+    from catboost import Pool
+
+    pool = Pool(_category_sample(model, sample), cat_features=model.cat_features)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.json")
+        model.model.save_model(path, format='json', pool=pool)
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def _ctr_element(element: dict) -> tuple:
+    kind = element['combination_element']
+    if kind == 'cat_feature_value':
+        return ELEMENT_CAT, element['cat_feature_index'], 0.0, 0
+    if kind == 'float_feature':
+        return ELEMENT_FLOAT, element['float_feature_index'], element['border'], 0
+    if kind == 'cat_feature_exact_value':
+        return ELEMENT_ONE_HOT, element['cat_feature_index'], 0.0, _signed_hash(element['value'])
+    raise ValueError(f"Неподдерживаемый элемент CTR: {kind}")
+
+
+def export_oblivious_trees(model: InsuranceRiskModel, path: str, sample: pd.DataFrame = None) -> str:
+    dump = _dump_catboost_json(model, sample)
+    info = dump['features_info']
+
+    float_features = sorted(info.get('float_features', []), key=lambda f: f['feature_index'])
+    cat_features = sorted(info.get('categorical_features', []), key=lambda f: f['feature_index'])
+    ctrs = info.get('ctrs', [])
+
+    cat_values = [item['value'] for item in info.get('cat_features_hash', [])]
+    cat_value_hashes = [_signed_hash(item['hash']) for item in info.get('cat_features_hash', [])]
+
+    # Порядок бинарных признаков CatBoost: границы float, затем one-hot, затем CTR;
+    # split_index в дереве указывает на позицию в этом списке
+    ctr_borders = [(k, border) for k, ctr in enumerate(ctrs) for border in ctr['borders']]
+    ctr_split_base = sum(len(f.get('borders') or []) for f in float_features)
+    ctr_split_base += sum(len(f.get('values') or []) for f in cat_features)
+
+    split_kind, split_feature, split_border, split_value = [], [], [], []
+    tree_depth, tree_splits, tree_split_offset, tree_leaf_offset, leaf_values = [], [], [], [], []
+    for tree in dump['oblivious_trees']:
+        tree_split_offset.append(len(tree_splits))
+        tree_leaf_offset.append(len(leaf_values))
+        # У дерева глубины 0 CatBoost пишет "splits": null и один лист
+        splits = tree['splits'] or []
+        tree_depth.append(len(splits))
+        leaf_values.extend(tree['leaf_values'])
+        for split in splits:
+            tree_splits.append(len(split_kind))
+            if split['split_type'] == 'FloatFeature':
+                split_kind.append(SPLIT_FLOAT)
+                split_feature.append(split['float_feature_index'])
+                split_border.append(split['border'])
+                split_value.append(0)
+            elif split['split_type'] == 'OneHotFeature':
+                split_kind.append(SPLIT_ONE_HOT)
+                split_feature.append(split['cat_feature_index'])
+                split_border.append(0.0)
+                split_value.append(_signed_hash(split['value']))
+            elif split['split_type'] == 'OnlineCtr':
+                ctr_index, border = ctr_borders[split['split_index'] - ctr_split_base]
+                split_kind.append(SPLIT_CTR)
+                split_feature.append(ctr_index)
+                split_border.append(border)
+                split_value.append(0)
+            else:
+                raise ValueError(f"Неподдерживаемый тип сплита: {split['split_type']}")
+
+    table_ids = {}
+    table_keys, table_counts, table_offset, table_denominator = [], [], [0], []
+    ctr_type, ctr_table, ctr_target_border, ctr_params = [], [], [], []
+    ctr_element_offset = [0]
+    ctr_element_kind, ctr_element_feature, ctr_element_border, ctr_element_value = [], [], [], []
+    for ctr in ctrs:
+        if ctr['ctr_type'] not in ('Borders', 'Counter'):
+            raise ValueError(f"Неподдерживаемый тип CTR: {ctr['ctr_type']}")
+
+        identifier = ctr['identifier']
+        if identifier not in table_ids:
+            table = dump['ctr_data'][identifier]
+            stride = table['hash_stride']
+            entries = sorted(
+                (int(table['hash_map'][i]), table['hash_map'][i + 1:i + stride])
+                for i in range(0, len(table['hash_map']), stride)
+                if int(table['hash_map'][i]) != _EMPTY_BUCKET
+            )
+            table_ids[identifier] = len(table_denominator)
+            table_keys.extend(key for key, _ in entries)
+            table_counts.extend(counts for _, counts in entries)
+            table_offset.append(len(table_keys))
+            table_denominator.append(table.get('counter_denominator', 0))
+
+        ctr_type.append(CTR_COUNTER if ctr['ctr_type'] == 'Counter' else CTR_BORDERS)
+        ctr_table.append(table_ids[identifier])
+        ctr_target_border.append(ctr.get('target_border_idx', 0))
+        ctr_params.append([ctr['prior_numerator'], ctr['prior_denomerator'], ctr['shift'], ctr['scale']])
+
+        elements = [_ctr_element(e) for e in ctr['elements']]
+        elements.sort(key=lambda e: e[0] != ELEMENT_CAT)
+        for kind, feature, border, value in elements:
+            ctr_element_kind.append(kind)
+            ctr_element_feature.append(feature)
+            ctr_element_border.append(border)
+            ctr_element_value.append(value)
+        ctr_element_offset.append(len(ctr_element_kind))
+
+    width = max((len(c) for c in table_counts), default=1)
+    counts_matrix = np.zeros((len(table_counts), width), dtype=np.int64)
+    for i, counts in enumerate(table_counts):
+        counts_matrix[i, :len(counts)] = counts
+
+    scale, biases = dump['scale_and_bias']
+    meta = {
+        'feature_names': list(model.all_features),
+        'scale': scale,
+        'bias': biases[0] if biases else 0.0,
+        'metadata': {
+            model.preprocessing_metadata_key: json.dumps({
+                'fill_values': model.fill_values,
+                'cat_vocabularies': model.cat_vocabularies,
+                'threshold': float(model.threshold)
+            }, ensure_ascii=False)
+        }
+    }
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    np.savez_compressed(
+        path,
+        meta=np.array(json.dumps(meta, ensure_ascii=False)),
+        float_columns=np.array([f['flat_feature_index'] for f in float_features], dtype=np.int32),
+        cat_columns=np.array([f['flat_feature_index'] for f in cat_features], dtype=np.int32),
+        cat_values=np.array(cat_values, dtype=str),
+        cat_value_hashes=np.array(cat_value_hashes, dtype=np.int64),
+        split_kind=np.array(split_kind, dtype=np.uint8),
+        split_feature=np.array(split_feature, dtype=np.int32),
+        split_border=np.array(split_border, dtype=np.float32),
+        split_value=np.array(split_value, dtype=np.int64).astype(np.uint64),
+        tree_depth=np.array(tree_depth, dtype=np.int32),
+        tree_split_offset=np.array(tree_split_offset, dtype=np.int64),
+        tree_splits=np.array(tree_splits, dtype=np.int64),
+        tree_leaf_offset=np.array(tree_leaf_offset, dtype=np.int64),
+        leaf_values=np.array(leaf_values, dtype=np.float64),
+        ctr_type=np.array(ctr_type, dtype=np.uint8),
+        ctr_table=np.array(ctr_table, dtype=np.int32),
+        ctr_target_border=np.array(ctr_target_border, dtype=np.int32),
+        ctr_params=np.array(ctr_params, dtype=np.float32).reshape(-1, 4),
+        ctr_element_offset=np.array(ctr_element_offset, dtype=np.int64),
+        ctr_element_kind=np.array(ctr_element_kind, dtype=np.uint8),
+        ctr_element_feature=np.array(ctr_element_feature, dtype=np.int32),
+        ctr_element_border=np.array(ctr_element_border, dtype=np.float32),
+        ctr_element_value=np.array(ctr_element_value, dtype=np.int64).astype(np.uint64),
+        table_offset=np.array(table_offset, dtype=np.int64),
+        table_keys=np.array(table_keys, dtype=np.uint64),
+        table_counts=counts_matrix,
+        table_denominator=np.array(table_denominator, dtype=np.int64)
+    )
+    return path if path.endswith('.npz') else f"{path}.npz"
+
+
+def verify_export(model: InsuranceRiskModel, exported: NumpyTreeEnsemble, data: pd.DataFrame,
+                  tolerance: float = 1e-9) -> float:
+    processed = model.preprocess(data)
+    expected = model.model.predict_proba(processed)[:, 1]
+    actual = exported.predict_proba(processed)[:, 1]
+    max_diff = float(np.max(np.abs(expected - actual))) if len(processed) else 0.0
+    if max_diff > tolerance:
+        raise AssertionError(f"Расхождение с CatBoost {max_diff:.3e} превышает {tolerance:.0e}")
+    return max_diff
+
+
+def main():
+    from src.models.registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Экспорт CatBoost-модели в массивы NumPy")
+    parser.add_argument("--model", default=None, help="артефакт модели, по умолчанию последний в outputs/")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--sample", "--data", dest="data", default=None,
+                        help="CSV с примерами для словарей категорий и проверки")
+    parser.add_argument("--verify", action="store_true", help="сравнить выход с CatBoost")
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    args = parser.parse_args()
+
+    model_path = args.model or ModelRegistry().resolve_path()
+    model = InsuranceRiskModel(model_path=model_path)
+    sample = pd.read_csv(args.data) if args.data else None
+    output = args.output or f"{os.path.splitext(model_path)[0]}.npz"
+
+    try:
+        output = export_oblivious_trees(model, output, sample=sample)
+    except ValueError as e:
+        raise SystemExit(f"Экспорт {model_path} невозможен: {e}. Передайте --sample с CSV обучающих данных")
+    print(f"Модель экспортирована в {output}")
+
+    if args.verify:
+        if sample is None:
+            raise SystemExit("Для проверки нужен --sample")
+        max_diff = verify_export(model, NumpyTreeEnsemble.load(output), sample, args.tolerance)
+        print(f"Проверка пройдена: максимальное расхождение {max_diff:.3e}")
+
+
+if __name__ == "__main__":
+    main()
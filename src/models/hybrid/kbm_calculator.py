@@ -1,76 +1,199 @@
 from src.models.catboost.insurance_model import InsuranceRiskModel
+from src.models.hybrid.prediction_cache import PredictionCache, feature_key
 from src.utils.dtc_checker import check_dtc_in_file
+from src.utils.log import lazy
+from src.utils.metrics import stage
+import logging
+import os
 import pandas as pd
-import matplotlib.pyplot as plt
+
+logger = logging.getLogger(__name__)
+
+_FEATURIZE = stage('featurize')
 
 
 class HybridKBMCalculator:
-    def __init__(self, model_path: str = "outputs/insurance_model_v1.cbm"):
-        self.model = InsuranceRiskModel()
+    result_columns = ['Описание', 'Вероятность ДТП', 'Базовый КБМ', 'Рекомендуемый КБМ', 'Итоговый КБМ', 'Корректировки']
+
+    def __init__(self, model_path: str = "outputs/insurance_model_v1.cbm",
+                 cache_size: int = 10000, cache_ttl: float = 300.0,
+                 model: InsuranceRiskModel = None, cache: PredictionCache = None, profiles=None):
+        # profiles — DeviceProfileStore: анкета с device_id дополняется телематикой устройства
+        self.profiles = profiles
+        if cache is not None:
+            self.cache = cache
+        else:
+            self.cache = PredictionCache(maxsize=cache_size, ttl=cache_ttl) if cache_size else None
+
+        if model is not None:
+            self.model = model
+            return
 
-        if not model_path.startswith("outputs/"):
-            model_path = f"outputs/{model_path}"
+        # Старые вызовы передавали имя файла относительно outputs/
+        if not os.path.exists(model_path) and not model_path.startswith("outputs/"):
+            model_path = os.path.join("outputs", model_path)
 
         if model_path.endswith(".cbm"):
             try:
-                self.model.model.load_model(model_path)
-                print(f"Модель загружена из {model_path}")
+                self.model = InsuranceRiskModel.from_file(model_path)
+                logger.info("Модель загружена из %s", model_path)
             except Exception as e:
                 raise RuntimeError(f"Ошибка загрузки .cbm модели: {e}")
         else:
             try:
-                loaded_obj = InsuranceRiskModel(model_path=model_path)
-                self.model.model = loaded_obj.model
-                print(f"Модель загружена из {model_path} (joblib)")
+                self.model = InsuranceRiskModel.from_file(model_path)
+                loader = "numpy" if model_path.endswith(".npz") else "joblib"
+                logger.info("Модель загружена из %s (%s)", model_path, loader)
             except Exception as e:
                 raise FileNotFoundError(f"Не удалось загрузить модель: {e}")
 
-    def calculate(self, cases: list, obd_file_path: str = None, show_plot: bool = True) -> pd.DataFrame:
-        has_dtc = False
+    @staticmethod
+    def _resolve_dtc(obd_file_path: str = None, dtc=None) -> bool:
+        # Готовый вердикт (DtcVerdict или bool) избавляет от повторного скана лога
+        if dtc is not None:
+            return bool(dtc)
         if obd_file_path:
-            has_dtc = check_dtc_in_file(obd_file_path)
-
-        results = []
-        for case in cases:
-            data = {k: [v] for k, v in case.items() if k != 'description'}
-            df = pd.DataFrame(data)
-
-            proba = self.model.predict_proba(df)
-            base_kbm = case.get('base_kbm', 1.0)
-            adjusted_kbm = self.model.calculate_adjusted_kbm(df, base_kbm=base_kbm)
-
-            final_kbm = adjusted_kbm
-            adjustments = []
-
-            if has_dtc:
-                final_kbm *= 1.5
-                final_kbm = min(final_kbm, 3.92)
-                adjustments.append("наличие DTC")
-
-            results.append({
-                'Описание': case['description'],
-                'Вероятность ДТП': f"{proba:.2%}",
-                'Базовый КБМ': round(base_kbm, 2),
-                'Рекомендуемый КБМ': round(adjusted_kbm, 2),
-                'Итоговый КБМ': round(final_kbm, 2),
-                'Корректировки': ', '.join(adjustments) if adjustments else 'нет'
-            })
-
-        results_df = pd.DataFrame(results)
-
-        print("\n" + "=" * 80)
-        print("РЕЗУЛЬТАТЫ ГИБРИДНОГО РАСЧЁТА КБМ")
-        print("=" * 80)
-        print(results_df.to_string(index=False))
-        print("=" * 80)
+            return check_dtc_in_file(obd_file_path)
+        return False
+
+    def _apply_profile(self, case: dict, has_dtc: bool) -> tuple:
+        if self.profiles is None or case.get('device_id') is None:
+            return case, has_dtc
+        features = self.profiles.case_features(case['device_id'])
+        if not features:
+            return case, has_dtc
+        # Значения из анкеты важнее накопленного профиля
+        case = dict(case)
+        for key in ('night_driving_ratio', 'avg_trips_per_week'):
+            if case.get(key) is None:
+                case[key] = features[key]
+        return case, has_dtc or features['has_dtc']
+
+    def score(self, cases: list, obd_file_path: str = None, use_cache: bool = False, dtc=None) -> pd.DataFrame:
+        has_dtc = self._resolve_dtc(obd_file_path, dtc)
+
+        descriptions = [case.get('description', '') for case in cases]
+
+        if not cases:
+            return pd.DataFrame(columns=self.result_columns)
+
+        if use_cache and self.cache is not None:
+            scores = pd.DataFrame(self._cached_scores(cases, has_dtc))
+        else:
+            df = pd.DataFrame([{k: v for k, v in case.items() if k != 'description'} for case in cases])
+            scores = self.model.score(df, has_dtc=has_dtc)
+
+        return pd.DataFrame({
+            'Описание': descriptions,
+            'Вероятность ДТП': scores['proba'].to_numpy(),
+            'Базовый КБМ': scores['base_kbm'].to_numpy(),
+            'Рекомендуемый КБМ': scores['adjusted_kbm'].to_numpy(),
+            'Итоговый КБМ': scores['final_kbm'].to_numpy(),
+            'Корректировки': 'наличие DTC' if has_dtc else 'нет'
+        })
+
+    def score_case(self, case: dict, obd_file_path: str = None, dtc=None) -> dict:
+        has_dtc = self._resolve_dtc(obd_file_path, dtc)
+        case, has_dtc = self._apply_profile(case, has_dtc)
+
+        if self.cache is not None:
+            scores = self._cached_scores([case], has_dtc)[0]
+        else:
+            scores = self.model.score_case(case, has_dtc=has_dtc)
+        return self._result_row(case, scores)
+
+    def score_batch(self, cases: list, has_dtc=False) -> list:
+        """Оценивает несколько анкет одним вызовом модели; has_dtc — общий флаг
+        или список флагов по анкетам."""
+        if not isinstance(has_dtc, (list, tuple)):
+            has_dtc = [has_dtc] * len(cases)
+        if self.profiles is not None:
+            profiled = [self._apply_profile(case, flag) for case, flag in zip(cases, has_dtc)]
+            cases = [case for case, _ in profiled]
+            has_dtc = [flag for _, flag in profiled]
+
+        if self.cache is not None:
+            scores = self._cached_scores(cases, has_dtc)
+        else:
+            featurizer = self.model.featurizer
+            with _FEATURIZE.time():
+                rows = [featurizer.transform(case) for case in cases]
+                base_kbms = [self.model.resolve_base_kbm(case) for case in cases]
+            scores = self.model.score_rows(rows, base_kbm=base_kbms, has_dtc=has_dtc)
+        return [self._result_row(case, record) for case, record in zip(cases, scores)]
+
+    @staticmethod
+    def _result_row(case: dict, scores: dict) -> dict:
+        return {
+            'Описание': case.get('description', ''),
+            'Вероятность ДТП': scores['proba'],
+            'Базовый КБМ': scores['base_kbm'],
+            'Рекомендуемый КБМ': scores['adjusted_kbm'],
+            'Итоговый КБМ': scores['final_kbm'],
+            'Корректировки': 'наличие DTC' if scores['has_dtc'] else 'нет'
+        }
+
+    def _cached_scores(self, cases: list, has_dtc) -> list:
+        # Ключ — канонизированный вектор признаков, а не description: одинаковые
+        # анкеты с разными подписями попадают в одну запись. Версия модели в ключе:
+        # батч старой модели, завершившийся после подмены, не подменит ответы новой
+        version = self.model.version or ''
+        if not isinstance(has_dtc, (list, tuple)):
+            has_dtc = [has_dtc] * len(cases)
+
+        featurizer = self.model.featurizer
+        rows, base_kbms, keys, results, misses = [], [], [], [], []
+        with _FEATURIZE.time():
+            for i, case in enumerate(cases):
+                row = featurizer.transform(case)
+                base_kbm = self.model.resolve_base_kbm(case)
+                key = feature_key(row, base_kbm, bool(has_dtc[i]), version)
+                cached = self.cache.get(key)
+                rows.append(row)
+                base_kbms.append(base_kbm)
+                keys.append(key)
+                results.append(cached)
+                if cached is None:
+                    misses.append(i)
+
+        if len(misses) == 1:
+            i = misses[0]
+            results[i] = self.model.score_row(rows[i], base_kbm=base_kbms[i], has_dtc=bool(has_dtc[i]))
+            self.cache.put(keys[i], results[i])
+        elif misses:
+            scores = self.model.score_rows(
+                [rows[i] for i in misses],
+                base_kbm=[base_kbms[i] for i in misses],
+                has_dtc=[bool(has_dtc[i]) for i in misses]
+            )
+            for i, record in zip(misses, scores):
+                results[i] = record
+                self.cache.put(keys[i], record)
+
+        return results
+
+    def calculate(self, cases: list, obd_file_path: str = None, show_plot: bool = True, dtc=None) -> pd.DataFrame:
+        results_df = self.score(cases, obd_file_path=obd_file_path, dtc=dtc)
+
+        # Таблица форматируется только при включённом DEBUG и в потоке записи лога
+        logger.debug("Результаты гибридного расчёта КБМ:\n%s",
+                     lazy(lambda: self.format_results(results_df).to_string(index=False)))
 
         if show_plot:
             self._plot_results(results_df)
 
         return results_df
 
+    @staticmethod
+    def format_results(results_df: pd.DataFrame) -> pd.DataFrame:
+        formatted = results_df.copy()
+        formatted['Вероятность ДТП'] = formatted['Вероятность ДТП'].map('{:.2%}'.format)
+        return formatted
+
     @staticmethod
     def _plot_results(results_df: pd.DataFrame):
+        import matplotlib.pyplot as plt
+
         plt.figure(figsize=(12, 6))
         bars = plt.barh(results_df['Описание'], results_df['Итоговый КБМ'], color='skyblue', edgecolor='black')
         plt.title("Итоговый КБМ после учёта DTC", fontsize=16)
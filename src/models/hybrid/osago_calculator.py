@@ -1,11 +1,14 @@
 from src.models.hybrid.kbm_calculator import HybridKBMCalculator
+import logging
 import pandas as pd
 
+logger = logging.getLogger(__name__)
+
 
 class OSAGOCalculator:
     def __init__(self, model_path: str = "outputs/insurance_model_v1.cbm"):
         self.kbm_model = HybridKBMCalculator(model_path=model_path)
-        print("Гибридный калькулятор ОСАГО загружен")
+        logger.info("Гибридный калькулятор ОСАГО загружен")
 
     def calculate_osago_premium(
         self,
@@ -19,14 +22,13 @@ class OSAGOCalculator:
         season_coeff: float = 1.0
     ) -> dict:
 
-        kbm_result_df = self.kbm_model.calculate(
+        kbm_result_df = self.kbm_model.score(
             cases=[driver_data.iloc[0].to_dict()],
-            obd_file_path=obd_file_path,
-            show_plot=False
+            obd_file_path=obd_file_path
         )
 
         final_kbm = kbm_result_df['Итоговый КБМ'].iloc[0]
-        print(f" Итоговый КБМ (гибридный): {final_kbm}")
+        logger.debug("Итоговый КБМ (гибридный): %s", final_kbm)
 
         ko_coeff = 1.0
         if unlimited_drivers:
@@ -0,0 +1,18 @@
+import hashlib
+import time
+
+from src.utils.lru_cache import LruCache
+
+
+def feature_key(row: list, *extra) -> bytes:
+    # repr у строк всегда в кавычках, а у чисел нет, поэтому склейка однозначна
+    canonical = ','.join(repr(v) if isinstance(v, str) else repr(float(v)) for v in (*row, *extra))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).digest()
+
+
+class PredictionCache(LruCache):
+    """LRU-кэш результатов модели с TTL. Версия модели входит в ключ (feature_key),
+    поэтому после подмены модели записи старой версии не отдаются и вытесняются по LRU."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0, clock=time.monotonic):
+        super().__init__(maxsize=maxsize, ttl=ttl, clock=clock)
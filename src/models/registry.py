@@ -0,0 +1,222 @@
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from src.models.hybrid.prediction_cache import PredictionCache
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_PATTERN = re.compile(r"^insurance_model_v(\d+)\.(cbm|npz|pkl)$")
+EXTENSION_PRIORITY = {'cbm': 0, 'npz': 1, 'pkl': 2}
+
+
+def synthetic_cases(model, n: int = 32) -> list:
+    cases = []
+    for i in range(n):
+        case = {}
+        for col in model.required_features:
+            if col in model.cat_features:
+                vocabulary = model.cat_vocabularies.get(col) or ["unknown"]
+                case[col] = vocabulary[i % len(vocabulary)]
+            else:
+                case[col] = model.fill_values.get(col, 1.0) * (1 + 0.1 * (i % 5))
+        cases.append(case)
+    return cases
+
+
+class ModelRegistry:
+    """Загружает версионированные артефакты модели, прогревает их и атомарно
+    подменяет активный калькулятор без остановки приложения.
+
+    pandas, CatBoost и сама модель импортируются только при загрузке, поэтому
+    модуль можно импортировать в веб-приложении до старта сервера.
+    """
+
+    def __init__(self, model_dir: str = "outputs", model_path: str = None,
+                 cache_size: int = 10000, cache_ttl: float = 300.0, warmup_cases: int = 32,
+                 thread_count: int = -1, profiles_path: str = None):
+        self.model_dir = model_dir
+        self.model_path = model_path
+        self.thread_count = thread_count
+        self.warmup_cases = warmup_cases
+        self.cache = PredictionCache(maxsize=cache_size, ttl=cache_ttl) if cache_size else None
+        self.profiles_path = profiles_path
+        self._profiles = None
+
+        self._active = None
+        self._active_info = {}
+        self._signature = None
+        self._failed_signature = None
+        self._loader = None
+        self._load_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self.last_error = None
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def profiles(self):
+        # Хранилище профилей общее для всех версий модели и создаётся один раз
+        if self._profiles is None and self.profiles_path:
+            from src.features.device_profiles import DeviceProfileStore
+            self._profiles = DeviceProfileStore(self.profiles_path)
+        return self._profiles
+
+    @property
+    def ready(self) -> bool:
+        return self._active is not None
+
+    @property
+    def loading(self) -> bool:
+        return self._loader is not None and self._loader.is_alive()
+
+    def discover(self) -> list:
+        if not os.path.isdir(self.model_dir):
+            return []
+        artifacts = []
+        for name in os.listdir(self.model_dir):
+            match = ARTIFACT_PATTERN.match(name)
+            if match:
+                version, ext = int(match.group(1)), match.group(2)
+                artifacts.append((version, -EXTENSION_PRIORITY[ext], os.path.join(self.model_dir, name)))
+        return [path for *_, path in sorted(artifacts, reverse=True)]
+
+    def resolve_path(self) -> str:
+        if self.model_path:
+            return self.model_path
+        candidates = self.discover()
+        if not candidates:
+            raise FileNotFoundError(f"В {self.model_dir} нет артефактов insurance_model_v*")
+        return candidates[0]
+
+    def _within_model_dir(self, path: str) -> bool:
+        root = os.path.realpath(self.model_dir)
+        return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+    @staticmethod
+    def _file_signature(path: str):
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+
+    def warm_up(self, calculator) -> float:
+        import pandas as pd
+
+        start = time.perf_counter()
+        model = calculator.model
+        cases = synthetic_cases(model, self.warmup_cases)
+        model.score(pd.DataFrame(cases))
+        for case in cases[:4]:
+            model.score_case(case)
+            model.score_case(case, has_dtc=True)
+        return (time.perf_counter() - start) * 1000
+
+    def load(self, path: str = None):
+        from src.models.catboost.insurance_model import InsuranceRiskModel
+        from src.models.hybrid.kbm_calculator import HybridKBMCalculator
+
+        with self._load_lock:
+            path = path or self.resolve_path()
+            if path != self.model_path and not self._within_model_dir(path):
+                raise ValueError(f"Артефакт должен лежать в {self.model_dir}: {path}")
+
+            try:
+                signature = self._file_signature(path)
+                model = InsuranceRiskModel.from_file(path)
+                model.thread_count = self.thread_count
+                calculator = HybridKBMCalculator(model=model, cache=self.cache, profiles=self.profiles)
+                warmup_ms = self.warm_up(calculator)
+            except Exception as e:
+                self.last_error = f"{path}: {e}"
+                self._failed_signature = self._file_signature(path) if os.path.exists(path) else None
+                raise
+
+            # Подмена одной ссылкой: запросы, уже получившие старый калькулятор, дорабатывают на нём
+            self._active = calculator
+            self._signature = signature
+            self._active_info = {
+                'path': path,
+                'version': calculator.model.version,
+                'loaded_at': datetime.now().isoformat(timespec='seconds'),
+                'warmup_ms': round(warmup_ms, 1)
+            }
+            self.last_error = None
+            logger.info("Активная модель: %s (версия %s, прогрев %.0f мс)", path, calculator.model.version, warmup_ms)
+            return calculator
+
+    def pending_change(self):
+        """Подпись нового артефакта (путь, mtime, размер) или None, если активный не менялся."""
+        try:
+            signature = self._file_signature(self.resolve_path())
+        except (FileNotFoundError, OSError):
+            return None
+        if signature in (self._signature, self._failed_signature):
+            return None
+        return signature
+
+    def reload_if_changed(self) -> bool:
+        signature = self.pending_change()
+        if signature is None:
+            return False
+        path = signature[0]
+
+        # Файл может ещё дописываться: ждём, пока размер и mtime перестанут меняться
+        time.sleep(0.5)
+        if self._file_signature(path) != signature:
+            return False
+        try:
+            self.load(path)
+        except Exception as e:
+            logger.error("Не удалось переключить модель на %s: %s", path, e)
+            return False
+        return True
+
+    def start_background_load(self):
+        if self.loading:
+            return
+
+        def load():
+            try:
+                self.load()
+            except Exception as e:
+                logger.error("Ошибка загрузки калькулятора: %s", e)
+
+        self._loader = threading.Thread(target=load, name="model-registry-loader", daemon=True)
+        self._loader.start()
+
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        if self._loader is not None:
+            self._loader.join(timeout)
+        return self.ready
+
+    def start_watching(self, interval: float = 5.0):
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def watch():
+            while not self._stop.wait(interval):
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(target=watch, name="model-registry-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+        self._stop.clear()
+
+    def status(self) -> dict:
+        return {
+            'ready': self.ready,
+            'loading': self.loading,
+            'model': dict(self._active_info),
+            'last_error': self.last_error,
+            'cache': self.cache.stats() if self.cache is not None else None
+        }
@@ -27,9 +27,9 @@ def main():
 
     model = InsuranceRiskModel(model_path="./outputs/insurance_model_v1.pkl")
 
-    proba = model.predict_proba(new_case)
-
-    kbm = model.calculate_adjusted_kbm(new_case, base_kbm=1.0)
+    scores = model.score(new_case, base_kbm=1.0)
+    proba = scores['proba'].iloc[0]
+    kbm = scores['adjusted_kbm'].iloc[0]
 
     print(f"\nВероятность ДТП: {proba:.2%}")
     print(f"Рекомендуемый КБМ: {kbm}")
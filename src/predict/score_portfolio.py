@@ -0,0 +1,166 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from src.features.region_registry import RegionRegistry
+from src.models.catboost.insurance_model import InsuranceRiskModel
+from src.models.registry import ModelRegistry
+from src.serving.bulk_scoring import parse_flag
+from src.utils.log import setup_logging
+
+BASE_TARIFF = 2000
+MANIFEST_NAME = "_manifest.json"
+
+logger = logging.getLogger(__name__)
+
+_worker_model = None
+
+
+def iter_input_chunks(path: str, chunk_size: int):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def part_path(output_dir: str, chunk_id: int) -> str:
+    return os.path.join(output_dir, f"part-{chunk_id:06d}.parquet")
+
+
+def load_manifest(output_dir: str, settings: dict) -> dict:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {**settings, 'completed': {}}
+
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    changed = [key for key, value in settings.items() if manifest.get(key) != value]
+    if changed:
+        raise SystemExit(f"{output_dir} заполнен другим запуском (отличаются: {', '.join(changed)}); "
+                         f"укажите другой --output")
+    # Кусок считается готовым, только если его файл на месте
+    manifest['completed'] = {
+        chunk_id: rows for chunk_id, rows in manifest['completed'].items()
+        if os.path.exists(part_path(output_dir, int(chunk_id)))
+    }
+    return manifest
+
+
+def save_manifest(output_dir: str, manifest: dict):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def init_worker(model_path: str, thread_count: int):
+    global _worker_model
+    _worker_model = InsuranceRiskModel.from_file(model_path)
+    _worker_model.thread_count = thread_count
+
+
+def score_chunk(chunk_id: int, chunk: pd.DataFrame, output_dir: str, id_column: str = None) -> tuple:
+    # Строки "false", "no", "0" из CSV/Parquet разбираются так же, как в /api/v1/quote/bulk
+    has_dtc = chunk['has_dtc'].map(parse_flag).to_numpy(dtype=bool) if 'has_dtc' in chunk.columns else False
+    scores = _worker_model.score(chunk, has_dtc=has_dtc)
+
+    result = pd.DataFrame({
+        'base_kbm': scores['base_kbm'].to_numpy(),
+        'adjusted_kbm': scores['adjusted_kbm'].to_numpy(),
+        'final_kbm': scores['final_kbm'].to_numpy(),
+        'tariff': (scores['final_kbm'] * BASE_TARIFF).round(2).to_numpy()
+    })
+    if id_column:
+        result.insert(0, id_column, chunk[id_column].to_numpy())
+
+    # Запись через временный файл: после падения не остаётся наполовину записанных кусков
+    path = part_path(output_dir, chunk_id)
+    result.to_parquet(f"{path}.tmp", engine='pyarrow', index=False)
+    os.replace(f"{path}.tmp", path)
+    return chunk_id, len(result)
+
+
+def score_portfolio(input_path: str, output_dir: str, model_path: str, chunk_size: int = 100000,
+                    workers: int = None, id_column: str = None,
+                    regions_path: str = "static/data/regions.json") -> dict:
+    workers = workers or os.cpu_count() or 1
+    regions = RegionRegistry(regions_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    model_version = InsuranceRiskModel._file_digest(model_path)
+    manifest = load_manifest(output_dir, {
+        'input': os.path.abspath(input_path),
+        'model_version': model_version,
+        'chunk_size': chunk_size
+    })
+    completed = manifest['completed']
+    if completed:
+        logger.info("Продолжение: готово кусков %d, строк %d", len(completed), sum(completed.values()))
+
+    start = time.perf_counter()
+    scored_rows = 0
+    # На каждый процесс по одному потоку CatBoost, чтобы процессы не делили ядра
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(model_path, 1)) as pool:
+        pending = set()
+        for chunk_id, chunk in enumerate(iter_input_chunks(input_path, chunk_size)):
+            if str(chunk_id) in completed:
+                continue
+            # Не больше двух кусков на процесс в памяти одновременно
+            while len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                scored_rows += _record_done(done, manifest, output_dir, start, scored_rows)
+            # Климат региона, если его нет во входных данных, подставляется из справочника
+            chunk = regions.fill_weather(chunk)
+            pending.add(pool.submit(score_chunk, chunk_id, chunk, output_dir, id_column))
+
+        done, _ = wait(pending)
+        scored_rows += _record_done(done, manifest, output_dir, start, scored_rows)
+
+    elapsed = time.perf_counter() - start
+    rate = scored_rows / elapsed if elapsed else 0.0
+    logger.info("Готово: %d строк за %.1f с (%.0f строк/с), результат в %s", scored_rows, elapsed, rate, output_dir)
+    return {'rows': scored_rows, 'seconds': elapsed, 'rows_per_sec': rate, 'chunks': len(manifest['completed'])}
+
+
+def _record_done(done, manifest: dict, output_dir: str, start: float, scored_rows: int) -> int:
+    rows = 0
+    for future in done:
+        chunk_id, count = future.result()
+        manifest['completed'][str(chunk_id)] = count
+        rows += count
+    save_manifest(output_dir, manifest)
+
+    elapsed = time.perf_counter() - start
+    total = scored_rows + rows
+    logger.info("Кусков готово: %d, строк: %d, %.0f строк/с", len(manifest['completed']), total, total / elapsed)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный расчёт КБМ для портфеля полисов")
+    parser.add_argument("input", help="CSV или Parquet с колонками InsuranceRiskModel.required_features")
+    parser.add_argument("--output", required=True, help="каталог для Parquet-частей и манифеста")
+    parser.add_argument("--model", default=None, help="артефакт модели, по умолчанию последний в outputs/")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--id-column", default=None, help="колонка-идентификатор, переносимая в результат")
+    parser.add_argument("--regions", default="static/data/regions.json", help="справочник климата регионов")
+    args = parser.parse_args()
+
+    setup_logging()
+    score_portfolio(args.input, args.output, args.model or ModelRegistry().resolve_path(), chunk_size=args.chunk_size,
+                    workers=args.workers, id_column=args.id_column, regions_path=args.regions)
+
+
+if __name__ == "__main__":
+    main()
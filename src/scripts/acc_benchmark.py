@@ -0,0 +1,56 @@
+import argparse
+import time
+
+import numpy as np
+
+from src.features.accelerometer import ACC_ROW_BYTES, decode_acc_data
+
+
+def make_column(rows: int, truncated_share: float, seed: int = 0) -> np.ndarray:
+    # Как в выгрузке: полные строки по 162 символа и обрезанные до 46 символов + "..."
+    rng = np.random.default_rng(seed)
+    raw = rng.integers(0, 256, size=(rows, ACC_ROW_BYTES), dtype=np.uint8)
+    full = np.char.decode(np.frombuffer(raw.tobytes().hex().encode('ascii'), dtype=f'S{ACC_ROW_BYTES * 2}'))
+    column = full.astype(object)
+    truncated = rng.random(rows) < truncated_share
+    column[truncated] = np.char.add(np.char.ljust(full[truncated], 46).astype('U46'), '...')
+    return column
+
+
+def decode_per_row(column) -> list:
+    result = []
+    for value in column:
+        value = value.split('...')[0]
+        data = bytes.fromhex(value[:len(value) - len(value) % 2])
+        result.append(np.frombuffer(data[:len(data) - len(data) % 3], dtype=np.int8).reshape(-1, 3))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение пакетного и построчного декодирования accData")
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--truncated-share", type=float, default=0.5)
+    parser.add_argument("--per-row-rows", type=int, default=200_000,
+                        help="построчный вариант меряется на части строк")
+    args = parser.parse_args()
+
+    column = make_column(args.rows, args.truncated_share)
+    text_mb = sum(len(v) for v in column) / 1e6
+
+    start = time.perf_counter()
+    samples, counts = decode_acc_data(column)
+    bulk = time.perf_counter() - start
+
+    subset = column[:args.per_row_rows]
+    start = time.perf_counter()
+    decode_per_row(subset)
+    per_row = (time.perf_counter() - start) * len(column) / len(subset)
+
+    print(f"Строк: {len(column)}, hex: {text_mb:.0f} МБ, отсчётов: {int(counts.sum())}")
+    print(f"Пакетно:    {bulk:.2f} с ({len(column) / bulk / 1e6:.1f} млн строк/с, {text_mb / bulk:.0f} МБ/с)")
+    print(f"Построчно:  {per_row:.2f} с (оценка по {len(subset)} строкам)")
+    print(f"Ускорение:  x{per_row / bulk:.1f}, массив {samples.nbytes / 1e6:.0f} МБ")
+
+
+if __name__ == "__main__":
+    main()
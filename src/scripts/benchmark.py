@@ -0,0 +1,270 @@
+"""Бенчмарки обслуживания с базовыми замерами в JSON.
+
+    python -m src.scripts.benchmark run --output outputs/bench/base.json
+    python -m src.scripts.benchmark run --baseline outputs/bench/base.json --threshold 0.15
+    python -m src.scripts.benchmark compare outputs/bench/base.json outputs/bench/new.json
+
+Наборы: calculate (HybridKBMCalculator.calculate на 1, 10, 1k и 100k анкет),
+features (preprocess и generate_features), dtc (check_dtc_in_file на логах
+от 1 МБ до 1 ГБ), download (/download/pdf, csv и graph через тестовый клиент
+Flask, из кэша отрисовок и с отрисовкой). Каждый случай прогоняется не меньше
+min_runs раз и не меньше min_time секунд; сравнивается медиана. Регрессия —
+медиана выросла больше чем на threshold; compare и run --baseline в этом
+случае завершаются с кодом 1.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from src.scripts.serving_report import SAMPLE_FORM
+
+CALCULATE_SIZES = (1, 10, 1000, 100000)
+FEATURE_SIZES = (1000, 100000)
+DTC_SIZES_MB = (1, 16, 128, 1024)
+DTC_FIXTURE = "src/data/tests/v2_no_dtc.csv"
+DOWNLOADS = ('pdf', 'csv', 'graph')
+
+
+def measure(func, setup=None, min_time: float = 0.5, min_runs: int = 3, max_runs: int = 1000) -> dict:
+    """Время одного вызова func; setup выполняется перед каждым вызовом вне замера."""
+    if setup is not None:
+        setup()
+    func()
+
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_runs and (len(timings) < min_runs or time.perf_counter() - started < min_time):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    return {
+        'runs': len(timings),
+        'median_s': statistics.median(timings),
+        'min_s': timings[0],
+        'p95_s': timings[math.ceil(len(timings) * 0.95) - 1],
+        'mean_s': statistics.fmean(timings)
+    }
+
+
+def make_cases(model, n: int) -> list:
+    from src.models.registry import synthetic_cases
+
+    cases = synthetic_cases(model, n)
+    for i, case in enumerate(cases):
+        case['description'] = f"case {i}"
+    return cases
+
+
+def bench_calculate(model, args):
+    from src.models.hybrid.kbm_calculator import HybridKBMCalculator
+
+    # Без кэша предсказаний: замеряется сама модель, а не повтор одинаковых анкет
+    calculator = HybridKBMCalculator(model=model, cache_size=0)
+    for n in CALCULATE_SIZES:
+        cases = make_cases(model, n)
+        yield (f"calculate/{n}", n, 'cases',
+               lambda cases=cases: calculator.calculate(cases, show_plot=False), None)
+
+
+def bench_features(model, args):
+    import pandas as pd
+
+    from src.features.feature_engineering import generate_features
+
+    for n in FEATURE_SIZES:
+        raw = pd.DataFrame(make_cases(model, n)).drop(columns=['description'])
+        yield f"preprocess/{n}", n, 'cases', lambda raw=raw: model.preprocess(raw), None
+
+        numeric = raw.copy()
+        for col in model.num_features:
+            if col in numeric.columns:
+                numeric[col] = pd.to_numeric(numeric[col], errors='coerce')
+        yield f"generate_features/{n}", n, 'cases', lambda numeric=numeric: generate_features(numeric), None
+
+
+def write_obd_log(path: str, size_mb: int):
+    # Строки фикстуры без DTC повторяются до нужного размера: скан проходит файл целиком
+    with open(DTC_FIXTURE, 'rb') as f:
+        header, *lines = f.read().splitlines(keepends=True)
+    block = b''.join(lines) * max(1, (1 << 20) // max(1, sum(map(len, lines))))
+    target = size_mb * (1 << 20)
+    with open(path, 'wb') as f:
+        f.write(header)
+        written = len(header)
+        while written < target:
+            f.write(block)
+            written += len(block)
+
+
+def bench_dtc(model, args):
+    from src.utils.dtc_checker import check_dtc_in_file
+
+    for size_mb in args.dtc_sizes:
+        path = os.path.join(args.workdir, f"obd_{size_mb}mb.csv")
+        if not os.path.exists(path):
+            write_obd_log(path, size_mb)
+        yield (f"check_dtc/{size_mb}mb", os.path.getsize(path) / 1e6, 'MB',
+               lambda path=path: check_dtc_in_file(path), None)
+
+
+def bench_downloads(model, args):
+    # Конфигурация app.py читается из окружения при импорте
+    os.environ['MODEL_PATH'] = args.model_path
+    os.environ.setdefault('RESULT_STORE', 'memory')
+    os.environ['RENDER_CACHE_DIR'] = ''
+    import app as web
+    from src.serving.render_cache import RenderCache
+
+    if not web.registry.wait_until_ready(120):
+        raise RuntimeError(f"Модель не загрузилась: {web.registry.last_error}")
+
+    client = web.app.test_client()
+    if client.post("/calculate", data=SAMPLE_FORM).status_code != 200:
+        raise RuntimeError("POST /calculate завершился ошибкой")
+    with client.session_transaction() as session:
+        result_id = session['last_result_id']
+
+    renderers = {'pdf': web.pdf_renderer, 'graph': web.chart_renderer}
+    for kind in DOWNLOADS:
+        url = f"/download/{kind}/{result_id}"
+
+        def download(url=url):
+            response = client.get(url)
+            response.get_data()
+            assert response.status_code == 200, response.status_code
+
+        yield f"download/{kind}", 1, 'requests', download, None
+        if kind in renderers:
+            # Пустой кэш перед каждым запросом: замеряется отрисовка
+            def reset_cache(renderer=renderers[kind]()):
+                renderer.cache = RenderCache()
+
+            yield f"download/{kind}/render", 1, 'requests', download, reset_cache
+
+
+SUITES = {
+    'calculate': bench_calculate,
+    'features': bench_features,
+    'dtc': bench_dtc,
+    'download': bench_downloads
+}
+
+
+def run(model, args) -> dict:
+    results = {}
+    for suite in args.suites:
+        for name, items, unit, func, setup in SUITES[suite](model, args):
+            stats = measure(func, setup, min_time=args.min_time, min_runs=args.min_runs)
+            stats['items'] = items
+            stats['unit'] = unit
+            stats['items_per_s'] = items / stats['median_s'] if stats['median_s'] else 0.0
+            results[name] = stats
+            print(f"{name:<32} {stats['median_s'] * 1000:>10.3f} мс  (p95 {stats['p95_s'] * 1000:.3f} мс, "
+                  f"{stats['runs']} прогонов, {stats['items_per_s']:,.0f} {unit}/с)", flush=True)
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Случаи, есть в обоих замерах: (имя, база, сейчас, относительное изменение, регрессия)."""
+    rows = []
+    for name, stats in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None or not base['median_s']:
+            continue
+        change = stats['median_s'] / base['median_s'] - 1
+        rows.append((name, base['median_s'], stats['median_s'], change, change > threshold))
+    return rows
+
+
+def print_comparison(rows: list, threshold: float) -> int:
+    regressions = [row for row in rows if row[4]]
+    for name, base, current, change, regressed in rows:
+        mark = 'РЕГРЕССИЯ' if regressed else ''
+        print(f"{name:<32} {base * 1000:>10.3f} → {current * 1000:>10.3f} мс  {change:+7.1%}  {mark}")
+    print(f"Сравнено случаев: {len(rows)}, регрессий больше {threshold:.0%}: {len(regressions)}")
+    return 1 if regressions else 0
+
+
+def environment() -> dict:
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки обслуживания и сравнение с базовым замером")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="прогнать бенчмарки")
+    run_parser.add_argument("--model", default=None, help="артефакт модели, по умолчанию последний в outputs/")
+    run_parser.add_argument("--suite", action="append", choices=sorted(SUITES), dest="suites",
+                            help="набор (можно несколько), по умолчанию все")
+    run_parser.add_argument("--dtc-sizes", default=",".join(map(str, DTC_SIZES_MB)),
+                            help="размеры логов для check_dtc в МБ через запятую")
+    run_parser.add_argument("--workdir", default=None, help="каталог для сгенерированных логов (сохраняется)")
+    run_parser.add_argument("--min-time", type=float, default=0.5)
+    run_parser.add_argument("--min-runs", type=int, default=3)
+    run_parser.add_argument("--output", default=None, help="куда сохранить результаты в JSON")
+    run_parser.add_argument("--baseline", default=None, help="сравнить с базовым замером")
+    run_parser.add_argument("--threshold", type=float, default=0.1, help="допустимый рост медианы, доля")
+
+    compare_parser = commands.add_parser("compare", help="сравнить два сохранённых замера")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.current, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+        sys.exit(print_comparison(compare(baseline, current, args.threshold), args.threshold))
+
+    from src.models.catboost.insurance_model import InsuranceRiskModel
+    from src.models.registry import ModelRegistry
+
+    args.suites = args.suites or list(SUITES)
+    args.dtc_sizes = [int(size) for size in args.dtc_sizes.split(",") if size]
+    args.model_path = args.model or ModelRegistry().resolve_path()
+    model = InsuranceRiskModel.from_file(args.model_path)
+
+    keep_workdir = args.workdir is not None
+    args.workdir = args.workdir or tempfile.mkdtemp(prefix="osago-bench-")
+    os.makedirs(args.workdir, exist_ok=True)
+    try:
+        results = run(model, args)
+    finally:
+        if not keep_workdir:
+            shutil.rmtree(args.workdir, ignore_errors=True)
+
+    report = {**environment(), 'model': args.model_path, 'model_version': model.version, 'results': results}
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        sys.exit(print_comparison(compare(baseline, report, args.threshold), args.threshold))
+
+
+if __name__ == "__main__":
+    main()
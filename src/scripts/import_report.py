@@ -0,0 +1,67 @@
+import argparse
+import os
+import subprocess
+import sys
+
+
+def parse_importtime(output: str) -> list:
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({
+            'module': name.strip(),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            'depth': depth
+        })
+    return rows
+
+
+def measure_imports(module: str) -> list:
+    # -X importtime пишет в stderr, поэтому модуль импортируется в отдельном процессе
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.getcwd()
+    )
+    if result.returncode != 0:
+        tail = result.stderr.strip().splitlines()[-1:] or [""]
+        raise RuntimeError(f"Не удалось импортировать {module}: {tail[0]}")
+    return parse_importtime(result.stderr)
+
+
+def top_level_packages(rows: list) -> dict:
+    totals = {}
+    for row in rows:
+        package = row['module'].split('.')[0]
+        totals[package] = totals.get(package, 0.0) + row['self_ms']
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Отчёт о времени импорта модулей")
+    parser.add_argument("module", nargs="?", default="app")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = measure_imports(args.module)
+    total_ms = sum(row['self_ms'] for row in rows)
+
+    print(f"Импорт {args.module}: {total_ms:.0f} мс, модулей: {len(rows)}")
+    print("\nПакеты (собственное время):")
+    for package, ms in list(top_level_packages(rows).items())[:args.top]:
+        print(f"  {package:<30} {ms:8.1f} мс")
+
+    print("\nМодули (накопленное время):")
+    for row in sorted(rows, key=lambda r: r['cumulative_ms'], reverse=True)[:args.top]:
+        print(f"  {row['module']:<50} {row['cumulative_ms']:8.1f} мс")
+
+    for heavy in ("pandas", "numpy", "matplotlib", "catboost", "sklearn", "reportlab"):
+        if any(row['module'] == heavy for row in rows):
+            print(f"Внимание: {heavy} импортируется при старте {args.module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,39 @@
+import logging
+
 from src.models.catboost.insurance_model import InsuranceRiskModel
+from src.utils.log import setup_logging
 import pandas as pd
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 
+logger = logging.getLogger(__name__)
+
 
 def load_robust_csv(file_path: str) -> pd.DataFrame:
 
     try:
 
         df = pd.read_csv(file_path)
-        print(f"Успешно загружено {len(df)} строк стандартным способом")
+        logger.info("Успешно загружено %d строк стандартным способом", len(df))
         return df
     except pd.errors.ParserError as e:
-        print(f" Обнаружены ошибки парсинга: {e}")
-        print("Повторная попытка с пропуском проблемных строк...")
+        logger.warning("Обнаружены ошибки парсинга: %s", e)
+        logger.info("Повторная попытка с пропуском проблемных строк...")
 
         try:
             df = pd.read_csv(file_path, on_bad_lines='skip')
-            print(f"Загружено {len(df)} строк после пропуска битых")
+            logger.info("Загружено %d строк после пропуска битых", len(df))
             return df
         except Exception as e2:
-            print(f"Не удалось загрузить даже с пропуском: {e2}")
+            logger.error("Не удалось загрузить даже с пропуском: %s", e2)
             raise
 
 
 def main():
+    setup_logging()
     try:
         df = load_robust_csv("src/data/raw/insurance_data.csv")
     except FileNotFoundError:
-        print(" Файл данных не найден. Используем тестовые данные.")
+        logger.warning("Файл данных не найден. Используем тестовые данные.")
         df = pd.DataFrame([{
             'driver_age': 30,
             'driver_experience': 8,
@@ -73,7 +79,7 @@ def main():
         }])
 
     if 'target' not in df.columns:
-        print("Колонка 'target' отсутствует. Создаём на основе num_claims...")
+        logger.warning("Колонка 'target' отсутствует. Создаём на основе num_claims...")
         df['target'] = (df['num_claims'] > 0).astype(int)
 
     required_cols = [
@@ -87,14 +93,14 @@ def main():
 
     missing_cols = [col for col in required_cols if col not in df.columns]
     if missing_cols:
-        print(f"Отсутствуют колонки: {missing_cols}")
+        logger.error("Отсутствуют колонки: %s", missing_cols)
         raise ValueError(f"Не хватает колонок: {missing_cols}")
 
     initial_len = len(df)
     df = df.dropna(subset=['driver_age', 'driver_experience', 'num_claims', 'target'])
     final_len = len(df)
     if initial_len != final_len:
-        print(f" Удалено {initial_len - final_len} строк с пропущенными ключевыми значениями")
+        logger.warning("Удалено %d строк с пропущенными ключевыми значениями", initial_len - final_len)
 
     X = df.drop(columns=["target"])
     y = df["target"]
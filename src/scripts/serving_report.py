@@ -0,0 +1,128 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SAMPLE_FORM = {
+    'region': 'Moscow',
+    'driver_dob': '1990-01-01',
+    'license_date': '2010-01-01',
+    'vehicle_year': '2015',
+    'body_type': 'sedan',
+    'engine_power': '150',
+    'num_claims': '1'
+}
+
+
+def read_memory(pid: int) -> dict:
+    # smaps_rollup отделяет страницы, разделённые с мастером, от собственных страниц воркера
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup", 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                memory[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss_mb': memory.get('Rss', 0.0),
+        'pss_mb': memory.get('Pss', 0.0),
+        'shared_mb': memory.get('Shared_Clean', 0.0) + memory.get('Shared_Dirty', 0.0),
+        'private_mb': memory.get('Private_Clean', 0.0) + memory.get('Private_Dirty', 0.0)
+    }
+
+
+def worker_pids(master_pid: int) -> list:
+    with open(f"/proc/{master_pid}/task/{master_pid}/children", 'r') as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def wait_ready(url: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/readyz", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} не готов за {timeout:.0f} с")
+
+
+def measure_throughput(url: str, requests: int, concurrency: int) -> dict:
+    body = urllib.parse.urlencode(SAMPLE_FORM).encode()
+
+    def call(_):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(f"{url}/calculate", data=body, timeout=30) as response:
+                response.read()
+                ok = response.status == 200
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            # HTTPError (503, 500) — подкласс URLError: запрос считается ошибкой, замер продолжается
+            ok = False
+        return ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency in results)
+    return {
+        'requests': requests,
+        'errors': sum(not ok for ok, _ in results),
+        'rps': requests / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS воркеров и пропускная способность gunicorn")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pid", type=int, default=None, help="PID уже запущенного мастера")
+    parser.add_argument("--bind", default="127.0.0.1:5055")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    url = f"http://{args.bind}"
+    server = None
+    master_pid = args.pid
+    if master_pid is None:
+        env = dict(os.environ, WEB_CONCURRENCY=str(args.workers), BIND=args.bind)
+        server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"], env=env)
+        master_pid = server.pid
+
+    try:
+        wait_ready(url)
+        stats = measure_throughput(url, args.requests, args.concurrency)
+
+        master = read_memory(master_pid)
+        workers = [read_memory(pid) for pid in worker_pids(master_pid)]
+        cores = min(len(workers), os.cpu_count() or 1) or 1
+
+        print(f"Мастер: RSS {master['rss_mb']:.1f} МБ")
+        for i, memory in enumerate(workers):
+            print(f"Воркер {i}: RSS {memory['rss_mb']:.1f} МБ, PSS {memory['pss_mb']:.1f} МБ, "
+                  f"общих {memory['shared_mb']:.1f} МБ, собственных {memory['private_mb']:.1f} МБ")
+        if workers:
+            total_pss = master['pss_mb'] + sum(m['pss_mb'] for m in workers)
+            print(f"Суммарно PSS: {total_pss:.1f} МБ на {len(workers)} воркеров")
+
+        print(f"Запросов: {stats['requests']}, ошибок: {stats['errors']}")
+        print(f"Пропускная способность: {stats['rps']:.1f} запр/с, {stats['rps'] / cores:.1f} запр/с на ядро")
+        print(f"Задержка: p50 {stats['p50_ms']:.1f} мс, p95 {stats['p95_ms']:.1f} мс")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
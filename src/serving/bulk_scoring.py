@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+from itertools import islice
+
+# Ответ отдаётся кусками примерно такого размера, а не по строке
+FLUSH_BYTES = 65536
+
+RESULT_FIELDS = ['row', 'description', 'accident_proba', 'base_kbm', 'recommended_kbm', 'final_kbm', 'has_dtc', 'error']
+
+
+def parse_flag(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    # None и NaN (пустая ячейка в pandas) — флаг не выставлен
+    if value is None or value != value:
+        return False
+    return bool(value)
+
+
+def iter_csv_cases(lines):
+    reader = csv.DictReader(lines)
+    for number, record in enumerate(reader, start=1):
+        # Пустая ячейка CSV — пропуск, как NaN в pandas.read_csv
+        yield number, {k: (v if v != '' else None) for k, v in record.items() if k is not None}
+
+
+def iter_ndjson_cases(lines):
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f"некорректный JSON: {e}")
+            continue
+        yield number, record if isinstance(record, dict) else ValueError("строка должна быть JSON-объектом")
+
+
+def iter_cases(stream, fmt: str, encoding: str = 'utf-8'):
+    """Читает загрузку построчно из бинарного потока, не буферизуя её целиком."""
+    lines = io.TextIOWrapper(stream, encoding=encoding, newline='')
+    if fmt == 'csv':
+        return iter_csv_cases(lines)
+    return iter_ndjson_cases(lines)
+
+
+def iter_chunks(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def score_stream(model, cases, chunk_size: int = 1000, prepare=None):
+    """Оценивает анкеты кусками по chunk_size одним вызовом модели на кусок
+    и отдаёт результаты по мере готовности."""
+    featurizer = model.featurizer
+    for chunk in iter_chunks(cases, chunk_size):
+        rows, base_kbms, flags, valid = [], [], [], []
+        results = {}
+        for number, case in chunk:
+            if isinstance(case, Exception):
+                results[number] = {'row': number, 'error': str(case)}
+                continue
+            try:
+                has_dtc = parse_flag(case.get('has_dtc', False))
+                case = prepare(case) if prepare else case
+                row = featurizer.transform(case)
+            except Exception as e:
+                # Ответ уже отдаётся кусками: ошибка строки не должна обрывать его
+                results[number] = {'row': number, 'error': f"некорректная анкета: {e}"}
+                continue
+            rows.append(row)
+            base_kbms.append(model.resolve_base_kbm(case))
+            flags.append(has_dtc)
+            valid.append((number, case))
+
+        for (number, case), scores in zip(valid, model.score_rows(rows, base_kbm=base_kbms, has_dtc=flags)):
+            results[number] = {
+                'row': number,
+                'description': case.get('description') or '',
+                'accident_proba': scores['proba'],
+                'base_kbm': scores['base_kbm'],
+                'recommended_kbm': scores['adjusted_kbm'],
+                'final_kbm': scores['final_kbm'],
+                'has_dtc': scores['has_dtc']
+            }
+
+        for number, _ in chunk:
+            yield results[number]
+
+
+def render_ndjson(results):
+    buffer, size = [], 0
+    for result in results:
+        line = json.dumps(result, ensure_ascii=False) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def render_csv(results):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=RESULT_FIELDS)
+    writer.writeheader()
+    for result in results:
+        writer.writerow(result)
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,79 @@
+import io
+import threading
+
+from src.serving.render_cache import RenderCache, payload_key
+
+AVERAGE_KBM = 1.0
+CHART_DPI = 150
+
+
+class KbmChartRenderer:
+    """График «базовый / итоговый / средний КБМ» для /download/graph.
+
+    Фигура с осями, подписями и оформлением собирается один раз (Agg, без
+    pyplot), tight_layout тоже считается один раз; на запрос меняются только
+    высоты столбцов, подписи значений и предел оси. Значения округляются до
+    двух знаков, как на подписях, и PNG кэшируется по паре (base, final).
+    """
+
+    version = 1
+
+    def __init__(self, cache: RenderCache = None):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.cache = cache if cache is not None else RenderCache()
+        self._lock = threading.Lock()
+
+        self.figure = Figure(figsize=(10, 6), facecolor='#0A1A15')
+        FigureCanvasAgg(self.figure)
+        ax = self.figure.add_subplot()
+        ax.set_facecolor('#0F2319')
+
+        categories = ['Base KBM', 'Final KBM', 'Average KBM']
+        colors = ['#00D46A', '#00A55E', '#8B8B8B']
+        self.bars = ax.bar(categories, [1.0, 1.0, AVERAGE_KBM], color=colors, edgecolor='#00D46A', linewidth=2)
+        self.labels = [
+            ax.text(bar.get_x() + bar.get_width() / 2., 0, '', ha='center', va='bottom',
+                    color='#E0E0E0', fontsize=12, fontweight='bold')
+            for bar in self.bars
+        ]
+
+        ax.set_ylabel('KBM Coefficient', color='#A0A0A0', fontsize=12)
+        ax.set_title('Your KBM vs Average Market KBM', color='#E0E0E0', fontsize=16, fontweight='bold', pad=20)
+        ax.grid(axis='y', alpha=0.3, color='#00D46A', linestyle='--')
+        ax.set_axisbelow(True)
+        ax.tick_params(colors='#A0A0A0')
+        for spine in ax.spines.values():
+            spine.set_color('#00D46A')
+        self.ax = ax
+
+        ax.set_ylim(0, 3.0)
+        self.figure.tight_layout()
+
+    @staticmethod
+    def values(base_kbm: float, final_kbm: float) -> list:
+        return [round(float(base_kbm), 2), round(float(final_kbm), 2), AVERAGE_KBM]
+
+    def key(self, base_kbm: float, final_kbm: float) -> str:
+        return payload_key('kbm-chart', self.version, self.values(base_kbm, final_kbm))
+
+    def _draw(self, values: list) -> bytes:
+        # Фигура одна на процесс, поэтому отрисовка идёт под блокировкой
+        with self._lock:
+            for bar, label, value in zip(self.bars, self.labels, values):
+                bar.set_height(value)
+                label.set_y(value)
+                label.set_text(f'{value:.2f}')
+            self.ax.set_ylim(0, max(values) * 1.3)
+
+            buffer = io.BytesIO()
+            self.figure.savefig(buffer, format='png', dpi=CHART_DPI,
+                                facecolor=self.figure.get_facecolor(), edgecolor='none')
+        return buffer.getvalue()
+
+    def render(self, base_kbm: float, final_kbm: float) -> tuple:
+        """Возвращает (PNG, ключ кэша / ETag)."""
+        values = self.values(base_kbm, final_kbm)
+        key = payload_key('kbm-chart', self.version, values)
+        return self.cache.get_or_render(key, lambda: self._draw(values)), key
@@ -0,0 +1,91 @@
+import io
+from datetime import datetime
+
+from src.serving.render_cache import RenderCache, payload_key
+
+
+def result_rows(result: dict) -> list:
+    return [
+        ['Parameter', 'Value'],
+        ['Final CTP Tariff', f"{result['tariff']:.0f} ₽"],
+        ['Final KBM', f"{result['final_kbm']:.2f}"],
+        ['Base KBM', f"{result['base_kbm']:.2f}"],
+        ['Region', result['region']],
+        ['Driver', result['driver_desc']],
+        ['Accidents', str(result['num_claims'])],
+        ['DTC Errors', 'Yes' if result['has_dtc'] else 'No'],
+    ]
+
+
+class PdfRenderer:
+    """Сертификат расчёта в PDF.
+
+    Стили, таблица оформления и шаблон документа собираются один раз при
+    создании. Готовые PDF кэшируются по хешу выводимых строк: ключ известен до
+    отрисовки и служит ETag, поэтому повторное скачивание не рендерит документ.
+    Документ собирается с invariant=1 — одинаковые данные дают одинаковые байты.
+    """
+
+    # Меняется вместе с оформлением, чтобы старые файлы в кэше не отдавались
+    version = 1
+
+    def __init__(self, cache: RenderCache = None):
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+        from reportlab.lib.units import cm
+        from reportlab.platypus import TableStyle
+
+        self.cache = cache if cache is not None else RenderCache()
+        self.cm = cm
+        self.pagesize = A4
+
+        styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24,
+                                          textColor=colors.HexColor('#00D46A'), spaceAfter=30)
+        self.footer_style = ParagraphStyle('Footer', parent=styles['Normal'], fontSize=10, textColor=colors.grey)
+        self.table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#00664E')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 14),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#14281E')),
+            ('TEXTCOLOR', (0, 1), (-1, -1), colors.whitesmoke),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#00D46A')),
+            ('FONTSIZE', (0, 1), (-1, -1), 12),
+            ('TOPPADDING', (0, 1), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+        ])
+
+    @staticmethod
+    def footer() -> str:
+        return f"© {datetime.now().year} OSAGOCalculator, Inc. | Far Eastern Federal University"
+
+    def key(self, result: dict) -> str:
+        return payload_key('pdf', self.version, result_rows(result), self.footer())
+
+    def _build(self, rows: list, footer: str) -> bytes:
+        from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table
+
+        cm = self.cm
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=self.pagesize, rightMargin=2 * cm, leftMargin=2 * cm, invariant=1)
+
+        table = Table(rows, colWidths=[6 * cm, 6 * cm])
+        table.setStyle(self.table_style)
+        doc.build([
+            Paragraph("OSAGOCalculator — Result", self.title_style),
+            Spacer(1, 0.5 * cm),
+            table,
+            Spacer(1, 1 * cm),
+            Paragraph(footer, self.footer_style),
+        ])
+        return buffer.getvalue()
+
+    def render(self, result: dict) -> tuple:
+        """Возвращает (PDF, ключ кэша / ETag)."""
+        rows, footer = result_rows(result), self.footer()
+        key = payload_key('pdf', self.version, rows, footer)
+        return self.cache.get_or_render(key, lambda: self._build(rows, footer)), key
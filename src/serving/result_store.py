@@ -0,0 +1,161 @@
+import abc
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+
+class ResultStore(abc.ABC):
+    """Хранилище результатов расчёта: put() возвращает идентификатор, get() —
+    результат или None, если он не найден или устарел."""
+
+    @abc.abstractmethod
+    def put(self, result: dict) -> str:
+        ...
+
+    @abc.abstractmethod
+    def get(self, result_id: str):
+        ...
+
+
+class MemoryResultStore(ResultStore):
+    """LRU с TTL в памяти процесса — для одного воркера."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, result: dict) -> str:
+        result_id = secrets.token_urlsafe(12)
+        with self._lock:
+            self._data[result_id] = (self.clock() + self.ttl, result)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return result_id
+
+    def get(self, result_id: str):
+        with self._lock:
+            item = self._data.get(result_id)
+            if item is None:
+                return None
+            expires_at, result = item
+            if expires_at < self.clock():
+                del self._data[result_id]
+                return None
+            self._data.move_to_end(result_id)
+            return result
+
+
+class SQLiteResultStore(ResultStore):
+    """Общее для воркеров хранилище в одном файле SQLite в режиме WAL.
+
+    Запись не делает fsync на каждый запрос (synchronous=NORMAL): после сбоя
+    питания можно потерять последние результаты, но не повредить базу.
+    """
+
+    purge_every = 1000
+
+    def __init__(self, path: str = "outputs/results.sqlite3", ttl: float = 3600.0, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self._local = threading.local()
+        self._writes = 0
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "id TEXT PRIMARY KEY, expires_at REAL NOT NULL, payload TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Соединение SQLite нельзя делить между потоками и переносить через fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def put(self, result: dict) -> str:
+        result_id = secrets.token_urlsafe(12)
+        now = self.clock()
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO results (id, expires_at, payload) VALUES (?, ?, ?)",
+            (result_id, now + self.ttl, json.dumps(result, ensure_ascii=False, separators=(',', ':')))
+        )
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            self.purge(now)
+        return result_id
+
+    def get(self, result_id: str):
+        row = self._connection().execute(
+            "SELECT payload FROM results WHERE id = ? AND expires_at >= ?", (result_id, self.clock())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def purge(self, now: float = None) -> int:
+        cursor = self._connection().execute(
+            "DELETE FROM results WHERE expires_at < ?", (self.clock() if now is None else now,)
+        )
+        return cursor.rowcount
+
+
+class SignedTokenResultStore(ResultStore):
+    """Без состояния на сервере: результат сжимается и подписывается HMAC,
+    а сам токен служит идентификатором."""
+
+    def __init__(self, secret: str, ttl: float = 3600.0, clock=time.time):
+        self.key = secret.encode('utf-8') if isinstance(secret, str) else secret
+        self.ttl = ttl
+        self.clock = clock
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self.key, payload, hashlib.sha256).digest()[:16]
+
+    def put(self, result: dict) -> str:
+        body = json.dumps([int(self.clock() + self.ttl), result], ensure_ascii=False, separators=(',', ':'))
+        payload = base64.urlsafe_b64encode(zlib.compress(body.encode('utf-8'), 9)).rstrip(b'=')
+        signature = base64.urlsafe_b64encode(self._sign(payload)).rstrip(b'=')
+        return (payload + b'.' + signature).decode('ascii')
+
+    def get(self, result_id: str):
+        try:
+            payload, signature = result_id.encode('ascii').split(b'.')
+            expected = base64.urlsafe_b64encode(self._sign(payload)).rstrip(b'=')
+            if not hmac.compare_digest(signature, expected):
+                return None
+            body = zlib.decompress(base64.urlsafe_b64decode(payload + b'=' * (-len(payload) % 4)))
+            expires_at, result = json.loads(body)
+        except (ValueError, UnicodeError, zlib.error):
+            return None
+        return result if expires_at >= self.clock() else None
+
+
+def create_result_store(kind: str = "memory", secret: str = None, ttl: float = 3600.0,
+                        path: str = "outputs/results.sqlite3", maxsize: int = 10000) -> ResultStore:
+    if kind == "memory":
+        return MemoryResultStore(maxsize=maxsize, ttl=ttl)
+    if kind == "sqlite":
+        return SQLiteResultStore(path=path, ttl=ttl)
+    if kind == "token":
+        if not secret:
+            raise ValueError("Для подписанных токенов нужен секрет")
+        return SignedTokenResultStore(secret, ttl=ttl)
+    raise ValueError(f"Неизвестный тип хранилища результатов: {kind}")
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from catboost import CatBoostClassifier
+
+from src.models.catboost.insurance_model import InsuranceRiskModel
+
+
+def make_cases(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'driver_age': rng.integers(18, 80, n),
+        'driver_experience': rng.integers(0, 40, n),
+        'vehicle_age': rng.integers(0, 30, n),
+        'vehicle_type': rng.choice(['sedan', 'suv', 'hatchback', 'van', 'crossover'], n),
+        'engine_power': rng.integers(60, 300, n),
+        'vehicle_purpose': rng.choice(['personal', 'commercial', 'taxi'], n),
+        'region': rng.choice(['Moscow', 'rural', 'urban', 'Sochi', 'Kazan'], n),
+        'pct_days_with_snow': rng.uniform(0, 0.6, n).round(3),
+        'pct_days_with_rain': rng.uniform(0, 0.6, n).round(3),
+        'winter_duration_months': rng.integers(1, 8, n),
+        'base_kbm': rng.choice([0.5, 0.85, 1.0, 1.55], n),
+        'num_claims': rng.integers(0, 4, n),
+        'violation_count': rng.integers(0, 5, n),
+        'days_since_last_claim': rng.integers(30, 1095, n),
+        'occupation_type': rng.choice(['office_worker', 'student', 'retired', 'courier'], n),
+        'avg_trips_per_week': rng.uniform(0, 20, n).round(1),
+        'night_driving_ratio': rng.uniform(0, 0.6, n).round(2),
+        'ko_multiplier': rng.choice([1.0, 1.8], n),
+        'num_owned_vehicles': rng.integers(0, 3, n),
+    })
+
+
+@pytest.fixture(scope="session")
+def trained_model() -> InsuranceRiskModel:
+    data = make_cases(1000)
+    rng = np.random.default_rng(1)
+    labels = ((data['num_claims'] + 0.5 * data['violation_count'] + (data['driver_age'] < 25)
+               + rng.normal(0, 1, len(data))) > 2).astype(int)
+
+    model = InsuranceRiskModel()
+    model.fit_preprocessing(data)
+    model.model = CatBoostClassifier(iterations=30, depth=4, random_seed=42, verbose=0,
+                                     allow_writing_files=False, cat_features=model.cat_features)
+    model.model.fit(model.preprocess(data), labels)
+    return model
+
+
+@pytest.fixture(scope="session")
+def web_app(trained_model, tmp_path_factory):
+    # app.py читает конфигурацию из окружения при импорте
+    import importlib
+
+    directory = tmp_path_factory.mktemp("web")
+    model_path = str(directory / "insurance_model_v1.cbm")
+    trained_model.save_model(model_path)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("MODEL_PATH", model_path)
+        patch.setenv("MODEL_WATCH_INTERVAL", "0")
+        patch.setenv("RESULT_STORE", "memory")
+        patch.setenv("RENDER_CACHE_DIR", "")
+        patch.setenv("DEVICE_PROFILES_PATH", str(directory / "profiles.sqlite3"))
+        web = importlib.import_module("app")
+    assert web.registry.wait_until_ready(60), web.registry.last_error
+    return web
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.accelerometer import decode_acc_data, peak_magnitude
+
+
+def reference(value: str, sample_bytes: int = 3) -> np.ndarray:
+    value = value.split('...')[0]
+    data = bytes.fromhex(value[:len(value) - len(value) % 2])
+    return np.frombuffer(data[:len(data) - len(data) % sample_bytes], dtype=np.int8).reshape(-1, 3)
+
+
+def test_matches_per_row_decoding_on_fixtures():
+    column = pd.concat([load_obd_log_acc(name) for name in ("v2_no_dtc", "v2_with_dtc", "v2_aggressive")])
+    samples, counts = decode_acc_data(column, chunk_rows=2)
+    assert samples.shape == (len(column), 27, 3) and samples.dtype == np.int8
+
+    for row, value in enumerate(column):
+        expected = reference(value)
+        assert counts[row] == len(expected)
+        assert np.array_equal(samples[row, :counts[row]], expected)
+        assert not samples[row, counts[row]:].any()
+    assert list(samples[0, 0]) == [0x10, -0x40, -0x08]
+
+
+def load_obd_log_acc(name: str) -> pd.Series:
+    return pd.read_csv(f"src/data/tests/{name}.csv", usecols=['accData'])['accData']
+
+
+@pytest.mark.parametrize("value, count", [
+    ("", 0), (None, 0), (float('nan'), 0), ("ab...", 0), ("0a0b0c0", 1),
+    ("0A0B0Cff", 1), ("0a0bzz0c0d0e", 0), ("0a0b0c" * 40, 27), ("0a0b0cé", 1), ("0a0b0c0a0b0cд…", 2),
+])
+def test_truncated_and_broken_rows(value, count):
+    samples, counts = decode_acc_data(pd.Series([value, "7f8001"], dtype=object))
+    assert counts[0] == count and counts[1] == 1
+    assert list(samples[1, 0]) == [127, -128, 1]
+    if count:
+        assert list(samples[0, 0]) == [10, 11, 12]
+
+
+def test_wider_samples_and_peak():
+    samples, counts = decode_acc_data(["0001fffe0003" * 2, ""], row_bytes=12, dtype='>i2')
+    assert samples.dtype == np.dtype('int16') and counts.tolist() == [2, 0]
+    assert samples[0, 0].tolist() == [1, -2, 3]
+
+    peak = peak_magnitude(samples, counts)
+    assert peak[0] == pytest.approx(np.sqrt(14)) and np.isnan(peak[1])
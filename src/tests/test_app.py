@@ -0,0 +1,28 @@
+import pytest
+
+
+@pytest.mark.parametrize("flag", ["false", "0", "no", False])
+def test_quote_string_flags_match_bulk(web_app, flag):
+    client = web_app.app.test_client()
+    clean = client.post("/api/v1/quote", json={'driver_age': 40}).get_json()['quote']
+    quote = client.post("/api/v1/quote", json={'driver_age': 40, 'has_dtc': flag}).get_json()['quote']
+    assert quote['has_dtc'] is False and quote['final_kbm'] == clean['final_kbm']
+
+    flagged = client.post("/api/v1/quote", json={'driver_age': 40, 'has_dtc': "true"}).get_json()['quote']
+    assert flagged['has_dtc'] is True
+
+
+@pytest.mark.parametrize("region", [["x"], {"name": "x"}])
+def test_quote_rejects_non_scalar_fields_with_json(web_app, region):
+    client = web_app.app.test_client()
+    for payload in ({'driver_age': 40, 'region': region}, {'cases': [{'driver_age': 40}, {'region': region}]}):
+        response = client.post("/api/v1/quote", json=payload)
+        assert response.status_code == 400 and 'region' in response.get_json()['error']
+
+
+@pytest.mark.parametrize("token", [None, "wrong", "сekret"])
+def test_admin_reload_rejects_bad_tokens(web_app, monkeypatch, token):
+    monkeypatch.setattr(web_app, 'ADMIN_TOKEN', "secret")
+    headers = {'X-Admin-Token': token} if token is not None else {}
+    response = web_app.app.test_client().post("/admin/reload", headers=headers)
+    assert response.status_code == 403
@@ -0,0 +1,23 @@
+from src.scripts.benchmark import compare, measure, write_obd_log
+from src.utils.dtc_checker import check_dtc_in_file
+
+
+def test_measure_runs_setup_outside_timing():
+    calls = []
+    stats = measure(lambda: calls.append('run'), setup=lambda: calls.append('setup'), min_time=0, min_runs=3)
+    assert stats['runs'] == 3 and calls == ['setup', 'run'] * 4
+    assert stats['min_s'] <= stats['median_s'] <= stats['p95_s']
+
+
+def test_compare_flags_regressions_over_threshold():
+    baseline = {'results': {'a': {'median_s': 1.0}, 'b': {'median_s': 1.0}, 'gone': {'median_s': 1.0}}}
+    current = {'results': {'a': {'median_s': 1.05}, 'b': {'median_s': 1.5}, 'new': {'median_s': 1.0}}}
+    rows = {name: regressed for name, *_, regressed in compare(baseline, current, threshold=0.1)}
+    assert rows == {'a': False, 'b': True}
+
+
+def test_generated_log_is_scanned_end_to_end(tmp_path):
+    path = tmp_path / "obd.csv"
+    write_obd_log(str(path), 1)
+    assert path.stat().st_size >= 1 << 20
+    assert not check_dtc_in_file(str(path))
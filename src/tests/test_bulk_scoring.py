@@ -0,0 +1,47 @@
+import io
+import json
+
+from src.serving.bulk_scoring import iter_cases, render_csv, render_ndjson, score_stream
+from src.tests.conftest import make_cases
+
+
+def test_csv_stream_matches_batch_scoring(trained_model):
+    data = make_cases(25, seed=4)
+    upload = io.BytesIO(data.to_csv(index=False).encode('utf-8'))
+
+    results = list(score_stream(trained_model, iter_cases(upload, 'csv'), chunk_size=7))
+    expected = trained_model.score(data)
+
+    assert [r['row'] for r in results] == list(range(1, 26))
+    assert [r['final_kbm'] for r in results] == expected['final_kbm'].tolist()
+
+
+def test_ndjson_errors_are_reported_per_line(trained_model):
+    cases = make_cases(2, seed=6).to_dict('records')
+    lines = [json.dumps(cases[0]), "{broken", json.dumps(dict(cases[1], has_dtc=True)), "[]"]
+    upload = io.BytesIO("\n".join(lines).encode('utf-8'))
+
+    results = list(score_stream(trained_model, iter_cases(upload, 'ndjson'), chunk_size=2))
+    assert [r['row'] for r in results] == [1, 2, 3, 4]
+    assert 'error' in results[1] and 'error' in results[3]
+    assert results[2]['has_dtc'] is True
+
+    assert len(''.join(render_ndjson(results)).splitlines()) == 4
+    assert ''.join(render_csv(results)).splitlines()[0].startswith('row,')
+
+
+def test_bad_row_in_the_middle_does_not_break_stream(trained_model):
+    regions = {'Москва': {'fog_days': 10}}
+
+    def prepare(case):
+        # Как region_registry: поиск по словарю падает на нехешируемом регионе
+        return dict(case, **regions.get(case['region'], {}))
+
+    cases = make_cases(5, seed=8).to_dict('records')
+    cases[2]['region'] = ["x"]
+    upload = io.BytesIO("\n".join(json.dumps(case) for case in cases).encode('utf-8'))
+
+    results = list(score_stream(trained_model, iter_cases(upload, 'ndjson'), chunk_size=5, prepare=prepare))
+    assert [r['row'] for r in results] == [1, 2, 3, 4, 5]
+    assert 'unhashable' in results[2]['error']
+    assert all('final_kbm' in r for i, r in enumerate(results) if i != 2)
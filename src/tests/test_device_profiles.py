@@ -0,0 +1,78 @@
+import pandas as pd
+
+from src.features.device_profiles import RPM_BINS, SPEED_BINS, DeviceProfileStore
+from src.features.telematics import load_obd_log
+
+
+def make_log(rows):
+    return pd.DataFrame(rows, columns=['tripID', 'deviceID', 'timeStamp', 'speed', 'rpm', 'dtc'])
+
+
+FIRST = make_log([
+    (1, 7, "2017-12-23 10:00:00", 0, 800, 0),
+    (1, 7, "2017-12-23 10:00:01", 15, 1600, 0),
+    (1, 8, "2017-12-23 23:30:00", 55, 2100, 0),
+])
+APPENDED = make_log([
+    (1, 7, "2017-12-23 10:00:00", 0, 800, 0),
+    (1, 7, "2017-12-23 10:00:01", 15, 1600, 0),
+    (1, 7, "2017-12-23 10:00:02", 25, 1700, 2),
+    (2, 7, "2017-12-30 23:00:00", 120, 3000, 0),
+])
+
+
+def test_ingest_only_adds_new_samples(tmp_path):
+    store = DeviceProfileStore(str(tmp_path / "profiles.sqlite3"))
+    assert store.profile(7) is None
+
+    assert store.ingest(FIRST) == {'devices': 2, 'new_samples': 3, 'skipped_samples': 0}
+    assert store.ingest(FIRST)['new_samples'] == 0
+
+    stats = store.ingest(APPENDED)
+    assert stats == {'devices': 1, 'new_samples': 2, 'skipped_samples': 2}
+
+    profile = store.profile("7")
+    assert profile['trips'] == 2 and profile['samples'] == 4
+    assert profile['dtc_samples'] == 1 and profile['dtc_trips'] == 1 and profile['has_dtc']
+    assert profile['night_driving_ratio'] == 0.25
+    span_weeks = (pd.Timestamp("2017-12-30 23:00:00") - pd.Timestamp("2017-12-23 10:00:00")) / pd.Timedelta(weeks=1)
+    assert profile['avg_trips_per_week'] == 2 / span_weeks
+    assert profile['speed_hist'].sum() == 4 and profile['speed_hist'][1] == 1 and profile['speed_hist'][12] == 1
+    assert len(profile['speed_hist']) == len(SPEED_BINS) and len(profile['rpm_hist']) == len(RPM_BINS)
+
+    other = store.profile(8)
+    assert other['trips'] == 1 and not other['has_dtc'] and other['night_driving_ratio'] == 1
+
+
+def test_samples_in_the_same_second_are_not_dropped(tmp_path):
+    store = DeviceProfileStore(str(tmp_path / "profiles.sqlite3"))
+    first = make_log([(1, 7, "2017-12-23 10:00:00", 10, 800, 0)] * 2)
+    grown = make_log([(1, 7, "2017-12-23 10:00:00", 10, 800, 0)] * 3 + [(1, 7, "2017-12-23 10:00:01", 20, 900, 0)])
+
+    assert store.ingest(first)['new_samples'] == 2
+    assert store.ingest(grown) == {'devices': 1, 'new_samples': 2, 'skipped_samples': 2}
+    assert store.ingest(grown)['new_samples'] == 0
+    assert store.profile(7)['samples'] == 4
+
+
+def test_store_is_shared_and_reads_fixture_logs(tmp_path):
+    path = str(tmp_path / "profiles.sqlite3")
+    for name in ("v2_no_dtc", "v2_with_dtc", "v2_aggressive"):
+        DeviceProfileStore(path).ingest(load_obd_log(f"src/data/tests/{name}.csv"))
+
+    profile = DeviceProfileStore(path).profile(0)
+    assert profile['trips'] == 3 and profile['samples'] == 9 and profile['dtc_trips'] == 2
+
+
+def test_calculator_uses_device_profile(trained_model, tmp_path):
+    from src.models.hybrid.kbm_calculator import HybridKBMCalculator
+
+    store = DeviceProfileStore(str(tmp_path / "profiles.sqlite3"))
+    store.ingest(APPENDED)
+    calculator = HybridKBMCalculator(model=trained_model, cache_size=0, profiles=store)
+    case = {'driver_age': 30, 'driver_experience': 8, 'region': 'Moscow'}
+
+    assert calculator.score_case({**case, 'device_id': 7})['Корректировки'] == 'наличие DTC'
+    assert calculator.score_case({**case, 'device_id': 99})['Корректировки'] == 'нет'
+    rows = calculator.score_batch([{**case, 'device_id': 7}, case])
+    assert [row['Корректировки'] for row in rows] == ['наличие DTC', 'нет']
@@ -0,0 +1,76 @@
+import io
+
+import pandas as pd
+import pytest
+
+from src.utils.dtc_checker import check_dtc_in_file, scan_dtc
+
+HEADER = b"tripID,deviceID,timeStamp,accData,gps_speed,dtc,rpm\n"
+
+
+def pandas_verdict(content: bytes) -> bool:
+    df = pd.read_csv(io.BytesIO(content), low_memory=False)
+    return bool((pd.to_numeric(df['dtc'], errors='coerce').fillna(0) > 0).any())
+
+
+@pytest.mark.parametrize("content", [
+    HEADER + b"1,0,2017-12-23 10:15:22,10c0f8e0,45.2,0.0,1100\n" * 50,
+    HEADER + b"1,0,2017-12-23 10:15:22,10c0f8e0,45.2,0.0,1100\n" * 50 + b"1,0,t,ff,1,2.0,1",
+    HEADER + b'1,0,t,"ff,00",1,3,1\n1,0,t,ff,1,0,1\n',
+    HEADER + b"1,0,t,ff,1,abc,1\n1,0,t,ff,1,-1,1\n1,0,t,ff,1,,1\n",
+    HEADER + b"1,0,t,ff,1,0,1\n\n1,0,t,ff,1,1e-3,1\n",
+    b"dtc\n0\n0.0\n5",
+])
+@pytest.mark.parametrize("chunk_size", [7, 64, 1 << 20])
+def test_scan_matches_pandas(content, chunk_size):
+    assert scan_dtc(io.BytesIO(content), chunk_size=chunk_size)['has_dtc'] == pandas_verdict(content)
+
+
+def test_stops_at_first_error():
+    content = HEADER + b"1,0,t,ff,1,0,1\n" * 10 + b"1,0,t,ff,1,4,1\n" + b"1,0,t,ff,1,0,1\n" * 10000
+    stream = io.BytesIO(content)
+    scan = scan_dtc(stream, chunk_size=256)
+    assert scan['has_dtc'] and scan['bytes'] < 1024
+    assert stream.tell() < len(content)
+
+
+def test_check_dtc_in_file_on_fixtures():
+    assert check_dtc_in_file("src/data/tests/v2_with_dtc.csv")
+    assert check_dtc_in_file("src/data/tests/v2_aggressive.csv")
+    assert not check_dtc_in_file("src/data/tests/v2_no_dtc.csv")
+    assert not check_dtc_in_file("src/data/tests/missing.csv")
+
+
+def test_analyzer_stores_uploads_by_content_and_caches_verdicts(tmp_path):
+    from src.utils.dtc_checker import DtcAnalyzer
+
+    analyzer = DtcAnalyzer(str(tmp_path))
+    content = open("src/data/tests/v2_with_dtc.csv", "rb").read()
+
+    first = analyzer.analyze_upload(io.BytesIO(content))
+    second = analyzer.analyze_upload(io.BytesIO(content))
+    assert first and second.has_dtc
+    assert not first.cached and second.cached
+    assert first.path == second.path == analyzer.upload_path(first.content_hash)
+    assert [p.name for p in tmp_path.iterdir()] == [f"{first.content_hash}.csv"]
+    assert open(first.path, "rb").read() == content
+
+    clean = analyzer.analyze_file("src/data/tests/v2_no_dtc.csv")
+    assert not clean and clean.path == "src/data/tests/v2_no_dtc.csv"
+
+
+def test_calculator_uses_verdict_without_rescanning(trained_model, monkeypatch):
+    from src.models.hybrid import kbm_calculator
+    from src.utils.dtc_checker import DtcVerdict
+
+    def fail(path):
+        raise AssertionError("лог не должен сканироваться повторно")
+
+    monkeypatch.setattr(kbm_calculator, "check_dtc_in_file", fail)
+    calculator = kbm_calculator.HybridKBMCalculator(model=trained_model, cache_size=0)
+    case = {'driver_age': 30, 'driver_experience': 8, 'region': 'Moscow'}
+
+    with_dtc = calculator.score_case(case, dtc=DtcVerdict(True))
+    without = calculator.score_case(case, dtc=DtcVerdict(False))
+    assert with_dtc['Корректировки'] == 'наличие DTC' and without['Корректировки'] == 'нет'
+    assert with_dtc['Итоговый КБМ'] >= without['Итоговый КБМ']
@@ -0,0 +1,48 @@
+import io
+import json
+import logging
+import os
+
+import pytest
+
+from src.utils.log import lazy, setup_logging, stop_logging
+
+
+@pytest.fixture
+def stream():
+    stop_logging()
+    root = logging.getLogger()
+    level = root.level
+    out = io.StringIO()
+    yield out
+    stop_logging()
+    root.setLevel(level)
+
+
+def test_records_go_through_queue(stream):
+    setup_logging(level="INFO", fmt="text", stream=stream)
+    calls = []
+    logger = logging.getLogger("test.log")
+    logger.debug("%s", lazy(lambda: calls.append(1) or "тяжёлое"))
+    logger.info("КБМ: %.2f", 0.8)
+    stop_logging()
+
+    assert calls == []
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1 and lines[0].endswith("INFO [%d] test.log: КБМ: 0.80" % os.getpid())
+
+
+def test_json_format_keeps_extra(stream):
+    setup_logging(level="DEBUG", fmt="json", stream=stream)
+    logging.getLogger("test.log").debug("%s", lazy(lambda: "таблица"), extra={'rows': 3})
+    stop_logging()
+
+    entry = json.loads(stream.getvalue())
+    assert entry['message'] == "таблица" and entry['rows'] == 3 and entry['level'] == "DEBUG"
+
+
+def test_setup_is_idempotent(stream):
+    root = setup_logging(level="INFO", stream=stream)
+    handlers = list(root.handlers)
+    assert setup_logging(level="WARNING") is root
+    assert root.handlers == handlers and root.level == logging.WARNING
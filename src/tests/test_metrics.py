@@ -0,0 +1,40 @@
+from src.tests.conftest import make_cases
+from src.utils import metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = metrics.Histogram('test_seconds', 'Тест', label='stage', buckets=(0.1, 1.0))
+    series = hist.labels('a')
+    for value in (0.05, 0.5, 0.5, 5.0):
+        series.observe(value)
+    with series.time():
+        pass
+
+    samples = {(name, labels.get('le')): value for name, labels, value in hist.samples()}
+    assert samples[('test_seconds_bucket', '0.1')] == 2
+    assert samples[('test_seconds_bucket', '1')] == 4
+    assert samples[('test_seconds_bucket', '+Inf')] == 5
+    assert samples[('test_seconds_count', None)] == 5
+    assert abs(samples[('test_seconds_sum', None)] - 6.05) < 1e-3
+
+
+def test_render_prometheus_text():
+    hist = metrics.Histogram('test_render_seconds', 'Тест', label='stage', buckets=(1.0,))
+    hist.labels('say "hi"').observe(0.5)
+    metrics.register_collector(lambda: [('test_info', 'gauge', 'Тест', [({'version': 'abc'}, 1), ({}, None)])])
+
+    text = metrics.render()
+    assert '# TYPE test_render_seconds histogram' in text
+    assert 'test_render_seconds_bucket{pid="' in text and 'stage="say \\"hi\\"",le="+Inf"} 1' in text
+    assert 'version="abc"} 1\n' in text and text.count('test_info{') == 1
+
+
+def test_model_stages_are_recorded(trained_model):
+    predict, preprocess = metrics.stage('predict'), metrics.stage('preprocess')
+    before = sum(predict.snapshot()[0]), sum(preprocess.snapshot()[0])
+
+    trained_model.score(make_cases(10))
+    trained_model.score_rows([trained_model.featurizer.transform(case) for case in make_cases(3).to_dict('records')])
+
+    assert sum(predict.snapshot()[0]) == before[0] + 2
+    assert sum(preprocess.snapshot()[0]) == before[1] + 1
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from src.serving.micro_batcher import MicroBatcher
+from src.tests.conftest import make_cases
+
+
+def test_concurrent_requests_share_batches():
+    batch_sizes = []
+
+    def handler(items):
+        batch_sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(handler, max_batch_size=8, max_wait_ms=20)
+    results = {}
+    start = threading.Barrier(16)
+
+    def request(i):
+        start.wait()
+        results[i] = batcher(i, timeout=5)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {i: i * 2 for i in range(16)}
+    assert max(batch_sizes) <= 8
+    assert len(batch_sizes) < 16
+    assert batcher.stats()['items'] == 16
+
+
+def test_handler_error_reaches_every_caller():
+    def handler(items):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(handler, max_batch_size=4, max_wait_ms=0)
+    with pytest.raises(ValueError):
+        batcher(1, timeout=5)
+
+
+def test_batch_scores_match_single_cases(trained_model):
+    from src.models.hybrid.kbm_calculator import HybridKBMCalculator
+
+    calculator = HybridKBMCalculator(model=trained_model, cache_size=0)
+    cases = make_cases(12, seed=5).to_dict('records')
+    flags = [i % 3 == 0 for i in range(len(cases))]
+
+    batched = calculator.score_batch(cases, has_dtc=flags)
+    single = [trained_model.score_case(case, has_dtc=flag) for case, flag in zip(cases, flags)]
+    assert [row['Итоговый КБМ'] for row in batched] == [row['final_kbm'] for row in single]
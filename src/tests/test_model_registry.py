@@ -0,0 +1,56 @@
+import pytest
+
+from src.models.registry import ModelRegistry
+from src.tests.conftest import make_cases
+
+
+def test_discover_prefers_latest_version(tmp_path):
+    for name in ["insurance_model_v1.pkl", "insurance_model_v2.npz", "insurance_model_v2.cbm", "notes.txt"]:
+        (tmp_path / name).write_bytes(b"")
+    registry = ModelRegistry(model_dir=str(tmp_path))
+    assert [p.rsplit("/", 1)[-1] for p in registry.discover()] == [
+        "insurance_model_v2.cbm", "insurance_model_v2.npz", "insurance_model_v1.pkl"
+    ]
+
+
+def test_load_warms_up_and_swaps(trained_model, tmp_path):
+    trained_model.save_model(str(tmp_path / "insurance_model_v1.cbm"))
+    registry = ModelRegistry(model_dir=str(tmp_path), warmup_cases=8)
+    first = registry.load()
+    assert registry.active is first
+    assert registry.status()['model']['warmup_ms'] >= 0
+
+    trained_model.save_model(str(tmp_path / "insurance_model_v2.npz"))
+    assert registry.reload_if_changed()
+    assert registry.active is not first
+    assert registry.status()['model']['path'].endswith("insurance_model_v2.npz")
+
+    case = make_cases(1).to_dict('records')[0]
+    assert registry.active.score_case(case)['Итоговый КБМ'] == first.score_case(case)['Итоговый КБМ']
+
+
+def test_failed_load_keeps_active_model(trained_model, tmp_path):
+    trained_model.save_model(str(tmp_path / "insurance_model_v1.cbm"))
+    registry = ModelRegistry(model_dir=str(tmp_path))
+    active = registry.load()
+
+    (tmp_path / "insurance_model_v2.cbm").write_bytes(b"not a model")
+    with pytest.raises(Exception):
+        registry.load(str(tmp_path / "insurance_model_v2.cbm"))
+    assert registry.active is active
+    assert registry.status()['last_error']
+    # Битый файл не перезагружается по кругу, пока его не заменят
+    assert not registry.reload_if_changed()
+
+    with pytest.raises(ValueError):
+        registry.load(str(tmp_path.parent / "elsewhere.cbm"))
+
+
+def test_background_load_reports_readiness(trained_model, tmp_path):
+    trained_model.save_model(str(tmp_path / "insurance_model_v1.cbm"))
+    registry = ModelRegistry(model_dir=str(tmp_path), warmup_cases=4)
+    assert not registry.ready
+
+    registry.start_background_load()
+    assert registry.wait_until_ready(timeout=60)
+    assert registry.status()['ready'] and not registry.status()['loading']
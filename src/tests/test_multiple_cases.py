@@ -128,8 +128,9 @@ def main():
         data = {k: [v] for k, v in case.items() if k != 'description'}
         df = pd.DataFrame(data)
 
-        proba = model.predict_proba(df)
-        kbm = model.calculate_adjusted_kbm(df, base_kbm=case['base_kbm'])
+        scores = model.score(df, base_kbm=case['base_kbm'])
+        proba = scores['proba'].iloc[0]
+        kbm = scores['adjusted_kbm'].iloc[0]
 
         results.append({
             'Описание': case['description'],
@@ -0,0 +1,65 @@
+import copy
+import json
+
+import numpy as np
+import pytest
+
+from src.models.catboost.insurance_model import InsuranceRiskModel
+from src.models.catboost.numpy_evaluator import NumpyTreeEnsemble
+from src.models.catboost.tree_export import _dump_catboost_json, export_oblivious_trees, verify_export
+from src.tests.conftest import make_cases
+
+
+def test_exported_trees_match_catboost(trained_model, tmp_path):
+    path = export_oblivious_trees(trained_model, str(tmp_path / "model.npz"))
+    exported = NumpyTreeEnsemble.load(path)
+
+    data = make_cases(2000, seed=5)
+    data.loc[:20, 'region'] = 'Atlantis'
+    data.loc[10:30, 'vehicle_type'] = None
+
+    assert verify_export(trained_model, exported, data, tolerance=1e-9) <= 1e-9
+
+
+def test_npz_model_scores_like_catboost(trained_model, tmp_path):
+    path = str(tmp_path / "model.npz")
+    trained_model.save_model(path)
+    slim = InsuranceRiskModel.from_file(path)
+
+    data = make_cases(100, seed=6)
+    expected = trained_model.score(data)
+    actual = slim.score(data)
+    assert np.allclose(actual['proba'], expected['proba'], rtol=0, atol=1e-9)
+    assert (actual['final_kbm'] == expected['final_kbm']).all()
+
+    case = data.iloc[0].to_dict()
+    assert abs(slim.score_case(case)['proba'] - expected['proba'].iloc[0]) <= 1e-9
+    assert slim.fill_values == trained_model.fill_values
+
+
+def test_export_without_vocabularies_needs_sample(trained_model, tmp_path, monkeypatch):
+    monkeypatch.setattr(trained_model, 'cat_vocabularies', {'region': trained_model.cat_vocabularies['region']})
+    with pytest.raises(ValueError, match="передайте sample"):
+        export_oblivious_trees(trained_model, str(tmp_path / "model.npz"))
+
+    path = export_oblivious_trees(trained_model, str(tmp_path / "model.npz"), sample=make_cases(500, seed=7))
+    assert verify_export(trained_model, NumpyTreeEnsemble.load(path), make_cases(200, seed=8), tolerance=1e-9) <= 1e-9
+
+
+def test_export_handles_empty_tree(trained_model, tmp_path):
+    from catboost import CatBoostClassifier
+
+    # Дерево глубины 0 CatBoost выгружает как "splits": null с одним листом
+    dump = _dump_catboost_json(trained_model)
+    tree = dump['oblivious_trees'][0]
+    tree.update(splits=None, leaf_values=[0.3], leaf_weights=[sum(tree['leaf_weights'])])
+    json_path = tmp_path / "model.json"
+    json_path.write_text(json.dumps(dump))
+
+    model = copy.copy(trained_model)
+    model.model = CatBoostClassifier()
+    model.model.load_model(str(json_path), format='json')
+    assert _dump_catboost_json(model)['oblivious_trees'][0]['splits'] is None
+
+    exported = NumpyTreeEnsemble.load(export_oblivious_trees(model, str(tmp_path / "model.npz")))
+    assert verify_export(model, exported, make_cases(500, seed=9), tolerance=1e-9) <= 1e-9
@@ -0,0 +1,98 @@
+import mmap
+import os
+
+import pandas as pd
+import pytest
+
+from src.utils import obd_index
+from src.utils.obd_index import ObdLogIndex
+
+HEADER = "tripID,deviceID,timeStamp,accData,speed,rpm,dtc\n"
+
+
+def write_log(path, quoted: bool = False) -> pd.DataFrame:
+    rows = []
+    # Поездка (1, 1) прерывается поездкой устройства 2 и продолжается после неё
+    for trip, device, count, dtc in [(1, 1, 40, 0), (1, 2, 30, 0), (1, 1, 20, 0), (2, 1, 50, 3), (3, 2, 25, 0)]:
+        for i in range(count):
+            acc = '"ff,00"' if quoted and i == 3 else "10c0f8..."
+            rows.append(f"{trip},{device}.0,2017-12-23 10:{i // 60:02d}:{i % 60:02d},{acc},{i},900,"
+                        f"{dtc if i == count - 1 else 0}\n")
+    path.write_text(HEADER + "".join(rows))
+    return pd.read_csv(path)
+
+
+@pytest.mark.parametrize("quoted", [False, True])
+@pytest.mark.parametrize("chunk_size", [97, 1 << 20])
+def test_blocks_and_random_access(tmp_path, quoted, chunk_size):
+    path = tmp_path / "log.csv"
+    log = write_log(path, quoted)
+
+    with ObdLogIndex(str(path), chunk_size=chunk_size) as index:
+        assert index.trips() == [(1.0, 1.0), (2.0, 1.0), (1.0, 2.0), (2.0, 3.0)]
+        assert len(index.keys) == 5
+
+        expected = log[(log['deviceID'] == 1) & (log['tripID'] == 1)].reset_index(drop=True)
+        pd.testing.assert_frame_equal(index.read_trips([(1, 1)]), expected)
+        assert index.trip_size((1, 1)) == sum(len(line) for line in path.read_text().splitlines(True)[1:] if
+                                              line.startswith("1,1.0,"))
+
+        assert index.scan_dtc((1, 2))['has_dtc'] and not index.scan_dtc((1, 1))['has_dtc']
+        assert index.read_trips([("9", "9")]).empty
+
+        features = index.trip_features([(1, 1), (2, 3)]).set_index(['deviceID', 'tripID'])
+        assert features.loc[(1.0, 1.0), 'samples'] == 60
+        assert features.loc[(2.0, 3.0), 'samples'] == 25
+
+
+def test_index_is_reused_until_log_changes(tmp_path):
+    path = tmp_path / "log.csv"
+    write_log(path)
+    ObdLogIndex(str(path)).close()
+    assert os.path.exists(str(path) + ".idx.npz")
+
+    with ObdLogIndex(str(path)) as index:
+        assert len(index.keys) == 5
+
+    path.write_text(HEADER + "5,5.0,2017-12-23 10:00:00,ff,1,1,0\n")
+    with ObdLogIndex(str(path)) as index:
+        assert index.trips() == [(5.0, 5.0)]
+        assert len(index.sample_trips(3, seed=0)) == 1
+
+
+def test_requires_key_columns(tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_text("timeStamp,dtc\n2017-12-23 10:00:00,0\n")
+    with pytest.raises(ValueError):
+        ObdLogIndex(str(path))
+
+
+def test_close_closes_open_trip_streams(tmp_path):
+    path = tmp_path / "log.csv"
+    write_log(path)
+    index = ObdLogIndex(str(path))
+    stream = index.open_trip((1, 2))
+    assert stream.readline() == HEADER.encode()
+
+    index.close()
+    assert stream.closed
+
+
+def test_file_is_closed_when_mmap_fails(tmp_path, monkeypatch):
+    path = tmp_path / "log.csv"
+    write_log(path)
+    opened = []
+
+    def tracking_open(*args, **kwargs):
+        opened.append(open(*args, **kwargs))
+        return opened[-1]
+
+    class FailingMmap(mmap.mmap):
+        def __new__(cls, *args, **kwargs):
+            raise OSError("mmap недоступен")
+
+    monkeypatch.setattr(obd_index, 'open', tracking_open, raising=False)
+    monkeypatch.setattr(mmap, 'mmap', FailingMmap)
+    with pytest.raises(OSError):
+        ObdLogIndex(str(path))
+    assert opened and opened[0].closed
@@ -0,0 +1,60 @@
+import copy
+
+from src.models.hybrid.kbm_calculator import HybridKBMCalculator
+from src.models.hybrid.prediction_cache import PredictionCache, feature_key
+from src.tests.conftest import make_cases
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_feature_key_is_canonical():
+    assert feature_key([29, 'sedan', 0.5]) == feature_key([29.0, 'sedan', 0.5])
+    assert feature_key([29, 'sedan']) != feature_key([29, 'suv'])
+    assert feature_key(['1']) != feature_key([1])
+
+
+def test_lru_eviction_and_counters():
+    cache = PredictionCache(maxsize=2, ttl=None)
+    cache.put(b'a', 1)
+    cache.put(b'b', 2)
+    assert cache.get(b'a') == 1
+    cache.put(b'c', 3)
+
+    assert cache.get(b'b') is None
+    assert cache.get(b'a') == 1
+    assert cache.get(b'c') == 3
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (3, 1, 1)
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = PredictionCache(maxsize=10, ttl=5.0, clock=clock)
+    cache.put(b'a', 1)
+    clock.now = 4.9
+    assert cache.get(b'a') == 1
+    clock.now = 5.1
+    assert cache.get(b'a') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_model_versions_do_not_share_entries(trained_model):
+    old, new = copy.copy(trained_model), copy.copy(trained_model)
+    old.version, new.version = 'v1', 'v2'
+    cache = PredictionCache(maxsize=100, ttl=None)
+    cases = make_cases(3, seed=12).to_dict('records')
+
+    HybridKBMCalculator(model=old, cache=cache).score_batch(cases)
+    HybridKBMCalculator(model=new, cache=cache).score_batch(cases)
+    assert (cache.stats()['hits'], len(cache)) == (0, 6)
+
+    # Запросы старой модели во время подмены не сбрасывают записи новой
+    HybridKBMCalculator(model=old, cache=cache).score_batch(cases)
+    HybridKBMCalculator(model=new, cache=cache).score_batch(cases)
+    assert cache.stats()['hits'] == 6
@@ -0,0 +1,48 @@
+import json
+import os
+
+import pandas as pd
+
+from src.features.region_registry import RegionRegistry
+
+REGIONS = {
+    "Moscow": {"pct_days_with_snow": 0.35, "pct_days_with_rain": 0.45, "winter_duration_months": 5},
+    "Sochi": {"pct_days_with_snow": 0.05, "pct_days_with_rain": 0.5, "winter_duration_months": 1},
+    "Other": {"pct_days_with_snow": 0.2, "pct_days_with_rain": 0.4, "winter_duration_months": 3}
+}
+
+
+def test_reloads_only_when_content_changes(tmp_path):
+    path = tmp_path / "regions.json"
+    path.write_text(json.dumps(REGIONS), encoding="utf-8")
+    registry = RegionRegistry(str(path), check_interval=0)
+
+    assert registry.names == ["Moscow", "Sochi", "Other"]
+    assert registry.reloads == 1
+
+    # Тот же текст с новым mtime: файл перечитан, но JSON не разбирается заново
+    os.utime(path, ns=(1, 1))
+    assert registry.names == ["Moscow", "Sochi", "Other"]
+    assert registry.reloads == 1
+
+    path.write_text(json.dumps({**REGIONS, "Kazan": REGIONS["Moscow"]}), encoding="utf-8")
+    assert registry.names[-1] == "Kazan"
+    assert registry.reloads == 2
+
+
+def test_vectorized_lookup_matches_get(tmp_path):
+    path = tmp_path / "regions.json"
+    path.write_text(json.dumps(REGIONS), encoding="utf-8")
+    registry = RegionRegistry(str(path))
+
+    regions = ["Sochi", "Atlantis", "Moscow", None]
+    columns = registry.lookup(regions)
+    for i, region in enumerate(regions):
+        assert {key: column[i] for key, column in columns.items()} == registry.get(region)
+    assert registry.get("Atlantis")["winter_duration_months"] == 3
+    assert registry.get(["Moscow"]) == registry.get({"name": "Moscow"}) == registry.get("Atlantis")
+
+    data = pd.DataFrame({"region": regions, "pct_days_with_snow": [0.9, None, None, None]})
+    filled = registry.fill_weather(data)
+    assert filled["pct_days_with_snow"].tolist() == [0.9, 0.2, 0.35, 0.2]
+    assert filled["winter_duration_months"].tolist() == [1, 3, 5, 3]
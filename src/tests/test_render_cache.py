@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from src.serving.render_cache import RenderCache, payload_key
+
+RESULT = {
+    'tariff': 1600.0, 'final_kbm': 0.8, 'base_kbm': 0.96, 'region': 'Moscow',
+    'driver_desc': 'Driver 35y, 16y exp, Moscow', 'num_claims': 1, 'has_dtc': False
+}
+
+
+def test_payload_key_is_stable():
+    assert payload_key('pdf', {'a': 1, 'b': 2}) == payload_key('pdf', {'b': 2, 'a': 1})
+    assert payload_key('pdf', 1) != payload_key('png', 1)
+
+
+def test_memory_is_bounded_by_bytes():
+    cache = RenderCache(max_bytes=10)
+    cache.put('a', b'12345')
+    cache.put('b', b'12345')
+    cache.get('a')
+    cache.put('c', b'123')
+    assert cache.get('a') == b'12345' and cache.get('b') is None
+    cache.put('huge', b'x' * 11)
+    assert cache.get('huge') is None
+    assert cache.stats()['bytes'] <= 10
+
+
+def test_disk_is_shared_and_evicted(tmp_path):
+    first = RenderCache(max_bytes=0, directory=str(tmp_path), max_disk_bytes=40, suffix='.bin')
+    calls = []
+    render = lambda: calls.append(1) or b'x' * 10
+
+    assert first.get_or_render('k1', render) == b'x' * 10
+    second = RenderCache(directory=str(tmp_path), suffix='.bin')
+    assert second.get_or_render('k1', render) == b'x' * 10
+    assert len(calls) == 1 and second.stats()['disk_hits'] == 1
+
+    os.utime(tmp_path / 'k1.bin', (1, 1))
+    for key in ('k2', 'k3', 'k4', 'k5'):
+        first.put(key, b'y' * 10)
+    names = sorted(os.listdir(tmp_path))
+    assert 'k1.bin' not in names and sum(os.path.getsize(tmp_path / n) for n in names) <= 40
+
+
+def test_pdf_renderer_caches_by_payload(tmp_path):
+    pytest.importorskip("reportlab")
+    from src.serving.pdf_renderer import PdfRenderer
+
+    renderer = PdfRenderer(RenderCache(directory=str(tmp_path), suffix='.pdf'))
+    pdf, key = renderer.render(RESULT)
+    assert pdf.startswith(b'%PDF') and key == renderer.key(RESULT)
+    assert renderer.render(dict(RESULT))[0] is pdf
+    assert renderer.cache.stats()['misses'] == 1
+
+    other, other_key = renderer.render({**RESULT, 'final_kbm': 1.0})
+    assert other_key != key
+    # invariant=1: одинаковые данные дают одинаковые байты и в другом процессе
+    assert PdfRenderer(RenderCache())._build([['a', 'b']], 'f') == PdfRenderer(RenderCache())._build([['a', 'b']], 'f')
+
+
+def test_chart_renderer_reuses_template_and_caches_pairs():
+    pytest.importorskip("matplotlib")
+    from src.serving.chart_renderer import KbmChartRenderer
+
+    renderer = KbmChartRenderer(RenderCache())
+    png, key = renderer.render(0.96, 0.8)
+    assert png.startswith(b'\x89PNG') and key == renderer.key(0.96, 0.8)
+    assert renderer.render(0.9600001, 0.80)[0] is png
+
+    other, other_key = renderer.render(2.45, 3.92)
+    assert other_key != key and other != png
+    assert [bar.get_height() for bar in renderer.bars] == [2.45, 3.92, 1.0]
+    assert renderer.labels[1].get_text() == '3.92'
+    assert renderer.cache.stats()['misses'] == 2
+
+
+def test_disk_write_failure_still_returns_data(tmp_path, monkeypatch):
+    cache = RenderCache(directory=str(tmp_path), suffix='.bin')
+    cache.put('k', b'x' * 10)
+    cache.put('k', b'y' * 10)
+    assert cache._disk_bytes == 10
+
+    def fail(*args):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, 'replace', fail)
+    assert cache.get_or_render('new', lambda: b'z' * 5) == b'z' * 5
+    assert sorted(os.listdir(tmp_path)) == ['k.bin'] and cache._disk_bytes == 10
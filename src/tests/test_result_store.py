@@ -0,0 +1,64 @@
+import pytest
+
+from src.serving.result_store import (
+    MemoryResultStore, ResultStore, SignedTokenResultStore, SQLiteResultStore, create_result_store
+)
+
+RESULT = {'tariff': 1600.0, 'final_kbm': 0.8, 'region': 'Москва', 'has_dtc': False}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda clock, tmp_path: MemoryResultStore(maxsize=10, ttl=60, clock=clock),
+    lambda clock, tmp_path: SQLiteResultStore(str(tmp_path / "results.sqlite3"), ttl=60, clock=clock),
+    lambda clock, tmp_path: SignedTokenResultStore("secret", ttl=60, clock=clock),
+])
+def test_round_trip_and_expiry(make_store, tmp_path):
+    clock = FakeClock()
+    store = make_store(clock, tmp_path)
+
+    result_id = store.put(RESULT)
+    assert store.get(result_id) == RESULT
+    assert store.get("missing") is None
+
+    clock.now += 61
+    assert store.get(result_id) is None
+
+
+def test_memory_store_evicts_least_recent():
+    store = MemoryResultStore(maxsize=2, ttl=60)
+    first, second = store.put({'n': 1}), store.put({'n': 2})
+    store.get(first)
+    store.put({'n': 3})
+    assert store.get(first) == {'n': 1}
+    assert store.get(second) is None
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    result_id = SQLiteResultStore(path).put(RESULT)
+    assert SQLiteResultStore(path).get(result_id) == RESULT
+
+
+def test_token_rejects_tampering():
+    store = create_result_store("token", secret="secret")
+    token = store.put(RESULT)
+    payload, signature = token.split(".")
+    assert store.get(payload[:-1] + ("A" if payload[-1] != "A" else "B") + "." + signature) is None
+    assert create_result_store("token", secret="other").get(token) is None
+
+
+def test_store_must_implement_put_and_get():
+    class PutOnly(ResultStore):
+        def put(self, result):
+            return "id"
+
+    with pytest.raises(TypeError):
+        PutOnly()
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.tests.conftest import make_cases
+
+
+def _assert_same_row(model, case: dict):
+    fast = model.featurizer.transform(case)
+    slow = model.preprocess(pd.DataFrame([case])).iloc[0].tolist()
+    assert len(fast) == len(model.all_features)
+    for col, a, b in zip(model.all_features, fast, slow):
+        if col in model.cat_features:
+            assert a == b, col
+        else:
+            assert float(a) == float(b), col
+
+
+def test_row_featurizer_matches_preprocess(trained_model):
+    for case in make_cases(200, seed=7).to_dict('records'):
+        _assert_same_row(trained_model, case)
+
+
+@pytest.mark.parametrize("overrides", [
+    {'driver_age': None, 'region': None},
+    {'engine_power': 'abc', 'num_claims': '2'},
+    {'driver_experience': np.nan, 'vehicle_type': np.nan},
+    {'region': 'Atlantis', 'vehicle_type': 42},
+])
+def test_row_featurizer_fills_missing_like_preprocess(trained_model, overrides):
+    case = make_cases(1, seed=3).to_dict('records')[0]
+    case.update(overrides)
+    _assert_same_row(trained_model, case)
+
+
+def test_score_case_matches_batch_score(trained_model):
+    data = make_cases(50, seed=11)
+    batch = trained_model.score(data)
+    for i, case in enumerate(data.to_dict('records')):
+        single = trained_model.score_case(case)
+        assert single['proba'] == pytest.approx(batch['proba'].iloc[i], abs=1e-12)
+        assert single['adjusted_kbm'] == batch['adjusted_kbm'].iloc[i]
+        assert single['final_kbm'] == batch['final_kbm'].iloc[i]
+
+
+def test_unseen_category_scores_like_missing(trained_model):
+    case = make_cases(1, seed=3).to_dict('records')[0]
+    assert 'Atlantis' not in trained_model.cat_vocabularies['region']
+    unseen = trained_model.score(pd.DataFrame([{**case, 'region': 'Atlantis'}]))['proba'].iloc[0]
+    missing = trained_model.score(pd.DataFrame([{**case, 'region': None}]))['proba'].iloc[0]
+    assert unseen == missing
+    assert trained_model.score_case({**case, 'region': 'Atlantis'})['proba'] == pytest.approx(unseen, abs=1e-12)
@@ -0,0 +1,48 @@
+import glob
+import os
+
+import pandas as pd
+import pytest
+
+from src.predict.score_portfolio import score_portfolio
+from src.tests.conftest import make_cases
+
+pytest.importorskip("pyarrow")
+
+
+def test_portfolio_resumes_from_completed_chunks(trained_model, tmp_path):
+    model_path = str(tmp_path / "model.cbm")
+    trained_model.save_model(model_path)
+
+    data = make_cases(50, seed=8)
+    data.insert(0, 'policy_id', range(len(data)))
+    input_path = str(tmp_path / "portfolio.csv")
+    data.to_csv(input_path, index=False)
+    output_dir = str(tmp_path / "scored")
+
+    first = score_portfolio(input_path, output_dir, model_path, chunk_size=20, workers=1, id_column='policy_id')
+    assert first['rows'] == 50 and first['chunks'] == 3
+
+    os.remove(os.path.join(output_dir, "part-000001.parquet"))
+    second = score_portfolio(input_path, output_dir, model_path, chunk_size=20, workers=1, id_column='policy_id')
+    assert second['rows'] == 20
+
+    parts = sorted(glob.glob(os.path.join(output_dir, "part-*.parquet")))
+    result = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+    assert result['policy_id'].tolist() == list(range(50))
+    assert result['final_kbm'].tolist() == trained_model.score(data)['final_kbm'].tolist()
+
+
+def test_portfolio_parses_string_dtc_flags(trained_model, tmp_path):
+    model_path = str(tmp_path / "model.cbm")
+    trained_model.save_model(model_path)
+
+    data = make_cases(5, seed=9)
+    flags = ["false", "no", "0", None, "true"]
+    input_path = str(tmp_path / "portfolio.csv")
+    data.assign(has_dtc=flags).to_csv(input_path, index=False)
+
+    score_portfolio(input_path, str(tmp_path / "scored"), model_path, workers=1)
+    result = pd.read_parquet(os.path.join(tmp_path, "scored", "part-000000.parquet"))
+    expected = trained_model.score(data, has_dtc=[False, False, False, False, True])
+    assert result['final_kbm'].tolist() == expected['final_kbm'].tolist()
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from src.features.telematics import driver_features, load_obd_log, trip_features
+
+
+def make_log(rows):
+    return pd.DataFrame(rows, columns=['tripID', 'deviceID', 'timeStamp', 'speed', 'rpm', 'dtc'])
+
+
+def test_trip_aggregates():
+    log = make_log([
+        # Поездка 2 идёт в файле первой и не по порядку времени
+        (2, 7, "2017-12-24 23:00:01", 0, 800, 0),
+        (2, 7, "2017-12-24 23:00:00", 0, 800, 3),
+        (1, 7, "2017-12-23 10:00:00", 0, 800, 0),
+        (1, 7, "2017-12-23 10:00:01", 20, 1500, 0),
+        (1, 7, "2017-12-23 10:00:02", 95, 3000, 0),
+        (1, 7, "2017-12-23 10:00:03", 100, 3000, 0),
+        (1, 7, "2017-12-23 10:00:04", 50, 1500, 0),
+        (1, 7, "2017-12-23 10:00:05", 10, 900, 0),
+        (1, 7, "broken", 10, 900, 0),
+    ])
+    trips = trip_features(log).set_index('tripID')
+
+    first = trips.loc[1]
+    assert first['samples'] == 6 and first['duration_sec'] == 5
+    assert first['avg_speed'] == 275 / 6 and first['max_speed'] == 100
+    assert first['speeding_ratio'] == 2 / 6
+    # 0→20→95 — одна серия разгона, 100→50→10 — одна серия торможения
+    assert first['hard_accels'] == 1 and first['hard_brakes'] == 1
+    assert first['idle_ratio'] == 1 / 6 and first['night_driving_ratio'] == 0
+    assert not first['has_dtc_errors']
+
+    second = trips.loc[2]
+    assert second['idle_ratio'] == 1 and second['night_driving_ratio'] == 1
+    assert second['has_dtc_errors'] and second['hard_brakes'] == 0
+
+
+def test_fixture_logs_and_driver_features():
+    trips = pd.concat([trip_features(load_obd_log(f"src/data/tests/{name}.csv"))
+                       for name in ("v2_no_dtc", "v2_with_dtc", "v2_aggressive")])
+    assert list(trips['has_dtc_errors']) == [False, True, True]
+
+    drivers = driver_features(trips)
+    assert len(drivers) == 1
+    assert drivers['avg_trips_per_week'].iloc[0] == 3
+    assert drivers['has_dtc_errors'].iloc[0]
+
+
+def test_empty_log():
+    assert trip_features(make_log([])).empty
+    assert driver_features(trip_features(make_log([]))).empty
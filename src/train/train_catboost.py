@@ -1,9 +1,15 @@
+import logging
+
 from src.models.catboost.insurance_model import InsuranceRiskModel
 from src.data.raw.load_data import load_dataset
 from src.models.catboost.preprocess_data import preprocess
+from src.utils.log import setup_logging
+
+logger = logging.getLogger(__name__)
 
 
 def main():
+    setup_logging()
 
     df = load_dataset("./src/data/raw/insurance_data.csv")
     df_clean = preprocess(df)
@@ -15,7 +21,7 @@ def main():
     model.train(X, y)
 
     model.save_model("outputs/insurance_model_v1.pkl")
-    print("Модель успешно обучена и сохранена.")
+    logger.info("Модель успешно обучена и сохранена.")
 
 
 if __name__ == "__main__":
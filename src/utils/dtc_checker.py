@@ -1,21 +1,310 @@
-import pandas as pd
+import csv
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.utils.lru_cache import LruCache
+
+SCAN_CHUNK_SIZE = 4 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+_COMMA = ord(',')
+_NEWLINE = ord('\n')
+
+
+def _is_positive(value) -> bool:
+    # Как pd.to_numeric(errors='coerce').fillna(0) > 0: нечисловое значение — не ошибка
+    try:
+        return float(value) > 0
+    except (TypeError, ValueError):
+        return False
+
+
+def _read_into(stream, view: memoryview) -> int:
+    if hasattr(stream, 'readinto'):
+        return stream.readinto(view) or 0
+    data = stream.read(len(view))
+    view[:len(data)] = data
+    return len(data)
+
+
+def _parse_header(line: bytes):
+    columns = next(csv.reader([line.decode('utf-8-sig', errors='replace')]), [])
+    columns = [c.strip() for c in columns]
+    return (columns.index('dtc') if 'dtc' in columns else None), len(columns)
+
+
+def _scan_block_slow(block: bytes, column: int) -> tuple:
+    rows = 0
+    for row in csv.reader(io.StringIO(block.decode('utf-8', errors='replace'))):
+        if not row:
+            continue
+        rows += 1
+        if len(row) > column and _is_positive(row[column]):
+            return True, rows
+    return False, rows
+
+
+def _scan_block(buffer, start: int, stop: int, column: int, ncols: int) -> tuple:
+    """Ищет dtc > 0 в buffer[start:stop], где лежат целые строки.
+    Возвращает (найдено, число просмотренных строк).
+
+    Быстрый путь: позиции всех запятых и переводов строк находятся NumPy за один
+    проход, границы поля dtc каждой строки берутся из них, а float() вызывается
+    только для полей, где есть цифра 1-9. Куски с кавычками или с другим числом
+    полей в строке разбираются модулем csv.
+    """
+    if buffer.find(b'"', start, stop) >= 0:
+        return _scan_block_slow(bytes(buffer[start:stop]), column)
+
+    data = np.frombuffer(buffer, dtype=np.uint8, count=stop - start, offset=start)
+    separators = np.flatnonzero((data == _COMMA) | (data == _NEWLINE))
+    if len(separators) % ncols:
+        return _scan_block_slow(bytes(buffer[start:stop]), column)
+    separators = separators.reshape(-1, ncols)
+    if np.any(data[separators[:, -1]] != _NEWLINE):
+        return _scan_block_slow(bytes(buffer[start:stop]), column)
+
+    rows = len(separators)
+    if column:
+        first = separators[:, column - 1] + 1
+    else:
+        first = np.concatenate(([0], separators[:-1, -1] + 1))
+    last = separators[:, column]
+
+    width = int((last - first).max()) if rows else 0
+    if width == 0:
+        return False, rows
+    if width > 32:
+        return _scan_block_slow(bytes(buffer[start:stop]), column)
+
+    positions = first[:, None] + np.arange(width)
+    chars = data[np.minimum(positions, len(data) - 1)]
+    has_digit = ((positions < last[:, None]) & (chars >= ord('1')) & (chars <= ord('9'))).any(axis=1)
+    for i in np.flatnonzero(has_digit):
+        if _is_positive(bytes(data[first[i]:last[i]])):
+            return True, int(i) + 1
+    return False, rows
+
+
+def _iter_line_blocks(stream, chunk_size: int):
+    """Читает поток в один переиспользуемый буфер и отдаёт (буфер, длина), где
+    buffer[:длина] — целые строки. Содержимое действительно до следующей итерации."""
+    buffer = bytearray(chunk_size)
+    filled = 0
+    while True:
+        if filled == len(buffer):
+            # Строка длиннее буфера: расширяем его
+            buffer.extend(bytes(len(buffer)))
+        with memoryview(buffer) as view:
+            count = _read_into(stream, view[filled:])
+        if not count:
+            break
+        filled += count
+
+        cut = buffer.rfind(b'\n', 0, filled) + 1
+        if not cut:
+            continue
+        yield buffer, cut
+        tail = bytes(buffer[cut:filled])
+        buffer[:len(tail)] = tail
+        filled = len(tail)
+
+    if filled:
+        # Последняя строка без перевода строки
+        yield bytes(buffer[:filled]) + b'\n', filled + 1
+
+
+def scan_dtc(stream, chunk_size: int = SCAN_CHUNK_SIZE) -> dict:
+    """Потоково проверяет OBD-лог на dtc > 0 и останавливается на первой ошибке.
+
+    stream — бинарный файловый объект (открытый файл или поток загрузки);
+    в памяти держится один буфер chunk_size, из колонок разбирается только dtc.
+    """
+    start_time = time.perf_counter()
+    rows = 0
+    column = ncols = None
+    has_dtc = False
+    bytes_scanned = 0
+
+    for buffer, length in _iter_line_blocks(stream, chunk_size):
+        bytes_scanned += length
+        offset = 0
+        if ncols is None:
+            offset = buffer.find(b'\n', 0, length) + 1
+            column, ncols = _parse_header(bytes(buffer[:offset]))
+            if column is None:
+                break
+        if length > offset:
+            has_dtc, scanned = _scan_block(buffer, offset, length, column, ncols)
+            rows += scanned
+            if has_dtc:
+                break
+
+    seconds = time.perf_counter() - start_time
+    return {
+        'has_dtc': bool(has_dtc),
+        'column_found': column is not None,
+        'rows': rows,
+        'bytes': bytes_scanned,
+        'seconds': seconds,
+        'mb_per_s': bytes_scanned / 1e6 / seconds if seconds else 0.0
+    }
 
 
 def check_dtc_in_file(file_path: str) -> bool:
 
     try:
-        df = pd.read_csv(file_path, low_memory=False)
+        with open(file_path, 'rb') as f:
+            scan = scan_dtc(f)
 
-        if 'dtc' not in df.columns:
-            print("Колонка dtc не найдена в файле.")
+        if not scan['column_found']:
+            logger.warning("Колонка dtc не найдена в файле %s", file_path)
             return False
 
-        dtc_vals = pd.to_numeric(df['dtc'], errors='coerce').fillna(0)
-        has_dtc_errors = (dtc_vals > 0).any()
-
-        print(f"Проверено {len(df)} строк. Найдены DTC: {has_dtc_errors}")
-        return has_dtc_errors
+        logger.debug("Проверено %d строк (%.0f МБ/с). Найдены DTC: %s", scan['rows'], scan['mb_per_s'], scan['has_dtc'])
+        return scan['has_dtc']
 
     except Exception as e:
-        print(f"Ошибка при чтении файла {file_path}: {e}")
-        return False
\ No newline at end of file
+        logger.error("Ошибка при чтении файла %s: %s", file_path, e)
+        return False
+
+
+class DtcVerdict:
+    """Результат DTC-анализа лога, который можно передать в расчёт КБМ
+    вместо пути к файлу."""
+
+    def __init__(self, has_dtc: bool, content_hash: str = None, rows: int = 0,
+                 size: int = 0, path: str = None, cached: bool = False):
+        self.has_dtc = bool(has_dtc)
+        self.content_hash = content_hash
+        self.rows = rows
+        self.size = size
+        self.path = path
+        self.cached = cached
+
+    def __bool__(self) -> bool:
+        return self.has_dtc
+
+    def __repr__(self) -> str:
+        return f"DtcVerdict(has_dtc={self.has_dtc}, content_hash={self.content_hash!r}, rows={self.rows})"
+
+    def to_dict(self) -> dict:
+        return {
+            'has_dtc': self.has_dtc,
+            'content_hash': self.content_hash,
+            'rows': self.rows,
+            'size': self.size,
+            'path': self.path
+        }
+
+
+def _hash_stream(stream, chunk_size: int = SCAN_CHUNK_SIZE) -> tuple:
+    digest = hashlib.sha256()
+    size = 0
+    buffer = bytearray(chunk_size)
+    with memoryview(buffer) as view:
+        while True:
+            count = _read_into(stream, view)
+            if not count:
+                break
+            digest.update(view[:count])
+            size += count
+    return digest.hexdigest(), size
+
+
+class DtcAnalyzer:
+    """DTC-анализ загрузок с кэшем вердиктов по SHA-256 содержимого.
+
+    Загрузки хранятся в upload_dir под именем <sha256>.csv: повторная загрузка
+    того же лога не пишется на диск второй раз и не сканируется заново.
+    """
+
+    def __init__(self, upload_dir: str = "static/uploads", cache_size: int = 4096):
+        self.upload_dir = upload_dir
+        self.cache = LruCache(maxsize=cache_size)
+        os.makedirs(upload_dir, exist_ok=True)
+
+    def upload_path(self, content_hash: str) -> str:
+        return os.path.join(self.upload_dir, f"{content_hash}.csv")
+
+    def _store(self, stream, path: str):
+        if os.path.exists(path):
+            return
+        # Пишем во временный файл и переименовываем: параллельная загрузка того же
+        # лога не увидит недописанный файл
+        fd, tmp_path = tempfile.mkstemp(dir=self.upload_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                buffer = bytearray(SCAN_CHUNK_SIZE)
+                with memoryview(buffer) as view:
+                    while True:
+                        count = _read_into(stream, view)
+                        if not count:
+                            break
+                        f.write(view[:count])
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _verdict(self, content_hash: str, size: int, path: str, scan) -> DtcVerdict:
+        key = content_hash.encode('ascii')
+        cached = self.cache.get(key)
+        if cached is not None:
+            return DtcVerdict(cached['has_dtc'], content_hash, cached['rows'], size, path, cached=True)
+
+        result = scan()
+        self.cache.put(key, {'has_dtc': result['has_dtc'], 'rows': result['rows']})
+        return DtcVerdict(result['has_dtc'], content_hash, result['rows'], size, path)
+
+    def analyze_upload(self, stream, store: bool = True) -> DtcVerdict:
+        """stream должен поддерживать seek: его читают для хеша, скана и сохранения."""
+        start = stream.tell()
+        content_hash, size = _hash_stream(stream)
+        path = self.upload_path(content_hash) if store else None
+
+        def scan():
+            stream.seek(start)
+            return scan_dtc(stream)
+
+        verdict = self._verdict(content_hash, size, path, scan)
+        if store:
+            stream.seek(start)
+            self._store(stream, path)
+        return verdict
+
+    def analyze_file(self, file_path: str) -> DtcVerdict:
+        with open(file_path, 'rb') as f:
+            content_hash, size = _hash_stream(f)
+
+            def scan():
+                f.seek(0)
+                return scan_dtc(f)
+
+            return self._verdict(content_hash, size, file_path, scan)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Проверка OBD-лога на коды неисправностей (dtc > 0)")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--chunk-size", type=int, default=SCAN_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    for path in args.files:
+        with open(path, 'rb') as f:
+            scan = scan_dtc(f, chunk_size=args.chunk_size)
+        print(f"{path}: dtc={scan['has_dtc']}, строк {scan['rows']}, "
+              f"{scan['bytes'] / 1e6:.1f} МБ за {scan['seconds'] * 1000:.0f} мс ({scan['mb_per_s']:.0f} МБ/с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s"
+
+_lock = threading.Lock()
+_listener = None
+_queue = None
+_hooks_registered = False
+
+
+class lazy:
+    """Откладывает построение тяжёлого сообщения до записи в лог:
+    logger.debug("%s", lazy(lambda: df.to_string())) ничего не считает,
+    если DEBUG выключен, а иначе — в потоке записи, а не в потоке запроса."""
+
+    __slots__ = ('func',)
+
+    def __init__(self, func):
+        self.func = func
+
+    def __str__(self) -> str:
+        return str(self.func())
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись; поля из extra= попадают в неё как есть."""
+
+    _skip = frozenset(logging.LogRecord('', 0, '', 0, '', None, None).__dict__) | {'message', 'asctime'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+            'message': record.getMessage()
+        }
+        entry.update((k, v) for k, v in record.__dict__.items() if k not in self._skip)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # Стандартный QueueHandler форматирует сообщение в вызывающем потоке, чтобы
+    # запись можно было передать в другой процесс. Очередь здесь внутри процесса,
+    # поэтому запись уходит как есть и форматируется в потоке QueueListener.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _start_listener(handler: logging.Handler):
+    global _listener
+    _listener = logging.handlers.QueueListener(_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # Поток записи не переживает fork: в дочернем процессе (воркер gunicorn,
+    # процесс пула) очередь и поток создаются заново
+    global _queue, _lock
+    _lock = threading.Lock()
+    if _listener is None:
+        return
+    handlers = _listener.handlers
+    _queue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, _DeferredQueueHandler):
+            handler.queue = _queue
+    _start_listener(*handlers)
+
+
+def setup_logging(level=None, fmt: str = None, stream=None) -> logging.Logger:
+    """Настраивает корневой логгер один раз на процесс.
+
+    Вызовы логгера только кладут запись в очередь; форматирование и запись в
+    stream (по умолчанию stderr) идут в фоновом потоке. Уровень берётся из
+    LOG_LEVEL (INFO), формат из LOG_FORMAT: text или json.
+    """
+    global _queue, _hooks_registered
+    root = logging.getLogger()
+    with _lock:
+        if _listener is not None:
+            if level is not None:
+                root.setLevel(level)
+            return root
+
+        level = level or os.environ.get("LOG_LEVEL", "INFO").upper()
+        fmt = fmt or os.environ.get("LOG_FORMAT", "text")
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(LOG_FORMAT))
+
+        _queue = queue.SimpleQueue()
+        root.addHandler(_DeferredQueueHandler(_queue))
+        root.setLevel(level)
+        _start_listener(output)
+
+        if not _hooks_registered:
+            atexit.register(stop_logging)
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=_restart_after_fork)
+            _hooks_registered = True
+    return root
+
+
+def stop_logging():
+    """Дописывает очередь и останавливает поток записи."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in list(logging.getLogger().handlers):
+            if isinstance(handler, _DeferredQueueHandler):
+                logging.getLogger().removeHandler(handler)
+        _listener = None
@@ -0,0 +1,304 @@
+import csv
+import io
+import mmap
+import os
+import time
+import weakref
+
+import numpy as np
+
+INDEX_SUFFIX = ".idx.npz"
+INDEX_CHUNK_SIZE = 64 * 1024 * 1024
+INDEX_VERSION = 1
+KEY_COLUMNS = ('deviceID', 'tripID')
+
+_COMMA = ord(',')
+_NEWLINE = ord('\n')
+_MAX_KEY_WIDTH = 32
+
+
+def _parse_key(values) -> tuple:
+    # Ключи как в trip_features: число, а пустое или нечисловое значение — -1
+    key = []
+    for value in values:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            number = -1.0
+        key.append(-1.0 if number != number else number)
+    return tuple(key)
+
+
+def _field_text(data: np.ndarray, start: int, stop: int) -> str:
+    return bytes(data[start:stop]).decode('utf-8', errors='replace').strip()
+
+
+class _SliceReader(io.RawIOBase):
+    """Поток поверх списка срезов mmap: читает блоки поездки без копирования файла."""
+
+    def __init__(self, parts: list):
+        self._parts = parts
+        self._part = 0
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while self._part < len(self._parts):
+            part = self._parts[self._part]
+            if self._position < len(part):
+                count = min(len(buffer), len(part) - self._position)
+                buffer[:count] = part[self._position:self._position + count]
+                self._position += count
+                return count
+            self._part += 1
+            self._position = 0
+        return 0
+
+    def close(self):
+        # Срезы держат экспорт буфера mmap: пока они живы, mmap.close() падает с BufferError
+        for part in self._parts:
+            part.release()
+        self._parts = []
+        super().close()
+
+
+class ObdLogIndex:
+    """Индекс смещений блоков (deviceID, tripID) в большом OBD-логе.
+
+    Строится один раз проходом по файлу через mmap и сохраняется рядом с
+    логом (<лог>.idx.npz). Блок — подряд идущие строки одной поездки; если
+    поездка встречается в файле несколько раз, у неё несколько блоков. Чтение
+    поездки берёт из mmap только её байты, остальной файл не разбирается.
+    """
+
+    def __init__(self, path: str, index_path: str = None, chunk_size: int = INDEX_CHUNK_SIZE):
+        self.path = path
+        self.index_path = index_path or path + INDEX_SUFFIX
+        self.chunk_size = chunk_size
+        self._streams = weakref.WeakSet()
+        self._mmap = b''
+        self._file = open(path, 'rb')
+
+        try:
+            if os.fstat(self._file.fileno()).st_size:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if not self._load():
+                self.build()
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """Закрывает файл и mmap; потоки open_trip(), которые ещё открыты, закрываются первыми."""
+        for stream in list(self._streams):
+            stream.close()
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _signature(self) -> np.ndarray:
+        stat = os.stat(self.path)
+        return np.array([INDEX_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    def _load(self) -> bool:
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with np.load(self.index_path) as saved:
+                if not np.array_equal(saved['signature'], self._signature()):
+                    return False
+                self.header_end = int(saved['header_end'])
+                self.keys, self.starts, self.ends = saved['keys'], saved['starts'], saved['ends']
+        except (OSError, KeyError, ValueError):
+            return False
+        self._by_key = None
+        return True
+
+    def build(self):
+        """Находит границы блоков по смене значений ключевых колонок.
+
+        Быстрый путь как в scan_dtc: позиции запятых и переводов строк кусок за
+        куском находит NumPy, поля ключа сравниваются с предыдущей строкой
+        матрицей байтов, а в числа переводятся только ключи на границах блоков.
+        Куски с кавычками или неровным числом полей разбираются модулем csv.
+        """
+        self.header_end = int(self._mmap.find(b'\n') + 1) or len(self._mmap)
+        columns = self.columns()
+        if any(c not in columns for c in KEY_COLUMNS):
+            raise ValueError(f"В логе нет колонок {', '.join(KEY_COLUMNS)}: {self.path}")
+        key_columns = [columns.index(c) for c in KEY_COLUMNS]
+        data = np.frombuffer(self._mmap, dtype=np.uint8) if len(self._mmap) else np.zeros(0, np.uint8)
+
+        keys, starts = [], []
+        last_key = None
+        position = self.header_end
+        while position < len(data):
+            stop = min(position + self.chunk_size, len(data))
+            if stop < len(data):
+                cut = self._mmap.rfind(b'\n', position, stop)
+                stop = cut + 1 if cut >= position else (self._mmap.find(b'\n', stop) + 1 or len(data))
+            for offset, key in self._block_starts(data, position, stop, key_columns, len(columns), last_key):
+                keys.append(key)
+                starts.append(offset)
+                last_key = key
+            position = stop
+
+        self.keys = np.array(keys, dtype=float).reshape(-1, len(KEY_COLUMNS))
+        self.starts = np.array(starts, dtype=np.int64)
+        self.ends = np.append(self.starts[1:], len(data)).astype(np.int64)
+        self._by_key = None
+        self._save()
+
+    def columns(self) -> list:
+        header = bytes(self._mmap[:self.header_end]).decode('utf-8-sig', errors='replace')
+        return [c.strip() for c in next(csv.reader([header]), [])]
+
+    def _save(self):
+        tmp_path = self.index_path + ".part"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, signature=self._signature(), header_end=self.header_end,
+                     keys=self.keys, starts=self.starts, ends=self.ends)
+        os.replace(tmp_path, self.index_path)
+
+    def _block_starts(self, data, start, stop, key_columns, ncols, last_key):
+        chunk = data[start:stop]
+        if self._mmap.find(b'"', start, stop) < 0:
+            separators = np.flatnonzero((chunk == _COMMA) | (chunk == _NEWLINE))
+            if len(separators) % ncols == 0:
+                separators = separators.reshape(-1, ncols)
+                if not np.any(chunk[separators[:, -1]] != _NEWLINE):
+                    found = self._block_starts_fast(chunk, separators, key_columns, last_key)
+                    if found is not None:
+                        return [(start + offset, key) for offset, key in found]
+        return [(start + offset, key) for offset, key in self._block_starts_slow(chunk, key_columns, last_key)]
+
+    @staticmethod
+    def _block_starts_fast(chunk, separators, key_columns, last_key):
+        line_starts = np.concatenate(([0], separators[:-1, -1] + 1))
+        fields = []
+        for column in key_columns:
+            first = line_starts if column == 0 else separators[:, column - 1] + 1
+            last = separators[:, column]
+            width = int((last - first).max()) if len(first) else 0
+            if width > _MAX_KEY_WIDTH:
+                return None
+            positions = first[:, None] + np.arange(max(width, 1))
+            chars = np.where(positions < last[:, None], chunk[np.minimum(positions, len(chunk) - 1)], 0)
+            fields.append((first, last, chars))
+
+        matrix = np.hstack([chars for _, _, chars in fields])
+        changed = np.ones(len(matrix), dtype=bool)
+        changed[1:] = np.any(matrix[1:] != matrix[:-1], axis=1)
+
+        found = []
+        for row in np.flatnonzero(changed):
+            key = _parse_key(_field_text(chunk, first[row], last[row]) for first, last, _ in fields)
+            if row == 0 and key == last_key:
+                continue
+            found.append((int(line_starts[row]), key))
+        return found
+
+    @staticmethod
+    def _block_starts_slow(chunk, key_columns, last_key):
+        found = []
+        position = 0
+        text = bytes(chunk)
+        while position < len(text):
+            end = text.find(b'\n', position)
+            end = len(text) if end < 0 else end + 1
+            line = text[position:end].decode('utf-8', errors='replace')
+            if line.strip():
+                row = next(csv.reader([line]))
+                key = _parse_key(row[column] if column < len(row) else '' for column in key_columns)
+                if key != last_key:
+                    found.append((position, key))
+                    last_key = key
+            position = end
+        return found
+
+    def _blocks(self, key) -> list:
+        if self._by_key is None:
+            self._by_key = {}
+            for i, row in enumerate(self.keys.tolist()):
+                self._by_key.setdefault(tuple(row), []).append(i)
+        return self._by_key.get(_parse_key(key), [])
+
+    def trips(self) -> list:
+        """Ключи (deviceID, tripID) в порядке первого появления в файле."""
+        seen = dict.fromkeys(tuple(row) for row in self.keys.tolist())
+        return list(seen)
+
+    def sample_trips(self, n: int, seed: int = None) -> list:
+        trips = self.trips()
+        if n >= len(trips):
+            return trips
+        chosen = np.random.default_rng(seed).choice(len(trips), size=n, replace=False)
+        return [trips[i] for i in sorted(chosen)]
+
+    def trip_size(self, key) -> int:
+        return int(sum(self.ends[i] - self.starts[i] for i in self._blocks(key)))
+
+    def _slices(self, keys, header: bool = True) -> list:
+        with memoryview(self._mmap) as view:
+            parts = [view[:self.header_end]] if header else []
+            for key in keys:
+                parts += [view[self.starts[i]:self.ends[i]] for i in self._blocks(key)]
+        return parts
+
+    def open_trip(self, key, header: bool = True):
+        """Бинарный поток с заголовком и строками поездки — для scan_dtc и pandas.
+
+        Поток читает прямо из mmap и закрывается вместе с индексом.
+        """
+        stream = io.BufferedReader(_SliceReader(self._slices([key], header)))
+        self._streams.add(stream)
+        return stream
+
+    def read_trips(self, keys, usecols=None):
+        import pandas as pd
+
+        with io.BufferedReader(_SliceReader(self._slices(keys))) as stream:
+            return pd.read_csv(stream, usecols=usecols, low_memory=False)
+
+    def scan_dtc(self, key) -> dict:
+        from src.utils.dtc_checker import scan_dtc
+
+        with self.open_trip(key) as stream:
+            return scan_dtc(stream)
+
+    def trip_features(self, keys=None):
+        from src.features.telematics import OBD_COLUMNS, trip_features
+
+        columns = self.columns()
+        keys = self.trips() if keys is None else keys
+        return trip_features(self.read_trips(keys, usecols=[c for c in OBD_COLUMNS if c in columns]))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Индекс поездок большого OBD-лога")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    for path in args.files:
+        start = time.perf_counter()
+        with ObdLogIndex(path) as index:
+            if args.rebuild:
+                index.build()
+            seconds = time.perf_counter() - start
+            print(f"{path}: поездок {len(index.trips())}, блоков {len(index.keys)}, "
+                  f"{os.path.getsize(path) / 1e6:.0f} МБ за {seconds:.2f} с -> {index.index_path}")
+
+
+if __name__ == "__main__":
+    main()
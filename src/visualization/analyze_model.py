@@ -1,4 +1,7 @@
+import logging
+
 from src.models.catboost.insurance_model import InsuranceRiskModel
+from src.utils.log import setup_logging
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -7,6 +10,8 @@ from sklearn.metrics import confusion_matrix, roc_curve, auc, accuracy_score, pr
 import numpy as np
 import os
 
+logger = logging.getLogger(__name__)
+
 FEATURE_GROUPS = {
     'Персональные данные водителя': [
         'driver_age', 'driver_experience', 'occupation_type', 'num_claims',
@@ -89,7 +94,7 @@ def load_and_analyze(model_path="outputs/insurance_model_v1.cbm"):
             df = df.dropna(subset=['target'])
         df['target'] = pd.to_numeric(df['target'], errors='coerce').fillna(0).astype(int)
     except FileNotFoundError:
-        print("Файла нет, используем тестовые данные")
+        logger.warning("Файла нет, используем тестовые данные")
         df = pd.DataFrame([{
             'driver_age': 30, 'driver_experience': 8, 'vehicle_age': 3,
             'vehicle_type': 'sedan', 'engine_power': 150, 'vehicle_purpose': 'personal',
@@ -183,11 +188,11 @@ def plot_feature_importance(model, save_path=None):
         feat_imp = model.model.get_feature_importance()
         feature_names = model.model.feature_names_
     except Exception as e:
-        print(f"Не удалось получить важность признаков: {e}")
+        logger.warning("Не удалось получить важность признаков: %s", e)
         return
 
     if len(feat_imp) != len(feature_names):
-        print("Несоответствие длины признаков и важности")
+        logger.warning("Несоответствие длины признаков и важности")
         return
 
     indices = np.argsort(feat_imp)[::-1]
@@ -214,11 +219,11 @@ def plot_feature_importance_russian(model, save_path=None):
         feat_imp = model.model.get_feature_importance()
         feature_names = model.model.feature_names_
     except Exception as e:
-        print(f"Не удалось получить важность признаков: {e}")
+        logger.warning("Не удалось получить важность признаков: %s", e)
         return
 
     if len(feat_imp) != len(feature_names):
-        print("Несоответствие длины признаков и важности")
+        logger.warning("Несоответствие длины признаков и важности")
         return
 
     indices = np.argsort(feat_imp)[::-1]
@@ -257,11 +262,11 @@ def plot_detailed_feature_importance(model, save_path=None):
         feat_imp = model.model.get_feature_importance()
         feature_names = list(model.model.feature_names_)
     except Exception as e:
-        print(f"Не удалось получить важность признаков: {e}")
+        logger.warning("Не удалось получить важность признаков: %s", e)
         return
 
     if len(feat_imp) != len(feature_names):
-        print("Несоответствие длины признаков и важности")
+        logger.warning("Несоответствие длины признаков и важности")
         return
 
     importance_dict = dict(zip(feature_names, feat_imp))
@@ -287,7 +292,7 @@ def plot_detailed_feature_importance(model, save_path=None):
 
     total_importance = sum(group_importances.values())
     if total_importance == 0:
-        print("Суммарная важность равна нулю")
+        logger.warning("Суммарная важность равна нулю")
         return
 
     group_percentages = {k: (v / total_importance) * 100 for k, v in group_importances.items()}
@@ -361,4 +366,5 @@ def plot_detailed_feature_importance(model, save_path=None):
 
 
 if __name__ == "__main__":
+    setup_logging()
     load_and_analyze()
\ No newline at end of file
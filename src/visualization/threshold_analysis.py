@@ -1,4 +1,7 @@
+import logging
+
 from src.models.catboost.insurance_model import InsuranceRiskModel
+from src.utils.log import setup_logging
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -6,6 +9,8 @@ from sklearn.metrics import precision_score, recall_score, f1_score
 import warnings
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
 
 def load_robust_csv(file_path: str) -> pd.DataFrame:
     try:
@@ -19,10 +24,10 @@ def load_robust_csv(file_path: str) -> pd.DataFrame:
 def plot_threshold_analysis(model_path="outputs/insurance_model_v1.cbm", 
                             data_path="src/data/raw/insurance_data.csv"):
 
-    print("Загрузка модели...")
+    logger.info("Загрузка модели...")
     model = InsuranceRiskModel(model_path=model_path)
     
-    print("Загрузка данных...")
+    logger.info("Загрузка данных...")
     try:
         df = load_robust_csv(data_path)
         df = df.dropna(subset=['driver_age', 'driver_experience', 'num_claims'])
@@ -34,7 +39,7 @@ def plot_threshold_analysis(model_path="outputs/insurance_model_v1.cbm",
         
         df['target'] = pd.to_numeric(df['target'], errors='coerce').fillna(0).astype(int)
     except FileNotFoundError:
-        print(f"Файл {data_path} не найден. Используется тестовый датасет.")
+        logger.warning("Файл %s не найден. Используется тестовый датасет.", data_path)
 
         np.random.seed(42)
         n_samples = 1000
@@ -45,7 +50,7 @@ def plot_threshold_analysis(model_path="outputs/insurance_model_v1.cbm",
             'target': np.random.binomial(1, 0.3, n_samples)
         })
     
-    print(f"Размер выборки: {len(df)}")
+    logger.info("Размер выборки: %d", len(df))
 
     X = df.drop(columns=["target"])
     y = df["target"].values
@@ -187,4 +192,5 @@ def plot_threshold_analysis(model_path="outputs/insurance_model_v1.cbm",
 
 
 if __name__ == "__main__":
+    setup_logging()
     plot_threshold_analysis()
\ No newline at end of file
@@ -1,15 +1,18 @@
 from typing import Dict, Optional, Union
+import logging
 import pandas as pd
 
 from src.models.hybrid.kbm_calculator import HybridKBMCalculator
 
+logger = logging.getLogger(__name__)
+
 
 class OSAGOCalculator:
 
 
     def __init__(self, model_path: str = "outputs/insurance_model_v1.cbm"):
         self.kbm_model: HybridKBMCalculator = HybridKBMCalculator(model_path=model_path)
-        print("Гибридный калькулятор ОСАГО загружен")
+        logger.info("Гибридный калькулятор ОСАГО загружен")
 
     def calculate_osago_premium(
         self,
@@ -28,10 +31,9 @@ class OSAGOCalculator:
         if len(driver_data) > 1:
             raise ValueError("Для расчёта поддерживается только одна запись (один водитель).")
 
-        kbm_result_df = self.kbm_model.calculate(
+        kbm_result_df = self.kbm_model.score(
             cases=[driver_data.iloc[0].to_dict()],
-            obd_file_path=obd_file_path,
-            show_plot=False
+            obd_file_path=obd_file_path
         )
 
         if kbm_result_df.empty:
@@ -40,7 +42,7 @@ class OSAGOCalculator:
         base_kbm = float(kbm_result_df['Базовый КБМ'].iloc[0])
         final_kbm = float(kbm_result_df['Итоговый КБМ'].iloc[0])
 
-        print(f"Итоговый КБМ (гибридный): {final_kbm:.3f}")
+        logger.debug("Итоговый КБМ (гибридный): %.3f", final_kbm)
 
         ko_coeff = 1.8 if unlimited_drivers else 1.0
 